@@ -1,3 +1,5 @@
+import asyncio
+import inspect
 from typing import Any, TypedDict, Annotated, TypeVar, Union, List, Callable, Sequence
 
 from langchain_core.language_models import BaseChatModel
@@ -122,17 +124,21 @@ class RunnableMixin:
     async def ainvoke(
             self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any
     ) -> Output:
-        """Implementation for invoking the agent."""
+        """Implementation for asynchronously invoking the agent."""
         runnable = self.get_runnable
         if runnable:
             if isinstance(runnable, (Runnable, RunnableSequence)):
                 result = await runnable.ainvoke(input, config, **kwargs)
                 return result
+            elif inspect.iscoroutinefunction(runnable):
+                return await runnable(input, config, **kwargs)
             elif callable(runnable):
-                result = runnable(input, config, **kwargs)
+                # sync only callable, run it in a thread so the event loop is not blocked
+                result = await asyncio.to_thread(runnable, input, config, **kwargs)
                 # Si le résultat est une coroutine, il faut l'attendre
-                if hasattr(result, '__await__'):
+                if inspect.isawaitable(result):
                     result = await result
+                return result
             else:
                 raise NotImplementedError("No valid invoke method found")
         else:
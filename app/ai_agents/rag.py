@@ -1,19 +1,21 @@
 import abc
+import hashlib
 import os
+import uuid
 from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from pathlib import Path
 from typing import Optional, List, Any, Union, Dict
 
 from dotenv import load_dotenv, find_dotenv
-from langchain_chroma import Chroma
 
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from langchain_core.language_models import BaseChatModel
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableSerializable, RunnableMap
+from langchain_core.runnables import RunnableSerializable, RunnableMap, RunnableConfig, RunnableLambda
 from langchain_core.vectorstores import VectorStore, VectorStoreRetriever
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, Settings
@@ -29,9 +31,9 @@ from app.ai_agents.base import AbstractAgent, Input, Output
 from app.ai_agents.utils import get_doc_tools
 from app.core.base import SupportedModel
 from app.core.logger import logger
-
-import time
-_RAG_AGENT_DEFAULT_COLLECTION_NAME = f"ragagent_{int(time.time())}"
+from app.semantic_search.context import AssembledContext, assemble_context
+from app.semantic_search.core import SimpleVectorSearch, VectorStoreManager
+from app.semantic_search.utils import file_hash, embeddings_model_name
 
 ##########
 # START FOR LLAMA-INDEX
@@ -73,17 +75,38 @@ class AbstractRAGAgent(AbstractAgent):
 
 
 class SimpleRAGAgent(AbstractRAGAgent):
+    """
+    RAG agent over a Chroma collection.
+
+    Without persist_directory, documents are embedded into an in-memory collection at each start.
+    With persist_directory, the collection name is a fingerprint of the source files, the splitter
+    settings and the embedding model, so a warm start reopens the persisted index without re-embedding.
+
+    Up to fetch_k chunks are retrieved for a question, then deduplicated, merged when adjacent and
+    packed into a context of at most context_max_tokens tokens.
+    """
+
+    _collection_prefix = "ragagent"
+    _chunk_size = 100
+    _chunk_overlap = 20
 
-    # TODO add a in memory vectorstore...
     def __init__(self,
                  name: str,
                  model: BaseChatModel,
                  embeddings: Embeddings,
                  source_paths: Path,
-                 collection_name: Optional[str] = _RAG_AGENT_DEFAULT_COLLECTION_NAME,
+                 collection_name: Optional[str] = None,
+                 persist_directory: Optional[str] = None,
+                 context_max_tokens: int = 1000,
+                 fetch_k: int = 20,
                  ):
         super().__init__(name=name, model=model, embeddings=embeddings, source_paths=source_paths)
-        self._collection_name = collection_name or _RAG_AGENT_DEFAULT_COLLECTION_NAME
+        self.persist_directory = persist_directory
+        self.context_max_tokens = context_max_tokens
+        self.fetch_k = fetch_k
+        # last context assembled, to report its size
+        self.last_context: Optional[AssembledContext] = None
+        self._collection_name = collection_name or self._default_collection_name()
 
         # RAG classic
         self.vectorstore = self._initiate_vectorstore()
@@ -99,37 +122,77 @@ class SimpleRAGAgent(AbstractRAGAgent):
         for path in source_paths:
             documents = SimpleDirectoryReader(input_files=[path]).load_data()
             text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=100,
-                chunk_overlap=20,
+                chunk_size=self._chunk_size,
+                chunk_overlap=self._chunk_overlap,
                 length_function=len,
                 is_separator_regex=False,
+                # start_index is used to merge adjacent chunks in the context
+                add_start_index=True,
+            )
+            split_docs = text_splitter.create_documents(
+                [doc.text for doc in documents],
+                metadatas=[{"source": f"{path}#{i}"} for i in range(len(documents))],
             )
-            split_docs = text_splitter.create_documents([doc.text for doc in documents])
             source_to_docs[path] = split_docs
 
         return source_to_docs
 
+    def _source_fingerprint(self) -> str:
+        """Hash of everything the index content depends on: sources, splitter and embedding model."""
+        source_paths = self.source_paths if isinstance(self.source_paths, list) else [self.source_paths]
+        digest = hashlib.sha256()
+        for path in sorted(str(p) for p in source_paths):
+            digest.update((file_hash(path) if os.path.exists(path) else path).encode())
+        digest.update(f"{type(self).__name__}|{self._chunk_size}|{self._chunk_overlap}|start_index".encode())
+        digest.update(embeddings_model_name(self.embeddings).encode())
+        return digest.hexdigest()[:16]
+
+    def _default_collection_name(self) -> str:
+        if self.persist_directory:
+            return f"{self._collection_prefix}_{self._source_fingerprint()}"
+        return f"{self._collection_prefix}_{uuid.uuid4().hex[:12]}"
+
     def _initiate_vectorstore(self) -> VectorStore:
         logger.debug("Initiating VectorStore")
-        # TODO check consistency with embedding, model and vectorstore
-        # TODO memory only one
-        # TODO check existing file to avoir reload (code above does not work an create an empty vectore store
         all_docs = [doc for docs in self.docs.values() for doc in docs]
-        vectorstore = Chroma.from_documents(
-            documents=all_docs,
-            embedding=self.embeddings,
-            collection_name=self._collection_name
-            # persist_directory=self.persist_directory
+        # the strategy owns the collection: persisted ones share the Chroma client of their directory,
+        # fingerprinted ones are reused as is if they were already built
+        search = VectorStoreManager.get_or_create(
+            self._collection_name,
+            lambda: SimpleVectorSearch(
+                embeddings=self.embeddings,
+                collection_name=self._collection_name,
+                persist_directory=self.persist_directory,
+            )
         )
-        return vectorstore
+        if search.vectorstore is None:
+            storage = self.persist_directory or "memory"
+            logger.info(f"Building collection '{self._collection_name}' in {storage}")
+            search.add_documents(all_docs)
+        else:
+            logger.info(f"Reusing collection '{self._collection_name}'")
+        return search.vectorstore
 
     def _initiate_retriever(self) -> VectorStoreRetriever:
         logger.debug("Initiating Retriever")
         retriever = self.vectorstore.as_retriever(
             search_type="similarity_score_threshold",
-            search_kwargs={"score_threshold": 0.5})
+            search_kwargs={"score_threshold": 0.5, "k": self.fetch_k})
         return retriever
 
+    def _assemble_context(self, question: str) -> str:
+        return self._pack_context(self.retriever.invoke(question))
+
+    async def _aassemble_context(self, question: str) -> str:
+        return self._pack_context(await self.retriever.ainvoke(question))
+
+    def _pack_context(self, documents: List[Document]) -> str:
+        context = assemble_context(documents, max_tokens=self.context_max_tokens)
+        logger.info(f"{self.name} context: {context.tokens} tokens, {len(context.documents)} chunks "
+                    f"({context.retrieved} retrieved, {context.dropped} over budget)")
+        self.last_context = context
+        return context.text
+
     def _initiate_runnable(self) -> RunnableSerializable:
         logger.debug("Initiating Assistant")
         # TODO revoir le prompt il utilise ses propres connaissances.
@@ -155,48 +218,80 @@ class SimpleRAGAgent(AbstractRAGAgent):
         output_parser = StrOutputParser()
 
         return RunnableMap({
-            "context": lambda x: '\n\n'.join([doc.page_content for doc in self.retriever.invoke(x["question"])]),
+            "context": RunnableLambda(lambda x: self._assemble_context(x["question"]),
+                                      afunc=lambda x: self._aassemble_context(x["question"])),
             "question": lambda x: x["question"],
         }) | prompt | self.model | output_parser
 
 
 class MultiDocumentRAGAgent(AbstractRAGAgent, ABC):
+    """
+    Agent routing queries to a vector and a summary tool per document.
+
+    With persist_directory, the indexes of each document are persisted in a directory named after
+    a fingerprint of the file, the splitter settings and the embedding model, and reloaded on
+    the next start instead of parsing and embedding the file again.
+    """
+
     # TODO UGLY TO FIX THIS BUT LLAMA INDEX Settings is awsfull
     Settings.embed_model = MistralAIEmbedding()
     Settings.llm = MistralAI(model=SupportedModel.MISTRAL_SMALL.value)
 
+    _chunk_size = 1024
+
     def __init__(self,
                  name: str,
                  model: BaseChatModel,
                  embeddings: Embeddings,
-                 source_paths: Union[Path, List[Path]]):
+                 source_paths: Union[Path, List[Path]],
+                 persist_directory: Optional[str] = None,
+                 max_workers: Optional[int] = None):
+        # used by _initiate_docs, called by the parent constructor
+        self.persist_directory = persist_directory
+        self.max_workers = max_workers
         super().__init__(name=name, model=model, embeddings=embeddings, source_paths=source_paths)
 
         self._agent_runner = self._initiate_agent()
         # RAG classic
         # self.runnable = self._initiate_agent_chain()
 
+    def _storage_dir(self, path: Path) -> Optional[str]:
+        """Directory of the persisted indexes of a file, None without persist_directory"""
+        if not self.persist_directory:
+            return None
+        digest = hashlib.sha256()
+        digest.update(file_hash(path).encode())
+        digest.update(f"{self._chunk_size}|{embeddings_model_name(self.embeddings)}".encode())
+        return os.path.join(self.persist_directory, f"{Path(path).stem}_{digest.hexdigest()[:16]}")
+
+    def _is_persisted(self, path: Path) -> bool:
+        storage_dir = self._storage_dir(path)
+        return storage_dir is not None and os.path.exists(os.path.join(storage_dir, "docstore.json"))
+
+    def _load_nodes(self, path: Path) -> List[BaseNode]:
+        if self._is_persisted(path):
+            # nodes are in the persisted docstore, no need to parse the file
+            logger.info(f"Reusing persisted indexes of {path}")
+            return []
+        documents = SimpleDirectoryReader(input_files=[path]).load_data()
+        splitter = SentenceSplitter(chunk_size=self._chunk_size)
+        return splitter.get_nodes_from_documents(documents)
+
     def _initiate_docs(self, source_paths: Union[Path, List[Path]]) -> Dict[Path, List[BaseNode]]:
-        """Load and split documents for llama-index."""
+        """Load and split documents for llama-index, in parallel. Persisted documents have no nodes."""
         if isinstance(source_paths, Path):
             source_paths = [source_paths]
-        else:
-            source_paths = source_paths
 
-        source_to_nodes = {}
-        for path in source_paths:
-            documents = SimpleDirectoryReader(input_files=[path]).load_data()
-            splitter = SentenceSplitter(chunk_size=1024)
-            nodes = splitter.get_nodes_from_documents(documents)
-            source_to_nodes[path] = nodes
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(source_paths, executor.map(self._load_nodes, source_paths)))
 
-        return source_to_nodes
+    def _doc_tools(self, source: Path) -> List[Any]:
+        return list(get_doc_tools(self.embeddings, self.docs[source], source.stem, self._storage_dir(source)))
 
     def _initiate_agent(self) -> BaseAgentRunner:
-        paper_to_tools_dict = {}
-        for source, nodes in self.docs.items():
-            vector_tool, summary_tool = get_doc_tools(self.embeddings, nodes, source.stem)
-            paper_to_tools_dict[source] = [vector_tool, summary_tool]
+        # indexes are built (embedding calls) or loaded concurrently
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            paper_to_tools_dict = dict(zip(self.docs, executor.map(self._doc_tools, self.docs)))
 
         all_tools = [t for paper in self.docs for t in paper_to_tools_dict[paper]]
 
@@ -243,10 +338,14 @@ class MultiDocumentRAGAgent(AbstractRAGAgent, ABC):
         # return self._agent_runner.runnable
         pass
 
-    def invoke(self, input: Input, **kwargs: Any) -> Output:
+    def invoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
         response = self._agent_runner.query(input)
         return response
 
+    async def ainvoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
+        response = await self._agent_runner.aquery(input)
+        return response
+
 
 class RAGAgentType(Enum):
     MULTI_DOCUMENT = "multi-document"
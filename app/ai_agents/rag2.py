@@ -7,7 +7,7 @@ from typing import Optional, List, Any, Union, Dict
 from langchain_core.language_models import BaseChatModel
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableSerializable, RunnableMap
+from langchain_core.runnables import RunnableSerializable, RunnableMap, RunnableConfig
 from llama_index.core.agent import FunctionCallingAgentWorker, AgentRunner
 from llama_index.core.agent.runner.base import BaseAgentRunner
 
@@ -100,10 +100,14 @@ class MultiDocumentRAGAgent(AbstractRAGAgent):
         )
         return AgentRunner(agent_worker)
 
-    def invoke(self, input: Input, **kwargs: Any) -> Output:
+    def invoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
         response = self._agent_runner.query(input)
         return response
 
+    async def ainvoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
+        response = await self._agent_runner.aquery(input)
+        return response
+
 
 class RAGAgentType(Enum):
     MULTI_DOCUMENT = "multi-document"
@@ -1,22 +1,66 @@
 # TODO: abstract all of this into a function that takes in a PDF file name
+import os
+import threading
+from collections import OrderedDict
+
 from langchain_core.embeddings import Embeddings
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, SummaryIndex
+from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, SummaryIndex, StorageContext, \
+    load_index_from_storage
+from llama_index.core.base.base_query_engine import BaseQueryEngine
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.schema import BaseNode
 from llama_index.core.tools import FunctionTool, QueryEngineTool
 from llama_index.core.vector_stores import MetadataFilters, FilterCondition
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+from app.core.config_loader import load_config
+
+_config = load_config()
+
+# vector query engines kept per document, by page filter chosen by the LLM
+_query_engine_cache_size = _config.getint('Retrieval', 'query_engine_cache_size', fallback=32)
+
+
+def _load_or_build_indexes(
+        embeddings: Embeddings,
+        nodes: List[BaseNode],
+        storage_dir: Optional[str] = None,
+) -> Tuple[VectorStoreIndex, SummaryIndex]:
+    """Load the vector and summary indexes of a document from storage_dir, or build (and persist) them."""
+    if storage_dir and os.path.exists(os.path.join(storage_dir, "docstore.json")):
+        storage_context = StorageContext.from_defaults(persist_dir=storage_dir)
+        vector_index = load_index_from_storage(storage_context, index_id="vector", embed_model=embeddings)
+        summary_index = load_index_from_storage(storage_context, index_id="summary")
+        return vector_index, summary_index
 
+    storage_context = StorageContext.from_defaults()
+    # LlamaIndex support LangChain embeddings wrapper
+    vector_index = VectorStoreIndex(nodes=nodes, embed_model=embeddings, storage_context=storage_context)
+    vector_index.set_index_id("vector")
+    summary_index = SummaryIndex(nodes, storage_context=storage_context)
+    summary_index.set_index_id("summary")
+    if storage_dir:
+        storage_context.persist(persist_dir=storage_dir)
+    return vector_index, summary_index
 
 
 def get_doc_tools(
         embeddings: Embeddings,
         nodes: List[BaseNode],
         name: str,
-) -> str:
-    """Get vector query and summary query tools from a document."""
-    # LlamaIndex support LangChain embeddings wrapper
-    vector_index = VectorStoreIndex(nodes=nodes, embed_model=embeddings)
+        storage_dir: Optional[str] = None,
+        query_engine_cache_size: int = _query_engine_cache_size,
+) -> Tuple[FunctionTool, QueryEngineTool]:
+    """Get vector query and summary query tools from a document.
+
+    With storage_dir, indexes are loaded from it when already persisted (nodes are then not used),
+    otherwise they are built from nodes and persisted there.
+    Query engines are reused by page filter, the query_engine_cache_size most recently used are kept.
+    """
+    vector_index, summary_index = _load_or_build_indexes(embeddings, nodes, storage_dir)
+    # query engines by page filter, least recently used first
+    query_engines: "OrderedDict[Tuple[str, ...], BaseQueryEngine]" = OrderedDict()
+    query_engines_lock = threading.Lock()
 
     def vector_query(
             query: str,
@@ -35,18 +79,26 @@ def get_doc_tools(
 
         """
 
-        page_numbers = page_numbers or []
-        metadata_dicts = [
-            {"key": "page_label", "value": p} for p in page_numbers
-        ]
-
-        query_engine = vector_index.as_query_engine(
-            similarity_top_k=2,
-            filters=MetadataFilters.from_dicts(
-                metadata_dicts,
-                condition=FilterCondition.OR
+        pages = tuple(sorted(set(page_numbers or [])))
+        with query_engines_lock:
+            query_engine = query_engines.get(pages)
+            if query_engine is not None:
+                query_engines.move_to_end(pages)
+        if query_engine is None:
+            metadata_dicts = [
+                {"key": "page_label", "value": p} for p in pages
+            ]
+            query_engine = vector_index.as_query_engine(
+                similarity_top_k=2,
+                filters=MetadataFilters.from_dicts(
+                    metadata_dicts,
+                    condition=FilterCondition.OR
+                )
             )
-        )
+            with query_engines_lock:
+                query_engines[pages] = query_engine
+                while len(query_engines) > query_engine_cache_size:
+                    query_engines.popitem(last=False)
         response = query_engine.query(query)
         return response
 
@@ -55,7 +107,6 @@ def get_doc_tools(
         fn=vector_query
     )
 
-    summary_index = SummaryIndex(nodes)
     summary_query_engine = summary_index.as_query_engine(
         response_mode="tree_summarize",
         use_async=True,
@@ -68,4 +119,4 @@ def get_doc_tools(
         ),
     )
 
-    return vector_query_tool, summary_tool
\ No newline at end of file
+    return vector_query_tool, summary_tool
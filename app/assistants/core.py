@@ -1,24 +1,90 @@
-from dataclasses import dataclass
+import asyncio
+import importlib
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Iterable, Dict, Any
 
 from langgraph.graph.state import CompiledStateGraph
 
-from app.video_script.assistant import video_script
-from app.customer_onboarding.assistant import customer_onboarding
+from app.core.logger import logger
 
 DEFAULT_ASSISTANT = "customer-onboarding"
 
 
 @dataclass
 class Assistant:
+    """
+    An assistant graph, imported and compiled on first use.
+
+    `loader` points to the compiled graph as "module:attribute", like in langgraph.json.
+    """
     description: str
-    graph: CompiledStateGraph
+    loader: str
+    graph: Optional[CompiledStateGraph] = None
+    init_seconds: Optional[float] = None
+    error: Optional[str] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def load(self) -> CompiledStateGraph:
+        if self.graph is not None:
+            return self.graph
+        with self._lock:
+            if self.graph is None:
+                module_name, attribute = self.loader.split(":")
+                start = time.perf_counter()
+                try:
+                    graph = getattr(importlib.import_module(module_name), attribute)
+                except Exception as e:
+                    self.error = repr(e)
+                    logger.error(f"Failed to load assistant '{self.loader}': {e}")
+                    raise
+                self.init_seconds = time.perf_counter() - start
+                self.error = None
+                self.graph = graph
+                logger.info(f"Assistant '{self.loader}' initialized in {self.init_seconds:.2f}s")
+        return self.graph
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "description": self.description,
+            "loaded": self.graph is not None,
+            "init_seconds": self.init_seconds,
+            "error": self.error,
+        }
 
 
 assistants: dict[str, Assistant] = {
-    "customer-onboarding": Assistant(description="A customer onboarding assistant.", graph=customer_onboarding),
-    "video-script": Assistant(description="A video script assistant.", graph=video_script),
+    "customer-onboarding": Assistant(description="A customer onboarding assistant.",
+                                     loader="app.customer_onboarding.assistant:customer_onboarding"),
+    "video-script": Assistant(description="A video script assistant.",
+                              loader="app.video_script.assistant:video_script"),
 }
 
 
 def get_assistant(assistant_id: str) -> CompiledStateGraph:
-    return assistants[assistant_id].graph
+    """Return the graph of an assistant, compiling it on first use."""
+    return assistants[assistant_id].load()
+
+
+async def aget_assistant(assistant_id: str) -> CompiledStateGraph:
+    """Return the graph of an assistant, compiling it off the event loop on first use."""
+    assistant = assistants[assistant_id]
+    if assistant.graph is not None:
+        return assistant.graph
+    return await asyncio.to_thread(assistant.load)
+
+
+def warm_up(assistant_ids: Optional[Iterable[str]] = None) -> None:
+    """Compile the given assistants (all of them by default) ahead of their first request."""
+    for assistant_id in assistant_ids or assistants.keys():
+        try:
+            get_assistant(assistant_id)
+        except Exception:
+            # already logged, the assistant reports the error in its status
+            pass
+
+
+def readiness() -> Dict[str, Dict[str, Any]]:
+    """Load status and init time of every assistant."""
+    return {assistant_id: assistant.status() for assistant_id, assistant in assistants.items()}
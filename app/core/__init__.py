@@ -1,5 +1,6 @@
 from .base import SupportedModel
-from .commons import initiate_model, initiate_embeddings
+from .commons import initiate_model, initiate_embeddings, warm_up_clients, awarm_up_clients
 from .logger import logger
 
-__all__ = ["SupportedModel", "initiate_model", "initiate_embeddings", "logger"]
\ No newline at end of file
+__all__ = ["SupportedModel", "initiate_model", "initiate_embeddings", "warm_up_clients", "awarm_up_clients",
+           "logger"]
\ No newline at end of file
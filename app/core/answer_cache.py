@@ -0,0 +1,245 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import RunnableConfig
+
+from app.core.logger import get_logger
+from app.semantic_search.utils import content_hash
+
+logger = get_logger()
+
+
+@dataclass
+class CachedAnswer:
+    """A CRAG result stored with the embedding of the question that produced it"""
+    question: str
+    embedding: List[float]
+    generation: str
+    documents: List[Document]
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def key(self) -> str:
+        return content_hash(self.question)
+
+
+class InMemoryAnswerCacheBackend:
+    """Answers kept in process memory, in least recently used order"""
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def entries(self) -> List[CachedAnswer]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def put(self, entry: CachedAnswer) -> None:
+        with self._lock:
+            self._entries[entry.key] = entry
+            self._entries.move_to_end(entry.key)
+
+    def touch(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def evict(self, max_entries: int) -> None:
+        with self._lock:
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteAnswerCacheBackend:
+    """Answers persisted in an SQLite file, so the cache survives restarts"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS crag_answers (
+                key TEXT PRIMARY KEY,
+                question TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                generation TEXT NOT NULL,
+                documents TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def entries(self) -> List[CachedAnswer]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question, embedding, generation, documents, created_at FROM crag_answers"
+            ).fetchall()
+        return [
+            CachedAnswer(
+                question=question,
+                embedding=np.frombuffer(embedding, dtype=np.float32).tolist(),
+                generation=generation,
+                documents=[Document(page_content=d["page_content"], metadata=d["metadata"])
+                           for d in json.loads(documents)],
+                created_at=created_at,
+            )
+            for question, embedding, generation, documents, created_at in rows
+        ]
+
+    def put(self, entry: CachedAnswer) -> None:
+        documents = json.dumps([{"page_content": d.page_content, "metadata": d.metadata} for d in entry.documents],
+                               ensure_ascii=False, default=str)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO crag_answers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (entry.key, entry.question, np.asarray(entry.embedding, dtype=np.float32).tobytes(),
+                 entry.generation, documents, entry.created_at, time.time()),
+            )
+            self._conn.commit()
+
+    def touch(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE crag_answers SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM crag_answers WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def evict(self, max_entries: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM crag_answers WHERE key NOT IN "
+                "(SELECT key FROM crag_answers ORDER BY last_access DESC LIMIT ?)",
+                (max_entries,),
+            )
+            self._conn.commit()
+
+
+class SemanticAnswerCache:
+    """
+    Cache of CRAG answers looked up by question embedding.
+
+    A question hits the cache when its cosine similarity with a cached question is above
+    `similarity_threshold` and the entry is younger than `ttl_seconds`.
+    At most `max_entries` answers are kept, least recently used ones are evicted first.
+    """
+
+    def __init__(self,
+                 embeddings: Embeddings,
+                 backend: Optional[Any] = None,
+                 similarity_threshold: float = 0.95,
+                 ttl_seconds: float = 3600,
+                 max_entries: int = 256):
+        self.embeddings = embeddings
+        self.backend = backend or InMemoryAnswerCacheBackend()
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def _best_match(self, embedding: List[float]) -> Optional[CachedAnswer]:
+        now = time.time()
+        entries = []
+        for entry in self.backend.entries():
+            if now - entry.created_at > self.ttl_seconds:
+                self.backend.delete(entry.key)
+            else:
+                entries.append(entry)
+        if not entries:
+            return None
+
+        matrix = np.asarray([entry.embedding for entry in entries], dtype=np.float32)
+        query = np.asarray(embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        similarities = matrix @ query / np.where(norms == 0, 1, norms)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        return entries[best]
+
+    async def alookup(self, question: str) -> tuple[Optional[CachedAnswer], List[float]]:
+        """Return the cached answer for a similar question (or None) and the question embedding"""
+        embedding = await self.embeddings.aembed_query(question)
+        entry = self._best_match(embedding)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.backend.touch(entry.key)
+        logger.debug(f"CRAG answer cache {'hit' if entry else 'miss'}: {self.stats()}")
+        return entry, embedding
+
+    def store(self, question: str, embedding: List[float], generation: str, documents: List[Document]) -> None:
+        self.backend.put(CachedAnswer(question=question, embedding=embedding,
+                                      generation=generation, documents=documents))
+        self.backend.evict(self.max_entries)
+
+
+class CachedCorrectiveRAG:
+    """
+    Corrective RAG graph behind an optional SemanticAnswerCache.
+    On a hit the previous generation and graded documents are returned without running the graph.
+    """
+
+    def __init__(self, graph: Any, cache: Optional[SemanticAnswerCache] = None):
+        self.graph = graph
+        self.cache = cache
+
+    async def ainvoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any):
+        if self.cache is None:
+            return await self.graph.ainvoke(input, config, **kwargs)
+
+        question = input["question"]
+        entry, embedding = await self.cache.alookup(question)
+        if entry is not None:
+            return {"question": question, "generation": entry.generation, "documents": entry.documents}
+
+        res = await self.graph.ainvoke(input, config, **kwargs)
+        self.cache.store(question, embedding, res["generation"], res.get("documents") or [])
+        return res
+
+
+def create_answer_cache(config, embeddings: Embeddings) -> Optional[SemanticAnswerCache]:
+    """Build the answer cache described by the [CorrectiveRAG] section of the configuration"""
+    backend_type = config.get('CorrectiveRAG', 'answer_cache', fallback='none').strip().lower()
+    if backend_type in ('', 'none'):
+        return None
+    if backend_type == 'memory':
+        backend = InMemoryAnswerCacheBackend()
+    elif backend_type == 'sqlite':
+        backend = SQLiteAnswerCacheBackend(
+            config.get('CorrectiveRAG', 'answer_cache_path', fallback='./data/cache/crag_answers.sqlite'))
+    else:
+        raise ValueError(f"Unknown CRAG answer cache backend: {backend_type}")
+
+    return SemanticAnswerCache(
+        embeddings=embeddings,
+        backend=backend,
+        similarity_threshold=config.getfloat('CorrectiveRAG', 'answer_cache_threshold', fallback=0.95),
+        ttl_seconds=config.getfloat('CorrectiveRAG', 'answer_cache_ttl', fallback=3600),
+        max_entries=config.getint('CorrectiveRAG', 'answer_cache_max_entries', fallback=256),
+    )
@@ -1,6 +1,10 @@
+import asyncio
 import os
-from typing import Optional
+import threading
+import weakref
+from typing import Optional, Any, Callable, Dict, Iterable, Tuple
 
+import httpx
 from dotenv import load_dotenv, find_dotenv
 from langchain.chat_models import init_chat_model
 from langchain_anthropic import ChatAnthropic
@@ -24,55 +28,215 @@ def _set_env(var: str, value: str):
 _set_env("OPENAI_API_TYPE", "openai")
 
 
-def initiate_model(model_name: Optional[SupportedModel] = None,
-                   temperature: float = 0.7, tags: Optional[list[str]] = None) -> Optional[BaseChatModel]:
+_OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+_MISTRAL_BASE_URL = os.environ.get("MISTRAL_BASE_URL", "https://api.mistral.ai/v1")
+
+# Keep-alive connections shared by every model of a provider
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+_HTTP_TIMEOUT = httpx.Timeout(120, connect=10)
+
+
+class _LoopBoundAsyncTransport(httpx.AsyncBaseTransport):
     """
-    Initialize the chat model based on the model type.
+    Async transport keeping one connection pool per event loop.
 
-    :param model_name: The name of the model.
-    :param temperature: The temperature of the model.
-    :param tags: Tags to add to the run trace.
-    :return: An instance of BaseChatModel or None if the model type is unsupported.
+    Pooled connections belong to the loop that opened them, while shared models are used from
+    several loops (asyncio.run in sync wrappers, worker threads, test runs).
     """
-    _model_name = model_name.value if model_name else SupportedModel.DEFAULT.value
-    # self.model = model or SupportedModel.MISTRAL_LARGE  # Set a default if I need to
-    if _model_name.startswith("gpt"):
+
+    def __init__(self, limits: httpx.Limits):
+        self._limits = limits
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = self._transports[loop] = httpx.AsyncHTTPTransport(limits=self._limits)
+            return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        with self._lock:
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+# Shared instances, keyed on (kind, model, temperature, tags), and pooled connections per provider
+_registry: Dict[Tuple, Any] = {}
+_http_transports: Dict[str, Tuple[httpx.HTTPTransport, _LoopBoundAsyncTransport]] = {}
+_registry_lock = threading.RLock()
+
+
+def _provider(model_name: str) -> Optional[str]:
+    if model_name.startswith("gpt"):
+        return "openai"
+    elif (model_name.startswith("mistral")
+          or model_name.startswith("ministral")
+          or model_name.startswith("open-mistral")):
+        return "mistral"
+    elif model_name.startswith("claude"):
+        return "anthropic"
+    return None
+
+
+def _get_http_clients(provider: str,
+                      base_url: Optional[str] = None,
+                      headers: Optional[Dict[str, str]] = None) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """Return new (sync, async) http clients over the pooled connections of a provider."""
+    with _registry_lock:
+        if provider not in _http_transports:
+            _http_transports[provider] = (httpx.HTTPTransport(limits=_HTTP_LIMITS),
+                                          _LoopBoundAsyncTransport(_HTTP_LIMITS))
+        transport, async_transport = _http_transports[provider]
+    kwargs: Dict[str, Any] = {"timeout": _HTTP_TIMEOUT}
+    if base_url:
+        kwargs["base_url"] = base_url
+    if headers:
+        kwargs["headers"] = headers
+    return httpx.Client(transport=transport, **kwargs), httpx.AsyncClient(transport=async_transport, **kwargs)
+
+
+def _get_mistral_http_clients(api_key: str) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """langchain_mistralai uses the given clients as is: bind them to the API with the key of the model"""
+    return _get_http_clients("mistral", base_url=_MISTRAL_BASE_URL, headers={
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Authorization": f"Bearer {api_key}",
+    })
+
+
+def _mistral_api_key() -> str:
+    # read when the model is created, not when this module is imported
+    return os.environ.get("MISTRAL_API_KEY", "")
+
+
+def _shared(key: Tuple, factory: Callable[[], Any], shared: bool) -> Any:
+    if not shared:
+        return factory()
+    with _registry_lock:
+        if key not in _registry:
+            instance = factory()
+            if instance is None:
+                return None
+            _registry[key] = instance
+        return _registry[key]
+
+
+def _create_model(_model_name: str, temperature: float, tags: Optional[list[str]]) -> Optional[BaseChatModel]:
+    provider = _provider(_model_name)
+    if provider == "openai":
         # naming of model parameter (alias) is inconsistent in mistral and openAI
         reasoning_effort = None
         verbosity = None
         if _model_name.startswith("gpt-5"):
             reasoning_effort = "low"
             verbosity = "low"
-        return ChatOpenAI(model=_model_name, temperature=temperature, tags=tags, reasoning_effort=reasoning_effort, verbosity=verbosity)
-    elif (_model_name.startswith("mistral")
-          or _model_name.startswith("ministral")
-          or _model_name.startswith("open-mistral")):
+        http_client, http_async_client = _get_http_clients(provider)
+        return ChatOpenAI(model=_model_name, temperature=temperature, tags=tags,
+                          reasoning_effort=reasoning_effort, verbosity=verbosity,
+                          http_client=http_client, http_async_client=http_async_client)
+    elif provider == "mistral":
         # naming of model parameter (alias) is inconsistent in mistral and openAI
-        return ChatMistralAI(model_name=_model_name, temperature=temperature, tags=tags) #, api_key=mistral_api_key)
-    elif _model_name.startswith("claude"):
+        api_key = _mistral_api_key()
+        client, async_client = _get_mistral_http_clients(api_key)
+        return ChatMistralAI(model_name=_model_name, temperature=temperature, tags=tags, api_key=api_key,
+                             client=client, async_client=async_client)
+    elif provider == "anthropic":
         # naming of model parameter (alias) is inconsistent in mistral and openAI
         return init_chat_model(model_provider="anthropic", model=_model_name, temperature=temperature, tags=tags) #, api_key=mistral_api_key)
     logger.warning(f"Invalid or unsupported model type: {_model_name}")
     return None
 
 
-def initiate_embeddings(model_name: Optional[SupportedModel] = None) -> Optional[Embeddings]:
+def initiate_model(model_name: Optional[SupportedModel] = None,
+                   temperature: float = 0.7, tags: Optional[list[str]] = None,
+                   shared: bool = True) -> Optional[BaseChatModel]:
+    """
+    Initialize the chat model based on the model type.
+
+    Instances are shared by default: calls with the same model, temperature and tags
+    return the same object, backed by the pooled http client of its provider.
+
+    :param model_name: The name of the model.
+    :param temperature: The temperature of the model.
+    :param tags: Tags to add to the run trace.
+    :param shared: Return the shared instance instead of a new one.
+    :return: An instance of BaseChatModel or None if the model type is unsupported.
+    """
+    _model_name = model_name.value if model_name else SupportedModel.DEFAULT.value
+    key = ("chat", _model_name, temperature, tuple(tags or ()))
+    return _shared(key, lambda: _create_model(_model_name, temperature, tags), shared)
+
+
+def _create_embeddings(_model_name: str) -> Optional[Embeddings]:
+    provider = _provider(_model_name)
+    if provider == "openai":
+        http_client, http_async_client = _get_http_clients(provider)
+        return OpenAIEmbeddings(http_client=http_client, http_async_client=http_async_client)
+    elif provider in ("mistral", "anthropic"):
+        # return VoyageAIEmbeddings(model="voyage-3.5-lite") for anthropic
+        api_key = _mistral_api_key()
+        client, async_client = _get_mistral_http_clients(api_key)
+        return MistralAIEmbeddings(api_key=api_key, client=client, async_client=async_client)
+    print(f"Invalid or unsupported model type for embeddings: {_model_name}")
+    return None
+
+
+def initiate_embeddings(model_name: Optional[SupportedModel] = None,
+                        shared: bool = True) -> Optional[Embeddings]:
     """
     Initialize the embeddings model based on the model type.
 
     :param model_name: The name of the model.
+    :param shared: Return the shared instance instead of a new one.
     :return: An instance of Embeddings or None if the model type is unsupported.
     """
-    _model_name = model_name.value or None
-    if _model_name.startswith("gpt"):
-        return OpenAIEmbeddings()
-    elif (_model_name.startswith("mistral")
-          or _model_name.startswith("ministral")
-          or _model_name.startswith("open-mistral")):
-        return MistralAIEmbeddings()
-    elif _model_name.startswith("claude"):
-        # return VoyageAIEmbeddings(model="voyage-3.5-lite")
-        return MistralAIEmbeddings()
-    print(f"Invalid or unsupported model type for embeddings: {model_name}")
-    return None
+    _model_name = model_name.value if model_name else SupportedModel.DEFAULT.value
+    provider = _provider(_model_name)
+    key = ("embeddings", "mistral" if provider == "anthropic" else provider)
+    return _shared(key, lambda: _create_embeddings(_model_name), shared)
+
+
+def _warm_up_urls(model_names: Iterable[SupportedModel]) -> Dict[str, str]:
+    """Create the shared models and embeddings, and return the provider base urls to connect to."""
+    urls = {}
+    for model_name in model_names:
+        initiate_model(model_name)
+        initiate_embeddings(model_name)
+        provider = _provider(model_name.value)
+        if provider == "openai":
+            urls[provider] = _OPENAI_BASE_URL
+        elif provider in ("mistral", "anthropic"):
+            urls["mistral"] = _MISTRAL_BASE_URL
+    return urls
+
+
+def warm_up_clients(model_names: Iterable[SupportedModel]) -> None:
+    """
+    Create the shared instances of the given models and open a keep-alive connection
+    to their providers, so the first request does not pay the TLS handshake.
+    """
+    for provider, url in _warm_up_urls(model_names).items():
+        client, _ = _get_http_clients(provider)
+        try:
+            # the connection is kept in the pool of the provider, shared by the model clients
+            client.head(url)
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not warm up {provider} connection: {e}")
+
 
+async def awarm_up_clients(model_names: Iterable[SupportedModel]) -> None:
+    """Asynchronous version of warm_up_clients, warming the connection pools of the running loop."""
+    for provider, url in _warm_up_urls(model_names).items():
+        _, async_client = _get_http_clients(provider)
+        try:
+            await async_client.head(url)
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not warm up {provider} connection: {e}")
@@ -1,4 +1,5 @@
 import logging
+import os
 
 root_logger = logging.getLogger()
 
@@ -38,6 +39,8 @@ def setup_logger(name: str, filepath: str, stream_level: int = logging.INFO,
         stream_handler.setFormatter(stream_formatter)
         stream_handler.setLevel(stream_level)
 
+        # logs/ is not versioned, create it on first run
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
         file_handler = logging.FileHandler(filepath)
         file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         file_handler.setFormatter(file_formatter)
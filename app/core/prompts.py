@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from langchain_core.load import dumpd, load
+from langchain_core.prompts import (AIMessagePromptTemplate, BasePromptTemplate, ChatPromptTemplate,
+                                    HumanMessagePromptTemplate, MessagesPlaceholder, PromptTemplate,
+                                    SystemMessagePromptTemplate)
+
+from app.core.config_loader import load_config
+from app.core.logger import logger
+
+
+# classes a snapshot may contain: a snapshot is data, it must not instantiate anything else
+_SNAPSHOT_CLASSES = [ChatPromptTemplate, PromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate,
+                     AIMessagePromptTemplate, MessagesPlaceholder]
+
+
+def _pull_from_hub(name: str) -> Any:
+    # imported here, langchain hub pulls the LangSmith client
+    from langchain import hub
+    return hub.pull(name)
+
+
+class PromptRegistry:
+    """
+    Prompts of the LangChain hub / LangSmith, kept in memory and snapshotted on disk.
+
+    A prompt is pulled once, then served from memory. When its TTL expires the cached prompt is
+    still returned and a refresh is done in the background. Each pulled version is saved in the
+    snapshot directory (one directory per prompt, one file per version), so a start without
+    network or with a slow LangSmith uses the last snapshot instead of waiting for a pull.
+
+    Snapshots only load prompt templates, and never read secrets from the environment.
+    A refreshed prompt is returned by the next get: agents that build their chain once, in their
+    constructor, keep the version they got then, while callers resolving the prompt on each call
+    (like the video script planning node with aget_prompt) follow the refreshes.
+    """
+
+    def __init__(self,
+                 snapshot_directory: Optional[str] = None,
+                 ttl_seconds: float = 3600,
+                 pull: Callable[[str], Any] = _pull_from_hub):
+        """
+        Args:
+            snapshot_directory: Directory of the prompt snapshots, no snapshot if None
+            ttl_seconds: Seconds after which a prompt is refreshed in the background
+            pull: Function pulling a prompt by name
+        """
+        self.snapshot_directory = snapshot_directory
+        self.ttl_seconds = ttl_seconds
+        self._pull = pull
+        # name -> (prompt, time it was pulled, 0 when loaded from a snapshot)
+        self._prompts: Dict[str, Tuple[Any, float]] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prompt-refresh")
+
+    def _snapshot_dir(self, name: str) -> str:
+        return os.path.join(self.snapshot_directory, re.sub(r"[^\w.-]", "_", name))
+
+    def _load_snapshot(self, name: str) -> Optional[Any]:
+        if not self.snapshot_directory:
+            return None
+        directory = self._snapshot_dir(name)
+        try:
+            with open(os.path.join(directory, "LATEST"), "r", encoding="utf-8") as file:
+                version = file.read().strip()
+            with open(os.path.join(directory, f"{version}.json"), "r", encoding="utf-8") as file:
+                prompt = load(json.load(file), allowed_objects=_SNAPSHOT_CLASSES, secrets_from_env=False)
+            if not isinstance(prompt, BasePromptTemplate):
+                raise ValueError(f"snapshot '{version}' is not a prompt template")
+            return prompt
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Could not load snapshot of prompt '{name}': {e}")
+            return None
+
+    def _save_snapshot(self, name: str, prompt: Any) -> None:
+        if not self.snapshot_directory:
+            return
+        content = dumpd(prompt)
+        metadata = getattr(prompt, "metadata", None) or {}
+        version = metadata.get("lc_hub_commit_hash") or hashlib.sha256(
+            json.dumps(content, sort_keys=True).encode()).hexdigest()[:16]
+        directory = self._snapshot_dir(name)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{version}.json")
+        if not os.path.exists(path):
+            with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+                json.dump(content, file, indent=1)
+            os.replace(f"{path}.tmp", path)
+            logger.info(f"Saved snapshot '{version}' of prompt '{name}'")
+        with open(os.path.join(directory, "LATEST.tmp"), "w", encoding="utf-8") as file:
+            file.write(version)
+        os.replace(os.path.join(directory, "LATEST.tmp"), os.path.join(directory, "LATEST"))
+
+    def refresh(self, name: str) -> Any:
+        """Pull a prompt, cache it and snapshot it"""
+        start = time.perf_counter()
+        prompt = self._pull(name)
+        logger.info(f"Pulled prompt '{name}' in {time.perf_counter() - start:.2f}s")
+        with self._lock:
+            self._prompts[name] = (prompt, time.time())
+        try:
+            self._save_snapshot(name, prompt)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not save snapshot of prompt '{name}': {e}")
+        return prompt
+
+    def _background_refresh(self, name: str) -> None:
+        try:
+            self.refresh(name)
+        except Exception as e:
+            logger.warning(f"Could not refresh prompt '{name}', keeping the cached one: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(name)
+
+    def _schedule_refresh(self, name: str) -> None:
+        with self._lock:
+            if name in self._refreshing:
+                return
+            self._refreshing.add(name)
+        self._executor.submit(self._background_refresh, name)
+
+    def get(self, name: str) -> Any:
+        """
+        Return a prompt from memory, or from its snapshot, pulling it only when there is neither.
+        Expired prompts and prompts loaded from a snapshot are refreshed in the background.
+        """
+        with self._lock:
+            cached = self._prompts.get(name)
+        if cached is None:
+            snapshot = self._load_snapshot(name)
+            if snapshot is None:
+                return self.refresh(name)
+            logger.info(f"Loaded prompt '{name}' from its snapshot")
+            cached = (snapshot, 0.0)
+            with self._lock:
+                cached = self._prompts.setdefault(name, cached)
+
+        prompt, pulled_at = cached
+        if time.time() - pulled_at > self.ttl_seconds:
+            self._schedule_refresh(name)
+        return prompt
+
+    async def aget(self, name: str) -> Any:
+        """get without blocking the event loop when the prompt has to be loaded"""
+        with self._lock:
+            cached = self._prompts.get(name)
+        if cached is not None:
+            return self.get(name)
+        return await asyncio.to_thread(self.get, name)
+
+    def preload(self, names: Iterable[str]) -> None:
+        """Load prompts at startup, so the first request does not pay a download"""
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"Could not load prompt '{name}': {e}")
+
+
+_config = load_config()
+
+prompt_registry = PromptRegistry(
+    snapshot_directory=_config.get('Prompts', 'snapshot_directory', fallback="./data/prompts"),
+    ttl_seconds=_config.getfloat('Prompts', 'ttl', fallback=3600),
+)
+
+
+def get_prompt(name: str) -> Any:
+    """Prompt of the shared registry, see PromptRegistry.get"""
+    return prompt_registry.get(name)
+
+
+async def aget_prompt(name: str) -> Any:
+    """Prompt of the shared registry, see PromptRegistry.aget"""
+    return await prompt_registry.aget(name)
@@ -1,7 +1,7 @@
 from .state import CragAgentState
 from .agents import retriever, retrieval_grader, rag_chain, question_rewriter, web_search_tool
 from .tasks import decide_to_generate, retrieve, grade_documents, generate, transform_query, web_search
-from .workflow import corrective_rag_graph
+from .workflow import corrective_rag_graph, corrective_rag
 
 __all__ = ["CragAgentState",
            "decide_to_generate",
@@ -10,5 +10,5 @@ __all__ = ["CragAgentState",
            "retriever",
            "retrieval_grader",
            "rag_chain", "question_rewriter",
-           "corrective_rag_graph",
+           "corrective_rag_graph", "corrective_rag",
            "web_search_tool"]
\ No newline at end of file
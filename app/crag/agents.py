@@ -1,7 +1,7 @@
 from pathlib import Path
-from typing import Union, List, Dict, Any
+from typing import Union, List, Dict, Any, Optional
 
-from langchain import hub
+from app.core.prompts import get_prompt
 from langchain_chroma import Chroma
 from langchain_community.document_loaders import WebBaseLoader
 from langchain_tavily import TavilySearch
@@ -10,7 +10,7 @@ from langchain_core.embeddings import Embeddings
 from langchain_core.language_models import BaseChatModel
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableSerializable
+from langchain_core.runnables import RunnableSerializable, RunnableConfig
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from pydantic import Field, BaseModel
 
@@ -32,6 +32,11 @@ _model_name = _config.get('CorrectiveRAG', 'model', fallback="MISTRAL_SMALL")
 
 model_name = SupportedModel[_model_name]
 
+# Relevance grading: max concurrent grader calls, and number of relevant documents
+# after which grading stops (0 grades every document)
+grading_concurrency = _config.getint('CorrectiveRAG', 'grading_concurrency', fallback=4)
+grading_min_relevant = _config.getint('CorrectiveRAG', 'grading_min_relevant', fallback=0)
+
 model = initiate_model(model_name)
 embeddings = initiate_embeddings(model_name)
 
@@ -105,11 +110,11 @@ class Retriever2(Agent):
     #     return self.search_strategy.retrieve
 
 
-    def invoke(self, input: Input, **kwargs: Any) -> Output:
+    def invoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
         response = self.search_strategy.retrieve(input)
         return response
     
-    async def ainvoke(self, input: Input, **kwargs: Any) -> Output:
+    async def ainvoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
         response = await self.search_strategy.aretrieve(input)
         return response
 
@@ -172,7 +177,7 @@ class RAGChain(AbstractAgent):
     def _initiate_runnable(self):
         # GENERATE
 
-        prompt = hub.pull("rlm/rag-prompt")
+        prompt = get_prompt("rlm/rag-prompt")
 
         # Post-processing
         def format_docs(docs):
@@ -186,12 +191,14 @@ class RAGChain(AbstractAgent):
 
 
 
-search = SemanticSearchFactory.create_strategy(
-    SearchStrategyType.SIMPLE_VECTOR,
-    embeddings,
-    kwargs={"collection_name": "simple-vector-store"}
+search = VectorStoreManager.get_or_create(
+    "crag",
+    lambda: SemanticSearchFactory.create_strategy(
+        SearchStrategyType.SIMPLE_VECTOR,
+        embeddings,
+        collection_name="simple-vector-store"
+    )
 )
-VectorStoreManager(search)
 
 # Pre-load documents from config
 preload_urls = _config.get('CorrectiveRAG', 'preload_urls', fallback='').split(',')
@@ -202,7 +209,11 @@ if preload_urls and preload_urls[0].strip():  # Check not empty
     
     try:
         # Load with smaller chunks to avoid token limits
-        docs = DocumentLoader.load_from_urls([url.strip() for url in preload_urls], chunk_size=500)
+        docs = DocumentLoader.load_from_urls(
+            [url.strip() for url in preload_urls],
+            chunk_size=500,
+            cache_dir=_config.get('CorrectiveRAG', 'url_cache_directory', fallback=None)
+        )
         
         # Add in batches to handle embedding API limits
         batch_size = 50
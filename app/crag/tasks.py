@@ -1,6 +1,10 @@
+import asyncio
+from typing import List, Optional
+
 from langchain_core.documents import Document
 
 from app.crag import retriever, rag_chain, retrieval_grader, question_rewriter, web_search_tool, CragAgentState
+from app.crag.agents import grading_concurrency, grading_min_relevant
 
 
 async def retrieve(state: CragAgentState):
@@ -40,10 +44,53 @@ async def generate(state: CragAgentState):
     return {"documents": documents, "question": question, "generation": generation}
 
 
+async def _grade_document(question: str, document: Document, semaphore: asyncio.Semaphore) -> str:
+    """Grade one document, bounded by the shared semaphore"""
+    async with semaphore:
+        score = await retrieval_grader.ainvoke(
+            {"question": question, "document": document.page_content}
+        )
+    return score.binary_score
+
+
+async def _grade_all(question: str, documents: List[Document],
+                     concurrency: int, min_relevant: int) -> List[Optional[str]]:
+    """
+    Grade documents concurrently, at most `concurrency` at a time.
+    If `min_relevant` > 0, grading stops as soon as that many documents are relevant;
+    documents left ungraded get a None grade.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    grades: List[Optional[str]] = [None] * len(documents)
+
+    async def _indexed_grade(index: int, document: Document):
+        return index, await _grade_document(question, document, semaphore)
+
+    tasks = [asyncio.create_task(_indexed_grade(i, d)) for i, d in enumerate(documents)]
+    relevant = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, grade = await next_done
+            grades[index] = grade
+            if grade == "yes":
+                relevant += 1
+                if 0 < min_relevant <= relevant:
+                    print(f"---GRADE: {relevant} RELEVANT DOCUMENTS FOUND, STOP GRADING---")
+                    break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return grades
+
+
 async def grade_documents(state: CragAgentState):
     """
     Determines whether the retrieved documents are relevant to the question.
 
+    Documents are graded concurrently (see [CorrectiveRAG] grading_concurrency)
+    and kept in retrieval order.
+
     Args:
         state (dict): The current graph state
 
@@ -65,13 +112,13 @@ async def grade_documents(state: CragAgentState):
         }
 
     # Score each doc
+    grades = await _grade_all(question, documents, grading_concurrency, grading_min_relevant)
     filtered_docs = []
     web_search = "No"
-    for d in documents:
-        score = await retrieval_grader.ainvoke(
-            {"question": question, "document": d.page_content}
-        )
-        grade = score.binary_score
+    for d, grade in zip(documents, grades):
+        if grade is None:
+            # Not graded, enough relevant documents were found
+            continue
         if grade == "yes":
             print("---GRADE: DOCUMENT RELEVANT---")
             filtered_docs.append(d)
@@ -2,8 +2,11 @@ from langgraph.checkpoint.memory import MemorySaver
 from langgraph.constants import START, END
 from langgraph.graph import StateGraph
 
+from app.core.config_loader import load_config
 from app.crag import CragAgentState
 from app.crag import decide_to_generate, retrieve, grade_documents, generate, transform_query, web_search
+from app.crag.agents import embeddings
+from app.core.answer_cache import CachedCorrectiveRAG, create_answer_cache
 
 workflow = StateGraph(CragAgentState)
 
@@ -67,4 +70,7 @@ workflow.add_edge("web_search_node", "generate")
 workflow.add_edge("generate", END)
 # workflow.add_edge("rewrite", "agent")
 
-corrective_rag_graph = workflow.compile()  # checkpointer=memory
\ No newline at end of file
+corrective_rag_graph = workflow.compile()  # checkpointer=memory
+
+# Graph behind the optional semantic answer cache ([CorrectiveRAG] answer_cache)
+corrective_rag = CachedCorrectiveRAG(corrective_rag_graph, create_answer_cache(load_config(), embeddings))
\ No newline at end of file
@@ -1,12 +1,11 @@
 import json
 import os
-import sqlite3
+import threading
 from pathlib import Path
 from typing import Optional, List, Union, Dict
 
-from langchain import hub
+from app.core.prompts import get_prompt
 from langchain.agents import create_structured_chat_agent, AgentExecutor
-from langchain_chroma import Chroma
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 
@@ -14,20 +13,26 @@ from langchain_core.language_models import BaseChatModel
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from langchain_core.runnables import RunnableSerializable, RunnableMap
+from langchain_core.vectorstores import VectorStoreRetriever
 from langchain_core.tools import tool
 from pydantic import BaseModel, HttpUrl
 
-from app.core.commons import initiate_model, initiate_embeddings
+from app.core.commons import initiate_model
 from app.core.base import SupportedModel
 from app.ai_agents import AbstractAgent, SimpleRAGAgent
 from app.core.config_loader import load_config
 from app.core.logger import logger
+from app.customer_onboarding.problem_db import get_problem_database
 
 
 _config = load_config()
 _problem_directory = _config.get('ProblemSolverAgent', 'problem_directory')
 _problem_database = _config.get('ProblemSolverAgent', 'problem_database')
 _problem_db_path = os.path.join(_problem_directory, _problem_database)
+# derived full-text search database, the problem database itself is never written to
+_problem_index_path = os.path.join(
+    _config.get('ProblemSolverAgent', 'problem_index_directory', fallback='./data/cache'),
+    f"{os.path.splitext(_problem_database)[0]}_search.sqlite")
 
 
 class FAQItem(BaseModel):
@@ -54,16 +59,51 @@ def format_docs(docs):
     return "\n\n".join([d.page_content for d in docs])
 
 
+def load_error_documents(problem_file_path: Union[str, Path]) -> List[Document]:
+    """Load the error database JSON file as one document per error."""
+    with open(problem_file_path, 'r', encoding='utf-8') as file:
+        error_db = json.load(file)
+
+    error_items = [ErrorItem(**item) for item in error_db["errors"]]
+
+    # Extract and process each entry to create documents
+    return [
+        Document(
+            page_content=(
+                f"Code: {entry.code}\n"
+                f"Category: {entry.category}\n"
+                f"Subcategory: {entry.subcategory}\n"
+                f"Description: {entry.description}\n"
+                f"Details: {entry.details}\n"
+                f"Diagnostic Questions: {', '.join(entry.diagnostic_questions)}\n"
+                f"Resolution: {entry.resolution}\n"
+                f"Search Keys: {', '.join(entry.search_keys)}"
+            ),
+            metadata={
+                "code": entry.code,
+                "category": entry.category,
+                "subcategory": entry.subcategory,
+                # "search_keys": entry.search_keys
+            }
+        ) for entry in error_items
+    ]
+
+
 class FAQAgent(SimpleRAGAgent):
+    _collection_prefix = "faq_agent"
+
     def __init__(self,
                  name: str,
                  model: BaseChatModel,
                  embeddings: Embeddings,
                  source_paths: Path,
+                 persist_directory: Optional[str] = None,
+                 context_max_tokens: int = 1000,
+                 fetch_k: int = 20,
                  ):
-        import time
-        collection_name = f"faq_agent_{int(time.time())}"
-        super().__init__(name=name, model=model, embeddings=embeddings, source_paths=source_paths, collection_name=collection_name)
+        super().__init__(name=name, model=model, embeddings=embeddings, source_paths=source_paths,
+                         persist_directory=persist_directory, context_max_tokens=context_max_tokens,
+                         fetch_k=fetch_k)
         # super().set_runnable(self._initiate_runnable())
 
     def _initiate_docs(self, source_paths: Union[Path, List[Path]]) -> Dict[Path, List[Document]]:
@@ -180,67 +220,23 @@ def search_errors_in_db(
     - code (Optional[str]): The error code to search for.
     - category (Optional[str]): The error category to search for.
     - subcategory (Optional[str]): The error subcategory to search for.
-    - search_keys (Optional[str]): The search keys to search for.
+    - search_keys (Optional[str]): Keywords to search for, matches are ranked by relevance.
     - limit (int): The maximum number of results to return.
 
     Returns:
     - List[dict]: A list of dictionaries representing the matching errors.
     """
 
-    conn = sqlite3.connect(_problem_db_path)
-    cursor = conn.cursor()
-
-    query = "SELECT * FROM errors WHERE 1 = 1"
-    params = []
-
-    if code:
-        query += " AND code = ?"
-        params.append(code)
-    if category:
-        query += " AND category = ?"
-        params.append(category)
-    if subcategory:
-        query += " AND subcategory = ?"
-        params.append(subcategory)
-    if search_keys:
-        query += " AND search_keys LIKE ?"
-        params.append(f"%{search_keys}%")
-
-    query += " LIMIT ?"
-    params.append(limit)
-
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    column_names = [column[0] for column in cursor.description]
-    results = [dict(zip(column_names, row)) for row in rows]
-
-    cursor.close()
-    conn.close()
-
-    return results
-
-
-@tool
-def search_errors_in_vectordb(
-    question: str
-) -> str:
-    """
-    Search for errors based on description, details, diagnostic questions, or resolution by semantic similarities.
-    Useful when you **DON'T** have error code to look up answer but have description of the problem.
-    """
-    model = initiate_model(SupportedModel.DEFAULT)
-    embeddings = initiate_embeddings(SupportedModel.DEFAULT)
-    import time
-    collection_name = f"errors_tool_search_{int(time.time())}"
-    vectorstore = Chroma(
-        collection_name=collection_name,
-        embedding_function=embeddings
+    return get_problem_database(_problem_db_path, _problem_index_path).search(
+        code=code,
+        category=category,
+        subcategory=subcategory,
+        search_keys=search_keys,
+        limit=limit,
     )
-    retriever = vectorstore.as_retriever(
-        search_type="similarity_score_threshold",
-        search_kwargs={"score_threshold": 0.5})
 
-    template = """Answer the question between triple single quotes based only on the following <Context/>.
+
+_ERROR_SEARCH_TEMPLATE = """Answer the question between triple single quotes based only on the following <Context/>.
             
             # Instructions
             - Respond in the same language as the question.
@@ -255,14 +251,67 @@ def search_errors_in_vectordb(
             # Question: 
             '''{question}'''
             """
-    prompt = ChatPromptTemplate.from_template(template)
-    output_parser = StrOutputParser()
-    chain = RunnableMap({
-        "context": lambda x: '\n\n'.join([doc.page_content for doc in retriever.invoke(x["question"])]),
-        "question": lambda x: x["question"],
-    }) | prompt | model | output_parser
 
-    return chain.invoke({"question": question})
+
+class ErrorSearchIndex:
+    """
+    Process-wide error retrieval chain behind search_errors_in_vectordb.
+
+    The ProblemSolverAgent registers the retriever over the error documents it indexed in its
+    persisted collection, so the errors are embedded and stored once. Using the tool before any
+    ProblemSolverAgent is created is an error.
+    The chain is built once and shared by every tool call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._retriever: Optional[VectorStoreRetriever] = None
+        self._model: Optional[BaseChatModel] = None
+        self._chain: Optional[RunnableSerializable] = None
+
+    def register(self, retriever: VectorStoreRetriever, model: BaseChatModel) -> None:
+        with self._lock:
+            self._retriever = retriever
+            self._model = model
+            self._chain = None
+
+    def _build_chain(self) -> RunnableSerializable:
+        if self._retriever is None:
+            raise RuntimeError("search_errors_in_vectordb has no error index: create the ProblemSolverAgent first,"
+                               " it registers the retriever over its persisted error collection")
+        if self._model is None:
+            self._model = initiate_model(SupportedModel.DEFAULT)
+
+        retriever = self._retriever
+        prompt = ChatPromptTemplate.from_template(_ERROR_SEARCH_TEMPLATE)
+        output_parser = StrOutputParser()
+        return RunnableMap({
+            "context": lambda x: format_docs(retriever.invoke(x["question"])),
+            "question": lambda x: x["question"],
+        }) | prompt | self._model | output_parser
+
+    def get_chain(self) -> RunnableSerializable:
+        chain = self._chain
+        if chain is None:
+            with self._lock:
+                if self._chain is None:
+                    self._chain = self._build_chain()
+                chain = self._chain
+        return chain
+
+
+error_search_index = ErrorSearchIndex()
+
+
+@tool
+def search_errors_in_vectordb(
+    question: str
+) -> str:
+    """
+    Search for errors based on description, details, diagnostic questions, or resolution by semantic similarities.
+    Useful when you **DON'T** have error code to look up answer but have description of the problem.
+    """
+    return error_search_index.get_chain().invoke({"question": question})
 
 
 class ProblemSolverAgent(SimpleRAGAgent):
@@ -273,6 +322,8 @@ class ProblemSolverAgent(SimpleRAGAgent):
     We don't use a RAG chain but use function calling instead.
     We are using the RAGAgent to load error_db.json and initiate the vector database that is use as tool.
     """
+    _collection_prefix = "problem_agent_errors"
+
     def __init__(self,
                  name: str,
                  model: BaseChatModel,
@@ -285,9 +336,11 @@ class ProblemSolverAgent(SimpleRAGAgent):
         self.problem_directory = Path(problem_directory)
         self.problem_file = Path(problem_file)
         self.source_paths = self.problem_directory / self.problem_file
-        import time
-        collection_name = f"problem_agent_errors_{int(time.time())}"
-        super().__init__(name=name, model=model, embeddings=embeddings, source_paths=self.source_paths, collection_name=collection_name)
+        # the retriever feeds search_errors_in_vectordb, keep its default number of documents
+        super().__init__(name=name, model=model, embeddings=embeddings, source_paths=self.source_paths,
+                         persist_directory=persist_directory, fetch_k=4)
+        # search_errors_in_vectordb queries the errors indexed by this agent
+        error_search_index.register(self.retriever, self.model)
 
     def _initiate_docs(self, source_paths: Union[Path, List[Path]]) -> Dict[Path, List[Document]]:
         source_to_docs = {}
@@ -295,35 +348,7 @@ class ProblemSolverAgent(SimpleRAGAgent):
             logger.debug("Initiating Docs")
             # Ensure the JSON file path is correct
             problem_file_path = os.path.join(self.problem_directory, self.problem_file)
-
-            # Load data from the JSON file
-            with open(problem_file_path, 'r', encoding='utf-8') as file:
-                error_db = json.load(file)
-
-                error_items = [ErrorItem(**item) for item in error_db["errors"]]
-
-                # Extract and process each entry to create documents
-                documents = [
-                    Document(
-                        page_content=(
-                            f"Code: {entry.code}\n"
-                            f"Category: {entry.category}\n"
-                            f"Subcategory: {entry.subcategory}\n"
-                            f"Description: {entry.description}\n"
-                            f"Details: {entry.details}\n"
-                            f"Diagnostic Questions: {', '.join(entry.diagnostic_questions)}\n"
-                            f"Resolution: {entry.resolution}\n"
-                            f"Search Keys: {', '.join(entry.search_keys)}"
-                        ),
-                        metadata={
-                            "code": entry.code,
-                            "category": entry.category,
-                            "subcategory": entry.subcategory,
-                            # "search_keys": entry.search_keys
-                        }
-                    ) for entry in error_items
-                ]
-                source_to_docs[source_paths] = documents
+            source_to_docs[source_paths] = load_error_documents(problem_file_path)
         except Exception as e:
             # Log the error and return an empty list
             logger.error(f"Error loading error database: {e}")
@@ -334,7 +359,7 @@ class ProblemSolverAgent(SimpleRAGAgent):
     def _initiate_runnable(self) -> RunnableSerializable:
         lc_tools = [search_errors_in_db, search_errors_in_vectordb]
 
-        prompt = hub.pull("hwchase17/structured-chat-agent")
+        prompt = get_prompt("hwchase17/structured-chat-agent")
 
         agent = create_structured_chat_agent(self.model, lc_tools, prompt)
         # Create the agent executor
@@ -3,7 +3,8 @@ from typing import Optional, Annotated
 
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
-from langchain_core.tools import tool
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import StructuredTool
 
 from dotenv import load_dotenv, find_dotenv
 from langgraph.graph import StateGraph, START, END
@@ -16,8 +17,8 @@ from app.core.commons import initiate_model, initiate_embeddings
 from app.core.base import SupportedModel
 from app.core.logger import get_logger
 from app.customer_onboarding.agents import FAQAgent, EligibilityAgent, ProblemSolverAgent
+from app.customer_onboarding.checkpointer import create_checkpointer
 from app.customer_onboarding.state import State
-from langgraph.checkpoint.memory import MemorySaver
 
 from langgraph.graph.message import MessagesState
 from langgraph.prebuilt import ToolNode, tools_condition
@@ -36,6 +37,8 @@ _config = load_config()
 _chroma_persist_directory = _config.get('Retrieval', 'persist_directory')
 # FAQ SETUP
 _faq_file = Path(_config.get('FAQAgent', 'faq_file'))
+_faq_context_max_tokens = _config.getint('FAQAgent', 'context_max_tokens', fallback=1000)
+_faq_fetch_k = _config.getint('FAQAgent', 'fetch_k', fallback=20)
 
 # PROBLEM SETUP
 _problem_directory = _config.get('ProblemSolverAgent', 'problem_directory')
@@ -82,10 +85,12 @@ __langgraph_chat_agent__ = '''You are an customer onboarding AI chatbot for an o
 faq_agent = FAQAgent(name="FAQAgent",
                      model=model,
                      embeddings=embeddings,
-                     source_paths=_faq_file)
+                     source_paths=_faq_file,
+                     persist_directory=_chroma_persist_directory,
+                     context_max_tokens=_faq_context_max_tokens,
+                     fetch_k=_faq_fetch_k)
 
-@tool
-def faq_answerer(
+def _faq_answerer(
         input: Annotated[str, "User input which could be a question or an answer."]
 ) -> str:
     """
@@ -96,10 +101,19 @@ def faq_answerer(
     return faq_agent.invoke(input={"question": input})
 
 
+async def _afaq_answerer(
+        input: Annotated[str, "User input which could be a question or an answer."]
+) -> str:
+    return await faq_agent.ainvoke(input={"question": input})
+
+
+# sync and async implementations: the graph runs the async one when streamed by the server
+faq_answerer = StructuredTool.from_function(func=_faq_answerer, coroutine=_afaq_answerer, name="faq_answerer")
+
+
 eligibility_agent = EligibilityAgent(name="EligibilityAgent", model=model)
 
-@tool
-def eligibility_checker(
+def _eligibility_checker(
         nationality: Annotated[str, "Nationality"],
         country_of_tax_residence: Annotated[str, "Country of Tax Residence"],
         has_an_european_bank_account: Annotated[bool, "Has an European bank account"],
@@ -116,6 +130,22 @@ def eligibility_checker(
                                            "age": age})
 
 
+async def _aeligibility_checker(
+        nationality: Annotated[str, "Nationality"],
+        country_of_tax_residence: Annotated[str, "Country of Tax Residence"],
+        has_an_european_bank_account: Annotated[bool, "Has an European bank account"],
+        age: Annotated[int, "Age"],
+) -> str:
+    return await eligibility_agent.ainvoke(input={"nationalite": nationality,
+                                                  "pays_de_residence_fiscale": country_of_tax_residence,
+                                                  "est_titulaire_compte_bancaire": has_an_european_bank_account,
+                                                  "age": age})
+
+
+eligibility_checker = StructuredTool.from_function(func=_eligibility_checker, coroutine=_aeligibility_checker,
+                                                   name="eligibility_checker")
+
+
 problem_solver_agent = ProblemSolverAgent(name="problem-solver",
                                           model=model,
                                           embeddings=embeddings,
@@ -123,8 +153,7 @@ problem_solver_agent = ProblemSolverAgent(name="problem-solver",
                                           persist_directory=_chroma_persist_directory,
                                           problem_file=_problem_file)
 
-@tool
-def problem_solver(
+def _problem_solver(
         input: Annotated[str, "User input which could be a question or an answer."]
 ) -> str:
     """
@@ -136,6 +165,16 @@ def problem_solver(
     # TODO session_id and message handling should disappear
     return problem_solver_agent.invoke(input={"input": [input]})
 
+
+async def _aproblem_solver(
+        input: Annotated[str, "User input which could be a question or an answer."]
+) -> str:
+    return await problem_solver_agent.ainvoke(input={"input": [input]})
+
+
+problem_solver = StructuredTool.from_function(func=_problem_solver, coroutine=_aproblem_solver,
+                                              name="problem_solver")
+
     # THIS IS NOT WORKING : TypeError: 'RunnableSequence' object is not callable
     # faq_answerer = faq_agent.runnable_chain().as_tool(
     #     name="faq_answerer",
@@ -210,6 +249,13 @@ def create_customer_onboarding_assistant_as_graph(model_name: Optional[Supported
         response = llm_with_tools.invoke(messages)
         return {"messages": [response]}
 
+    async def _acustomer_onboarding(state: State):
+        messages = [
+           {"role": "system", "content": __langgraph_chat_agent__},
+        ] + state["messages"]
+        response = await llm_with_tools.ainvoke(messages)
+        return {"messages": [response]}
+
     def _should_continue(state: MessagesState):
         messages = state["messages"]
         last_message = messages[-1]
@@ -220,7 +266,8 @@ def create_customer_onboarding_assistant_as_graph(model_name: Optional[Supported
         return END
 
     graph_builder = StateGraph(State)
-    graph_builder.add_node("customer-onboarding", _customer_onboarding)
+    # invoke runs the sync node, ainvoke/astream the async one
+    graph_builder.add_node("customer-onboarding", RunnableLambda(_customer_onboarding, afunc=_acustomer_onboarding))
     graph_builder.add_node("faq", faq_agent)
     graph_builder.add_node("eligibility", eligibility_agent)
     graph_builder.add_node("problem", problem_solver_agent)
@@ -236,7 +283,8 @@ def create_customer_onboarding_assistant_as_graph(model_name: Optional[Supported
     graph_builder.add_edge("tools", "customer-onboarding")
     # Any time a tool is called, we return to the chatbot to decide the next step
     graph_builder.add_conditional_edges("customer-onboarding", _should_continue, ["tools", END])
-    graph = graph_builder.compile() # checkpointer=MemorySaver())
+    # conversations are kept by thread_id, see [CustomerOnboarding] checkpointer
+    graph = graph_builder.compile(checkpointer=create_checkpointer(_config))
     return graph
 
 
@@ -0,0 +1,137 @@
+"""Checkpointers of the customer onboarding graph, selected by the [CustomerOnboarding] configuration."""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from app.core.logger import logger
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    In-memory checkpointer keeping at most `max_threads` conversations.
+
+    Threads are evicted in least recently used order, and threads not accessed for
+    `ttl_seconds` are dropped, so memory stays flat however many sessions are opened.
+    """
+
+    def __init__(self, max_threads: int = 1000, ttl_seconds: float = 3600):
+        super().__init__()
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self._last_access: "OrderedDict[Any, float]" = OrderedDict()
+        self._access_lock = threading.RLock()
+
+    def _touch(self, thread_id: Any) -> None:
+        with self._access_lock:
+            self._last_access[thread_id] = time.monotonic()
+            self._last_access.move_to_end(thread_id)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        evicted = []
+        with self._access_lock:
+            while self._last_access:
+                thread_id, last_access = next(iter(self._last_access.items()))
+                if len(self._last_access) <= self.max_threads and now - last_access <= self.ttl_seconds:
+                    break
+                self._last_access.popitem(last=False)
+                evicted.append(thread_id)
+        for thread_id in evicted:
+            super().delete_thread(thread_id)
+        if evicted:
+            logger.debug(f"Evicted {len(evicted)} customer onboarding threads from memory")
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        with self._access_lock:
+            last_access = self._last_access.get(thread_id)
+        if last_access is not None and time.monotonic() - last_access > self.ttl_seconds:
+            self.delete_thread(thread_id)
+            return None
+        checkpoint = super().get_tuple(config)
+        if checkpoint is not None:
+            self._touch(thread_id)
+        elif last_access is None:
+            # MemorySaver storage is a defaultdict, do not keep the empty entry of an unknown thread
+            self.storage.pop(thread_id, None)
+        return checkpoint
+
+    def put(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        self._touch(config["configurable"]["thread_id"])
+        self._evict()
+        return next_config
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._access_lock:
+            self._last_access.pop(thread_id, None)
+        super().delete_thread(thread_id)
+
+
+class SQLiteCheckpointer(SqliteSaver):
+    """
+    SqliteSaver persisting conversations in a file, so they survive a restart.
+
+    SqliteSaver only implements the sync interface, async calls (made by the server
+    streaming the graph) run the sync ones in a worker thread.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        super().__init__(conn)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self,
+                    config: Optional[RunnableConfig],
+                    *,
+                    filter: Optional[dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self,
+                          config: RunnableConfig,
+                          writes: Sequence[tuple[str, Any]],
+                          task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def create_checkpointer(config) -> Optional[BaseCheckpointSaver]:
+    """Build the checkpointer described by the [CustomerOnboarding] section of the configuration"""
+    checkpointer_type = config.get('CustomerOnboarding', 'checkpointer', fallback='memory').strip().lower()
+    if checkpointer_type in ('', 'none'):
+        return None
+    if checkpointer_type == 'memory':
+        return BoundedMemorySaver(
+            max_threads=config.getint('CustomerOnboarding', 'checkpoint_max_threads', fallback=1000),
+            ttl_seconds=config.getfloat('CustomerOnboarding', 'checkpoint_ttl', fallback=3600),
+        )
+    if checkpointer_type == 'sqlite':
+        return SQLiteCheckpointer(
+            config.get('CustomerOnboarding', 'checkpoint_path',
+                       fallback='./data/checkpoints/customer_onboarding.sqlite'))
+    raise ValueError(f"Unknown customer onboarding checkpointer: {checkpointer_type}")
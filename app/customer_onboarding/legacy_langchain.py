@@ -1,5 +1,8 @@
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Annotated
+from typing import Optional, Annotated, Dict
 
 from dotenv import load_dotenv, find_dotenv
 from langchain.agents import create_structured_chat_agent, AgentExecutor
@@ -46,7 +49,8 @@ embeddings = initiate_embeddings(default_model)
 faq_agent = FAQAgent(name="FAQAgent", 
                      model=model,
                      embeddings=embeddings,
-                     source_paths=_faq_file
+                     source_paths=_faq_file,
+                     persist_directory=_chroma_persist_directory
                      )
 
 @tool
@@ -115,24 +119,47 @@ def problem_solver(
 
 
 
-# Dictionary to store chat histories per session ID
-session_histories = {}
+_AGENT_STOPPED_MESSAGE = "Agent stopped due to iteration limit or time limit."
+
+# Bounds of the chat histories kept in memory
+_max_sessions = _config.getint('CustomerOnboarding', 'max_sessions', fallback=1000)
+_session_ttl = _config.getfloat('CustomerOnboarding', 'session_ttl', fallback=3600)
+
+
+class FilteredChatMessageHistory(InMemoryChatMessageHistory):
+    """In-memory chat history that drops the agent executor stop messages when they are added"""
+
+    def add_messages(self, messages) -> None:
+        super().add_messages([
+            message for message in messages
+            if not (isinstance(message, AIMessage) and _AGENT_STOPPED_MESSAGE in message.content)
+        ])
+
+
+# Chat histories per session ID, least recently used first
+session_histories: "OrderedDict[str, FilteredChatMessageHistory]" = OrderedDict()
+_session_last_access: Dict[str, float] = {}
+_sessions_lock = threading.Lock()
 
 
 def get_message_history(session_id: str) -> BaseChatMessageHistory:
     # return SQLChatMessageHistory(session_id, "sqlite:///memory.db")
-    if session_id not in session_histories:
-        session_histories[session_id] = InMemoryChatMessageHistory()
-
-        # Clean up unwanted messages from chat history
-    clean_messages = [
-        message for message in session_histories[session_id].messages
-        if not (isinstance(message,
-                           AIMessage) and "Agent stopped due to iteration limit or time limit." in message.content)
-    ]
-    session_histories[session_id].messages = clean_messages
-    return session_histories[session_id]
-
+    now = time.monotonic()
+    with _sessions_lock:
+        if session_id not in session_histories or now - _session_last_access[session_id] > _session_ttl:
+            session_histories[session_id] = FilteredChatMessageHistory()
+        session_histories.move_to_end(session_id)
+        _session_last_access[session_id] = now
+
+        # Drop sessions over the limit or not used for too long
+        while session_histories:
+            oldest = next(iter(session_histories))
+            if len(session_histories) <= _max_sessions and now - _session_last_access[oldest] <= _session_ttl:
+                break
+            session_histories.popitem(last=False)
+            _session_last_access.pop(oldest, None)
+
+        return session_histories[session_id]
 
 
 def create_customer_onboarding_assistant_as_chain(model_name: Optional[SupportedModel],
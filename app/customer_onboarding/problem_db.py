@@ -0,0 +1,226 @@
+"""Data access layer for the problem (error codes) SQLite database."""
+
+import os
+import re
+import sqlite3
+import threading
+from typing import Optional, List, Dict, Tuple
+
+from app.core.logger import logger
+
+_INDEX_STATEMENTS = [
+    # code is the primary key, so it is already backed by an index
+    "CREATE INDEX IF NOT EXISTS idx_errors_category ON errors(category)",
+    "CREATE INDEX IF NOT EXISTS idx_errors_subcategory ON errors(subcategory)",
+    "CREATE INDEX IF NOT EXISTS idx_errors_category_subcategory ON errors(category, subcategory)",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS errors_fts USING fts5(
+        search_keys, description,
+        content='errors', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    "INSERT INTO errors_fts(errors_fts) VALUES ('rebuild')",
+    "DROP TABLE IF EXISTS index_source",
+    "CREATE TABLE index_source (mtime_ns INTEGER, size INTEGER)",
+]
+
+# search_keys matches weigh twice as much as description matches
+_BM25 = "bm25(errors_fts, 2.0, 1.0)"
+
+_MIN_TOKEN_LENGTH = 3
+_STOPWORDS = frozenset("""
+    alors aucun aussi autre avec avoir cela ces cette comme dans des donc elle elles est être
+    fait faire leur les lui mais même mes mon nos notre nous par pas peut plus pour quand que quel
+    quelle qui sans ses son sont sur tous tout très une vos votre vous
+""".split())
+
+
+def _search_tokens(text: str) -> List[str]:
+    """Words of a free text worth searching: no short words, no French stopwords, no duplicates."""
+    tokens = re.findall(r"\w+", text.lower(), flags=re.UNICODE)
+    return list(dict.fromkeys(
+        token for token in tokens if len(token) >= _MIN_TOKEN_LENGTH and token not in _STOPWORDS
+    ))
+
+
+def _to_fts_query(text: str, operator: str = "AND") -> Optional[str]:
+    """Turn free text into an FTS5 query matching all (AND) or any (OR) of its words, by prefix."""
+    tokens = _search_tokens(text)
+    if not tokens:
+        return None
+    return f" {operator} ".join(f'"{token}"*' for token in tokens)
+
+
+def _source_signature(db_path: str) -> Tuple[int, int]:
+    stat = os.stat(db_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def build_search_index(db_path: str, index_path: str) -> None:
+    """
+    Build the search database of a problem database: a copy of its errors table with indexes on
+    category/subcategory and an FTS5 index over search_keys and description.
+    The source database is only read, the index is written to a temporary file then moved in place.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    signature = _source_signature(db_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            source.backup(conn)
+        finally:
+            source.close()
+        for statement in _INDEX_STATEMENTS:
+            conn.execute(statement)
+        conn.execute("INSERT INTO index_source (mtime_ns, size) VALUES (?, ?)", signature)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, index_path)
+
+
+def _is_index_current(db_path: str, index_path: str) -> bool:
+    if not os.path.exists(index_path):
+        return False
+    try:
+        conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT mtime_ns, size FROM index_source").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError:
+        return False
+    return row is not None and tuple(row) == _source_signature(db_path)
+
+
+class ProblemDatabase:
+    """
+    Thread-safe read access to the errors table.
+
+    The problem database (tracked in the repository) is never written to. On first use, a
+    derived search database is built at index_path (under the gitignored data/cache by default)
+    with indexes on category/subcategory and an FTS5 index over search_keys and description,
+    and rebuilt when the problem database changes. Keyword lookups are then bm25 ranked
+    full-text matches instead of LIKE table scans.
+    Each thread gets its own read-only connection, opened once and reused.
+    """
+
+    def __init__(self, db_path: str, index_path: Optional[str] = None):
+        """
+        Args:
+            db_path: Path of the problem database
+            index_path: Path of the derived search database, None to query db_path directly
+        """
+        self.db_path = db_path
+        self.index_path = index_path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._has_fts = False
+        self._read_path = db_path
+
+    def _ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            if self.index_path:
+                try:
+                    if not _is_index_current(self.db_path, self.index_path):
+                        logger.info(f"Building search index {self.index_path} of problem database {self.db_path}")
+                        build_search_index(self.db_path, self.index_path)
+                    self._read_path = self.index_path
+                except (OSError, sqlite3.Error) as e:
+                    # e.g. read-only deployment: keep working on the problem database, without full-text index
+                    logger.warning(f"Could not build the search index of the problem database: {e}")
+
+            conn = self._connection()
+            self._has_fts = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'errors_fts'"
+            ).fetchone() is not None
+            self._schema_ready = True
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the read-only connection of the current thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self._read_path}?mode=ro", uri=True)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+        return conn
+
+    def search(self,
+               code: Optional[str] = None,
+               category: Optional[str] = None,
+               subcategory: Optional[str] = None,
+               search_keys: Optional[str] = None,
+               limit: int = 20) -> List[Dict]:
+        """
+        Search errors by exact code, category or subcategory, and rank them by full-text
+        relevance of search_keys against the error search keys and description.
+        """
+        self._ensure_schema()
+
+        if search_keys and self._has_fts:
+            if not _search_tokens(search_keys):
+                # only stopwords or short words: filter on the other criteria
+                return self._query(None, code, category, subcategory, limit)
+            # errors with all the words first, with any of them when none has them all
+            rows = self._query(_to_fts_query(search_keys, "AND"), code, category, subcategory, limit)
+            if not rows:
+                rows = self._query(_to_fts_query(search_keys, "OR"), code, category, subcategory, limit)
+            return rows
+        return self._query(None, code, category, subcategory, limit, like=search_keys)
+
+    def _query(self,
+               fts_query: Optional[str],
+               code: Optional[str],
+               category: Optional[str],
+               subcategory: Optional[str],
+               limit: int,
+               like: Optional[str] = None) -> List[Dict]:
+        params = []
+        if fts_query:
+            query = ("SELECT errors.* FROM errors_fts JOIN errors ON errors.rowid = errors_fts.rowid"
+                     " WHERE errors_fts MATCH ?")
+            params.append(fts_query)
+        else:
+            query = "SELECT * FROM errors WHERE 1 = 1"
+            if like:
+                query += " AND search_keys LIKE ?"
+                params.append(f"%{like}%")
+
+        if code:
+            query += " AND errors.code = ?"
+            params.append(code)
+        if category:
+            query += " AND errors.category = ?"
+            params.append(category)
+        if subcategory:
+            query += " AND errors.subcategory = ?"
+            params.append(subcategory)
+
+        if fts_query:
+            query += f" ORDER BY {_BM25}"
+        query += " LIMIT ?"
+        params.append(limit)
+
+        rows = self._connection().execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+
+_databases: Dict[str, ProblemDatabase] = {}
+_databases_lock = threading.Lock()
+
+
+def get_problem_database(db_path: str, index_path: Optional[str] = None) -> ProblemDatabase:
+    """Return the process-wide ProblemDatabase for a database file."""
+    with _databases_lock:
+        if db_path not in _databases:
+            _databases[db_path] = ProblemDatabase(db_path, index_path)
+        return _databases[db_path]
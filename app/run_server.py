@@ -1,20 +1,24 @@
 
+import asyncio
 import json
 
+from contextlib import asynccontextmanager
 from uuid import uuid4
-from typing import List
+from typing import List, Optional
 
 from fastapi import FastAPI, APIRouter, Query
 from langchain_core._api import LangChainBetaWarning
 from langchain_core.runnables import RunnableConfig
 
 from app.core.base import SupportedModel
+from app.core.commons import awarm_up_clients
+from app.core.config_loader import load_config
 
 from openai.types.chat.chat_completion_message_param import ChatCompletionMessageParam
 from pydantic import BaseModel
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 
-from app.assistants.core import get_assistant
+from app.assistants.core import aget_assistant, assistants, warm_up, readiness, DEFAULT_ASSISTANT
 
 from app.utils.prompt import ClientMessage, convert_to_openai_messages
 from app.utils.tools import get_current_weather
@@ -32,13 +36,42 @@ logger = logging.getLogger(__name__)
 
 _ = load_dotenv(find_dotenv())
 
-app = FastAPI()
-router = APIRouter()
-
 default_model = SupportedModel.DEFAULT
 
+_config = load_config()
+
+# Assistants compiled in the background at startup, the others are compiled on their first request
+_warmup_assistants = [assistant_id.strip() for assistant_id in
+                      _config.get('Server', 'warmup_assistants', fallback=DEFAULT_ASSISTANT).split(',')
+                      if assistant_id.strip()]
+_unknown_assistants = [assistant_id for assistant_id in _warmup_assistants if assistant_id not in assistants]
+if _unknown_assistants:
+    raise ValueError(f"Unknown assistants in [Server] warmup_assistants: {', '.join(_unknown_assistants)}, "
+                     f"expected some of: {', '.join(assistants)}")
+
+
+async def _warm_up() -> None:
+    """Open the provider connections of the assistant models, then compile the warm-up assistants"""
+    model_name = _config.get('CustomerOnboarding', 'model', fallback=default_model.name)
+    await awarm_up_clients([SupportedModel[model_name]])
+    await asyncio.to_thread(warm_up, _warmup_assistants)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up the provider connections and the assistants in the background, so /health answers right away."""
+    app.state.warm_up = asyncio.create_task(_warm_up())
+    yield
+    app.state.warm_up.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
+router = APIRouter()
+
 class Request(BaseModel):
     messages: List[ClientMessage]
+    # chat id sent by the client, used as the graph thread id to resume the conversation
+    id: Optional[str] = None
 
 
 available_tools = {
@@ -77,21 +110,147 @@ def convert_openai_messages_to_langchain(messages: List[ChatCompletionMessagePar
     return langchain_messages
 
 
-async def stream_text_graph(messages: List[ChatCompletionMessageParam], protocol: str = 'data'):
-    run_id = uuid4()
-    kwargs = {
-        "input": {"messages": messages},
-        "config": RunnableConfig(
-            configurable={"thread_id": uuid4()}, run_id=run_id
-        ),
-    }
+def _text_frame(text: str) -> str:
+    return '0:' + json.dumps(text, ensure_ascii=False) + '\n'
+
+
+def _tool_call_frame(tool_call: dict) -> str:
+    # arguments are already a JSON string streamed by the model, they are inlined as is
+    return '9:{{"toolCallId":{id},"toolName":{name},"args":{args}}}\n'.format(
+        id=json.dumps(tool_call['id']),
+        name=json.dumps(tool_call['name']),
+        args=tool_call['arguments'] or '{}')
+
+
+def _tool_result_frame(tool_call_id: str, tool_name: str, args: str, result: str) -> str:
+    return 'a:{{"toolCallId":{id},"toolName":{name},"args":{args},"result":{result}}}\n'.format(
+        id=json.dumps(tool_call_id),
+        name=json.dumps(tool_name),
+        args=args or '{}',
+        result=result)
+
+
+def _finish_step_frame(reason: str, prompt_tokens: int, completion_tokens: int) -> str:
+    return ('e:{{"finishReason":"{reason}","usage":{{"promptTokens":{prompt},"completionTokens":{completion}}},'
+            '"isContinued":false}}\n').format(reason=reason, prompt=prompt_tokens, completion=completion_tokens)
+
+
+def _finish_message_frame(prompt_tokens: int, completion_tokens: int) -> str:
+    return 'd:{{"finishReason":"stop","usage":{{"promptTokens":{prompt},"completionTokens":{completion}}}}}\n'.format(
+        prompt=prompt_tokens, completion=completion_tokens)
+
+
+async def _graph_kwargs(graph, messages: List[ChatCompletionMessageParam], thread_id: Optional[str] = None) -> dict:
+    """
+    Input and config of a graph run.
 
-    graph = get_assistant("customer-onboarding")
+    With a client thread id and a checkpointer, the conversation is resumed from the checkpoint
+    and only the new message is sent, otherwise the whole history is sent on a new thread.
+    """
+    config = RunnableConfig(configurable={"thread_id": thread_id or str(uuid4())}, run_id=uuid4())
+    if thread_id and graph.checkpointer is not None and messages:
+        state = await graph.aget_state(config)
+        if state.values.get("messages"):
+            messages = messages[-1:]
+    return {"input": {"messages": messages}, "config": config}
+
+
+async def stream_text_graph(messages: List[ChatCompletionMessageParam], protocol: str = 'data',
+                            thread_id: Optional[str] = None):
+    """
+    Stream the customer onboarding graph with the data stream protocol.
+
+    The graph is streamed in "messages" mode, so only LLM tokens and tool messages are
+    produced instead of every chain event. Tokens are forwarded only for the
+    customer-onboarding node, nested LLM calls made by the tools are skipped.
+    """
+    graph = await aget_assistant("customer-onboarding")
+    kwargs = await _graph_kwargs(graph, messages, thread_id)
+    # tool call chunks of the current LLM turn, by index
+    draft_tool_calls = {}
+    # arguments of the tool calls sent to the client, by tool call id, for their results
+    tool_call_args = {}
+    prompt_tokens = 0
+    completion_tokens = 0
+    # usage of the current LLM turn, its finish-step frame waits for it: with streaming usage
+    # (OpenAI, Mistral) it comes on a chunk after the one carrying the finish reason
+    step = {"id": None, "finish_reason": None, "prompt_tokens": 0, "completion_tokens": 0, "usage": False}
+
+    def _finish_step() -> str:
+        frame = _finish_step_frame(step["finish_reason"], step["prompt_tokens"], step["completion_tokens"])
+        step.update(id=None, finish_reason=None, prompt_tokens=0, completion_tokens=0, usage=False)
+        return frame
+
+    async for message, metadata in graph.astream(**kwargs, stream_mode="messages"):
+        node = metadata.get("langgraph_node")
+
+        if isinstance(message, ToolMessage):
+            # tool executed by the graph
+            if node == "tools":
+                if step["finish_reason"]:
+                    yield _finish_step()
+                yield _tool_result_frame(message.tool_call_id, message.name or "",
+                                         tool_call_args.pop(message.tool_call_id, "{}"),
+                                         json.dumps(message.content, ensure_ascii=False))
+            continue
+
+        if node != "customer-onboarding":
+            continue
+
+        if step["finish_reason"] and message.id != step["id"]:
+            # next LLM turn, the previous one had no usage
+            yield _finish_step()
+        step["id"] = message.id
+
+        if message.content and isinstance(message.content, str):
+            yield _text_frame(message.content)
+
+        for chunk in getattr(message, "tool_call_chunks", None) or []:
+            draft = draft_tool_calls.setdefault(chunk.get("index") or 0, {"id": None, "name": None, "arguments": ""})
+            draft["id"] = draft["id"] or chunk.get("id")
+            draft["name"] = draft["name"] or chunk.get("name")
+            draft["arguments"] += chunk.get("args") or ""
+
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            prompt_tokens += usage.get('input_tokens', 0)
+            completion_tokens += usage.get('output_tokens', 0)
+            step["prompt_tokens"] += usage.get('input_tokens', 0)
+            step["completion_tokens"] += usage.get('output_tokens', 0)
+            step["usage"] = True
+
+        finish_reason = message.response_metadata.get('finish_reason')
+        if finish_reason:
+            for tool_call in draft_tool_calls.values():
+                yield _tool_call_frame(tool_call)
+                tool = available_tools.get(tool_call['name'])
+                if tool is None:
+                    tool_call_args[tool_call['id']] = tool_call['arguments']
+                    continue
+                # tools handled by the server itself, run in a worker thread not to block other streams
+                tool_result = await asyncio.to_thread(tool.invoke, input=json.loads(tool_call['arguments'] or '{}'))
+                yield _tool_result_frame(tool_call['id'], tool_call['name'], tool_call['arguments'],
+                                         json.dumps(tool_result))
+            step["finish_reason"] = "tool-calls" if draft_tool_calls else "stop"
+            draft_tool_calls = {}
+
+        if step["finish_reason"] and step["usage"]:
+            yield _finish_step()
+
+    if step["finish_reason"]:
+        yield _finish_step()
+    yield _finish_message_frame(prompt_tokens, completion_tokens)
+
+
+async def stream_text_graph_events(messages: List[ChatCompletionMessageParam], protocol: str = 'data',
+                                   thread_id: Optional[str] = None):
+    """Former implementation over astream_events, kept for comparison with the messages stream."""
+    graph = await aget_assistant("customer-onboarding")
+    kwargs = await _graph_kwargs(graph, messages, thread_id)
     draft_tool_calls = []
     async for event in graph.astream_events(**kwargs, version="v2"):
         if not event:
             continue
-        print(event)
         event_type = event["event"]
         tags = event.get("tags", [])
         # filter on the custom tag
@@ -121,8 +280,8 @@ async def stream_text_graph(messages: List[ChatCompletionMessageParam], protocol
                                         id=tool_call['id'],
                                         name=tool_call['name'],
                                         args=tool_call['arguments'])
-                                    tool_result = available_tools[tool_call['name']].invoke(
-                                        input=json.loads(tool_call['arguments']))
+                                    tool_result = await asyncio.to_thread(available_tools[tool_call['name']].invoke,
+                                                                          input=json.loads(tool_call['arguments']))
 
                                     yield 'a:{{"toolCallId":"{id}","toolName":"{name}","args":{args},"result":{result}}}\n'.format(
                                         id=tool_call['id'],
@@ -145,10 +304,12 @@ async def stream_text_graph(messages: List[ChatCompletionMessageParam], protocol
 
 
 @router.post("/api/chat")
-async def handle_chat_data(request: Request, protocol: str = Query('data')):
+async def handle_chat_data(request: Request, protocol: str = Query('data'), stream: str = Query('messages')):
     messages = request.messages
     openai_messages = convert_to_openai_messages(messages)
-    response = StreamingResponse(stream_text_graph(openai_messages, protocol))
+    # stream=events selects the former astream_events implementation
+    stream_graph = stream_text_graph_events if stream == 'events' else stream_text_graph
+    response = StreamingResponse(stream_graph(openai_messages, protocol, thread_id=request.id))
     response.headers['x-vercel-ai-data-stream'] = 'v1'
     return response
 
@@ -158,6 +319,18 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: ready once the provider connections are warm and the warm-up assistants are compiled,
+    with per-assistant init times."""
+    assistants_status = readiness()
+    warming_up = getattr(app.state, "warm_up", None)
+    ready = (warming_up is not None and warming_up.done()
+             and all(assistants_status.get(assistant_id, {}).get("loaded") for assistant_id in _warmup_assistants))
+    return JSONResponse(status_code=200 if ready else 503,
+                        content={"status": "ready" if ready else "starting", "assistants": assistants_status})
+
+
 app.include_router(router)
 
 if __name__ == "__main__":
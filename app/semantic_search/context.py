@@ -0,0 +1,103 @@
+# app/semantic_search/context.py
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from langchain_core.documents import Document
+
+from app.semantic_search.utils import count_tokens
+
+
+@dataclass
+class AssembledContext:
+    """Context packed for a prompt, with the documents it contains and its size"""
+    text: str
+    documents: List[Document] = field(default_factory=list)
+    tokens: int = 0
+    # retrieved chunks, and chunks left out because they did not fit in the budget
+    retrieved: int = 0
+    dropped: int = 0
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def deduplicate(documents: List[Document]) -> List[Document]:
+    """Drop documents with the same content (ignoring case and whitespace), keeping the first one"""
+    seen = set()
+    unique = []
+    for document in documents:
+        key = _normalize(document.page_content)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(document)
+    return unique
+
+
+def merge_adjacent(documents: List[Document]) -> List[Tuple[int, Document]]:
+    """
+    Merge chunks of the same source that overlap or follow each other, using their start_index.
+
+    Documents are expected in rank order. Each merged document is returned with the best rank of
+    its chunks, documents without source or start_index are returned as is.
+    """
+    ranked: List[Tuple[int, Document]] = []
+    by_source: Dict[str, List[Tuple[int, Document]]] = {}
+    for rank, document in enumerate(documents):
+        if "source" in document.metadata and "start_index" in document.metadata:
+            by_source.setdefault(document.metadata["source"], []).append((rank, document))
+        else:
+            ranked.append((rank, document))
+
+    for chunks in by_source.values():
+        chunks.sort(key=lambda item: item[1].metadata["start_index"])
+        rank, current = chunks[0]
+        start = current.metadata["start_index"]
+        text = current.page_content
+        for next_rank, chunk in chunks[1:]:
+            next_start = chunk.metadata["start_index"]
+            end = start + len(text)
+            if next_start <= end:
+                # overlapping chunks, append the part not already in the text
+                text += chunk.page_content[end - next_start:]
+            elif next_start == end + 1:
+                # the splitter stripped the whitespace between the chunks
+                text += " " + chunk.page_content
+            else:
+                ranked.append((rank, Document(page_content=text, metadata={**current.metadata, "start_index": start})))
+                rank, current, start, text = next_rank, chunk, next_start, chunk.page_content
+                continue
+            rank = min(rank, next_rank)
+        ranked.append((rank, Document(page_content=text, metadata={**current.metadata, "start_index": start})))
+
+    ranked.sort(key=lambda item: item[0])
+    return ranked
+
+
+def assemble_context(documents: List[Document], max_tokens: int = 1000, separator: str = "\n\n") -> AssembledContext:
+    """
+    Build the context of a prompt from retrieved documents, in rank order.
+
+    Duplicates are dropped, adjacent chunks of a source are merged, then documents are added by rank
+    while they fit in max_tokens (counted with tiktoken). A document too large is skipped, so smaller
+    ones of lower rank can still fill the budget.
+    """
+    merged = [document for _, document in merge_adjacent(deduplicate(documents))]
+    separator_tokens = count_tokens([separator])[0] if merged else 0
+
+    packed, tokens, dropped = [], 0, 0
+    for document, document_tokens in zip(merged, count_tokens([d.page_content for d in merged])):
+        cost = document_tokens + (separator_tokens if packed else 0)
+        if tokens + cost > max_tokens:
+            dropped += 1
+            continue
+        packed.append(document)
+        tokens += cost
+
+    return AssembledContext(
+        text=separator.join(document.page_content for document in packed),
+        documents=packed,
+        tokens=tokens,
+        retrieved=len(documents),
+        dropped=dropped,
+    )
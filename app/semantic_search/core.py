@@ -1,8 +1,10 @@
 # app/semantic_search/simple_core.py
 import abc
+import asyncio
 import os
+import threading
 import uuid
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Dict, Callable
 
 import chromadb
 from langchain_chroma import Chroma
@@ -10,6 +12,25 @@ from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 
 from app.core.logger import logger
+from app.semantic_search.embedding_cache import CachedEmbeddings, CachedQueryEmbeddings
+from app.semantic_search.embedding_pipeline import BatchedEmbeddings
+
+EMBEDDING_CACHE_FILENAME = "embedding_cache.sqlite"
+
+
+_chroma_clients: Dict[str, Any] = {}
+_chroma_clients_lock = threading.Lock()
+
+
+def get_chroma_client(persist_directory: str):
+    """Return the process-wide Chroma client of a persist directory"""
+    path = os.path.abspath(persist_directory)
+    with _chroma_clients_lock:
+        if path not in _chroma_clients:
+            os.makedirs(path, exist_ok=True)
+            _chroma_clients[path] = chromadb.PersistentClient(path=path)
+        return _chroma_clients[path]
+
 
 class SearchStrategy(abc.ABC):
     """Abstract base strategy for semantic search"""
@@ -30,6 +51,10 @@ class SearchStrategy(abc.ABC):
         """Add documents to the search index"""
         pass
 
+    def stats(self) -> Dict[str, Any]:
+        """Size and estimated memory of the index"""
+        return {}
+
 
 class SimpleVectorSearch(SearchStrategy):
     """
@@ -44,7 +69,11 @@ class SimpleVectorSearch(SearchStrategy):
             collection_name: str = "default_collection",
             persist_directory: Optional[str] = None,
             score_threshold: float = 0.6,
-            search_type: str = "similarity_score_threshold"
+            search_type: str = "similarity_score_threshold",
+            embedding_cache_path: Optional[str] = None,
+            query_cache_size: int = 256,
+            query_cache_ttl: float = 3600,
+            k: int = 4
     ):
         """
         Initialize the vector search
@@ -54,8 +83,23 @@ class SimpleVectorSearch(SearchStrategy):
             collection_name: Name of the collection
             persist_directory: Directory to persist the vector store (if None, uses in-memory store)
             score_threshold: Minimum similarity score threshold for retrieval
+            embedding_cache_path: SQLite file caching document embeddings
+                (defaults to a file beside persist_directory when persisting)
+            query_cache_size: Number of query embeddings kept in memory (0 disables the cache)
+            query_cache_ttl: Seconds a query embedding is kept in memory
+            k: Number of documents returned by retrieve_many
         """
+        if not isinstance(embeddings, (BatchedEmbeddings, CachedEmbeddings, CachedQueryEmbeddings)):
+            # documents are embedded by token-sized batches, with backoff on rate limits
+            embeddings = BatchedEmbeddings(embeddings)
+        if embedding_cache_path is None and persist_directory:
+            embedding_cache_path = os.path.join(persist_directory, EMBEDDING_CACHE_FILENAME)
+        if embedding_cache_path:
+            embeddings = CachedEmbeddings(embeddings, embedding_cache_path)
+        if query_cache_size > 0:
+            embeddings = CachedQueryEmbeddings(embeddings, max_size=query_cache_size, ttl_seconds=query_cache_ttl)
         self.embeddings = embeddings
+        self.k = k
         self.collection_name = collection_name
         self.persist_directory = persist_directory
         self.score_threshold = score_threshold
@@ -72,10 +116,11 @@ class SimpleVectorSearch(SearchStrategy):
         if self.persist_directory and os.path.exists(self.persist_directory):
             logger.info(f"Loading existing vector store from {self.persist_directory}")
             try:
-                client = chromadb.PersistentClient(path=self.persist_directory)
+                client = get_chroma_client(self.persist_directory)
 
                 # Get all collection names to check if our collection exists
-                collection_names = client.list_collections()
+                # (depending on chromadb version, collections or names are returned)
+                collection_names = [getattr(c, "name", c) for c in client.list_collections()]
 
                 if self.collection_name in collection_names:
                     # Collection exists, load it
@@ -89,7 +134,7 @@ class SimpleVectorSearch(SearchStrategy):
                     # Initialize retriever
                     self.retriever = self.vectorstore.as_retriever(
                         search_type=self.search_type,
-                        search_kwargs={"score_threshold": self.score_threshold}
+                        search_kwargs=self._search_kwargs()
                     )
                 else:
                     # Collection doesn't exist yet
@@ -107,6 +152,12 @@ class SimpleVectorSearch(SearchStrategy):
             self.vectorstore = None
             self.retriever = None
 
+    def _search_kwargs(self) -> Dict[str, Any]:
+        # score_threshold is only understood by the similarity_score_threshold search
+        if self.search_type == "similarity_score_threshold":
+            return {"score_threshold": self.score_threshold}
+        return {}
+
     def _get_unique_documents(self, documents: List[Document]):
         """Filter out duplicate documents based on content"""
         id_bag = {}
@@ -119,6 +170,13 @@ class SimpleVectorSearch(SearchStrategy):
                 unique_docs.append(doc)
         return unique_docs, id_bag
 
+    def _filter_indexed_documents(self, documents: List[Document]) -> List[Document]:
+        """Drop documents whose content id is already stored in the collection"""
+        existing_ids = set(self.vectorstore.get(ids=[doc.id for doc in documents], include=[])["ids"])
+        if existing_ids:
+            logger.info(f"Skipping {len(existing_ids)} documents already indexed in '{self.collection_name}'")
+        return [doc for doc in documents if doc.id not in existing_ids]
+
     def add_documents(self, documents: List[Document]):
         """Add documents to the vector store"""
         if not documents:
@@ -134,9 +192,7 @@ class SimpleVectorSearch(SearchStrategy):
         if self.vectorstore is None:
 
             if self.persist_directory:
-                # Ensure directory exists
-                os.makedirs(self.persist_directory, exist_ok=True)
-                client = chromadb.PersistentClient(path=self.persist_directory)
+                client = get_chroma_client(self.persist_directory)
 
                 self.vectorstore = Chroma.from_documents(
                     documents=unique_docs,
@@ -152,14 +208,16 @@ class SimpleVectorSearch(SearchStrategy):
                     collection_name=self.collection_name
                 )
         else:
-            # Add to existing vector store
-            self.vectorstore.add_documents(unique_docs)
+            # Add to existing vector store, only new or changed chunks are embedded
+            new_docs = self._filter_indexed_documents(unique_docs)
+            if new_docs:
+                self.vectorstore.add_documents(new_docs, ids=[doc.id for doc in new_docs])
 
 
         # Update retriever
         self.retriever = self.vectorstore.as_retriever(
             search_type=self.search_type,
-            search_kwargs={"score_threshold": self.score_threshold}
+            search_kwargs=self._search_kwargs()
         )
 
         # not needed anymore automatic if persist_directory is given, _client.persist() deprecated
@@ -169,6 +227,10 @@ class SimpleVectorSearch(SearchStrategy):
         #     self.vectorstore._client.persist()
         #     logger.info("Vector store persisted to disk")
 
+    async def aadd_documents(self, documents: List[Document]):
+        """Add documents to the vector store in a worker thread, so indexing overlaps with other work"""
+        await asyncio.to_thread(self.add_documents, documents)
+
     def retrieve(self, query: str, **kwargs) -> List[Document]:
         """Retrieve documents using vector similarity"""
         if not self.retriever:
@@ -185,9 +247,91 @@ class SimpleVectorSearch(SearchStrategy):
         return await self.retriever.ainvoke(query, **kwargs)
 
 
+    def stats(self) -> Dict[str, Any]:
+        """Number of documents and estimated size of their float32 embeddings"""
+        documents, dimensions = 0, 0
+        if self.vectorstore is not None:
+            collection = self.vectorstore._collection
+            documents = collection.count()
+            if documents:
+                embeddings = collection.get(limit=1, include=["embeddings"])["embeddings"]
+                dimensions = len(embeddings[0]) if len(embeddings) else 0
+        query_cache = getattr(self.embeddings, "cache", None)
+        return {
+            "collection": self.collection_name,
+            "persist_directory": self.persist_directory,
+            "documents": documents,
+            "dimensions": dimensions,
+            "embedding_bytes": documents * dimensions * 4,
+            "query_cache_entries": len(query_cache) if query_cache is not None else 0,
+        }
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        # queries always go through the query path of the model, never through embed_documents
+        if isinstance(self.embeddings, CachedQueryEmbeddings):
+            return self.embeddings.embed_queries(queries)
+        return [self.embeddings.embed_query(query) for query in queries]
+
+    async def _aembed_queries(self, queries: List[str]) -> List[List[float]]:
+        if isinstance(self.embeddings, CachedQueryEmbeddings):
+            return await self.embeddings.aembed_queries(queries)
+        return list(await asyncio.gather(*(self.embeddings.aembed_query(query) for query in queries)))
+
+    def _query_by_vectors(self, vectors: List[List[float]], k: int) -> List[List[Document]]:
+        """Run the lookups of all query vectors in a single collection query"""
+        results = self.vectorstore._collection.query(
+            query_embeddings=vectors,
+            n_results=k,
+            include=["documents", "metadatas", "distances"],
+        )
+        relevance_score = self.vectorstore._select_relevance_score_fn()
+        all_docs = []
+        for ids, contents, metadatas, distances in zip(
+                results["ids"], results["documents"], results["metadatas"], results["distances"]):
+            docs = []
+            for _id, content, metadata, distance in zip(ids, contents, metadatas, distances):
+                if self.search_type == "similarity_score_threshold" \
+                        and relevance_score(distance) < self.score_threshold:
+                    continue
+                docs.append(Document(id=_id, page_content=content, metadata=metadata or {}))
+            all_docs.append(docs)
+        return all_docs
+
+    def retrieve_many(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        """Retrieve documents for several queries, embedded in one call and looked up together"""
+        if not self.retriever:
+            logger.warning("No documents have been added to the vector store yet")
+            return [[] for _ in queries]
+        if not queries:
+            return []
+        return self._query_by_vectors(self._embed_queries(queries), k or self.k)
+
+    async def aretrieve_many(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        """Asynchronously retrieve documents for several queries, see retrieve_many"""
+        if not self.retriever:
+            logger.warning("No documents have been added to the vector store yet")
+            return [[] for _ in queries]
+        if not queries:
+            return []
+        vectors = await self._aembed_queries(queries)
+        return await asyncio.to_thread(self._query_by_vectors, vectors, k or self.k)
+
+
 class VectorStoreManager:
+    """
+    Process-wide registry of named search strategies.
+
+    Strategies are registered with a factory and created on first use, and share the
+    Chroma client of their persist directory (see get_chroma_client).
+    The strategy given to the constructor or to set_strategy is the default one.
+    """
+    DEFAULT = "default"
+
     _instance = None
     _strategy: Optional[SearchStrategy] = None
+    _strategies: Dict[str, SearchStrategy] = {}
+    _factories: Dict[str, Callable[[], SearchStrategy]] = {}
+    _lock = threading.RLock()
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
@@ -210,4 +354,54 @@ class VectorStoreManager:
     def set_strategy(cls, strategy: SearchStrategy):
         if cls._strategy:
             raise ValueError("Strategy is already set")
-        cls._strategy = strategy
\ No newline at end of file
+        cls._strategy = strategy
+        cls.add(cls.DEFAULT, strategy)
+
+    @classmethod
+    def register(cls, name: str, factory: Callable[[], SearchStrategy]) -> None:
+        """Register the factory of a strategy, called on the first get(name)"""
+        with cls._lock:
+            cls._factories[name] = factory
+
+    @classmethod
+    def add(cls, name: str, strategy: SearchStrategy) -> SearchStrategy:
+        """Register an already created strategy"""
+        with cls._lock:
+            if name in cls._strategies and cls._strategies[name] is not strategy:
+                raise ValueError(f"Strategy '{name}' is already set")
+            cls._strategies[name] = strategy
+        return strategy
+
+    @classmethod
+    def get(cls, name: str) -> SearchStrategy:
+        """Return a strategy by name, creating it with its registered factory on first use"""
+        with cls._lock:
+            if name not in cls._strategies:
+                if name not in cls._factories:
+                    raise KeyError(f"No strategy registered under '{name}'")
+                logger.info(f"Creating search strategy '{name}'")
+                cls._strategies[name] = cls._factories[name]()
+            return cls._strategies[name]
+
+    @classmethod
+    def get_or_create(cls, name: str, factory: Callable[[], SearchStrategy]) -> SearchStrategy:
+        """Return a strategy by name, registering and creating it with factory if needed"""
+        with cls._lock:
+            if name not in cls._strategies and name not in cls._factories:
+                cls._factories[name] = factory
+            return cls.get(name)
+
+    @classmethod
+    def names(cls) -> List[str]:
+        with cls._lock:
+            return sorted(set(cls._strategies) | set(cls._factories))
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict[str, Any]]:
+        """Size and estimated memory of each created strategy, registered ones not created yet are listed empty"""
+        with cls._lock:
+            strategies = dict(cls._strategies)
+            pending = [name for name in cls._factories if name not in strategies]
+        stats = {name: {"created": True, **strategy.stats()} for name, strategy in strategies.items()}
+        stats.update({name: {"created": False} for name in pending})
+        return stats
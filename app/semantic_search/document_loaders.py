@@ -1,16 +1,19 @@
 # app/semantic_search/document_loaders.py
-from typing import List, Union, Dict, Optional, Tuple, Any
+from functools import lru_cache
+from typing import List, Union, Dict, Optional, Tuple, Any, Iterator
 from pathlib import Path
 
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import WebBaseLoader, TextLoader, PyPDFLoader
+from langchain_community.document_loaders import TextLoader, PyPDFLoader
 from llama_index.core import SimpleDirectoryReader
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.schema import BaseNode
 
 from app.core.logger import logger
+from app.semantic_search.ingestion import IngestionManifest, iter_file_chunks
+from app.semantic_search.web_loader import fetch_urls, afetch_urls
 
 
 class DocumentLoader:
@@ -74,6 +77,13 @@ class DocumentLoader:
                           chunk_size: int = 1000,
                           chunk_overlap: int = 200) -> List[Document]:
         """Load all documents from a directory matching the patterns"""
+        all_files = DocumentLoader.list_directory(directory_path, file_patterns)
+        return DocumentLoader.load_from_files(all_files, chunk_size, chunk_overlap)
+
+    @staticmethod
+    def list_directory(directory_path: Path,
+                       file_patterns: Optional[List[str]] = None) -> List[Path]:
+        """List the files of a directory matching the patterns"""
         if not directory_path.exists() or not directory_path.is_dir():
             raise NotADirectoryError(f"Directory not found: {directory_path}")
 
@@ -88,38 +98,75 @@ class DocumentLoader:
             all_files.extend(list(directory_path.glob("*.pdf")))
             all_files.extend(list(directory_path.glob("*.md")))
 
-        return DocumentLoader.load_from_files(all_files, chunk_size, chunk_overlap)
+        return all_files
+
+    @staticmethod
+    def iter_from_files(file_paths: Union[Path, List[Path]],
+                        chunk_size: int = 1000,
+                        chunk_overlap: int = 200,
+                        max_workers: Optional[int] = None,
+                        manifest: Optional[IngestionManifest] = None) -> Iterator[Tuple[Path, List[Document]]]:
+        """
+        Load and split files, yielding each file with its chunks. Many or large files are parsed in
+        worker processes, see iter_file_chunks.
+        With a manifest, files unchanged since the previous ingestion are skipped.
+        """
+        if isinstance(file_paths, Path):
+            file_paths = [file_paths]
+        return iter_file_chunks(file_paths, chunk_size, chunk_overlap, max_workers=max_workers, manifest=manifest)
+
+    @staticmethod
+    def iter_from_directory(directory_path: Path,
+                            file_patterns: Optional[List[str]] = None,
+                            chunk_size: int = 1000,
+                            chunk_overlap: int = 200,
+                            max_workers: Optional[int] = None,
+                            manifest: Optional[IngestionManifest] = None) -> Iterator[Tuple[Path, List[Document]]]:
+        """Load and split the files of a directory matching the patterns, see iter_from_files"""
+        all_files = DocumentLoader.list_directory(directory_path, file_patterns)
+        return DocumentLoader.iter_from_files(all_files, chunk_size, chunk_overlap,
+                                              max_workers=max_workers, manifest=manifest)
 
     @staticmethod
     def load_from_urls(urls: Union[str, List[str]],
                       chunk_size: int = 1000,
-                      chunk_overlap: int = 200) -> List[Document]:
-        """Load and split documents from URLs"""
+                      chunk_overlap: int = 200,
+                      cache_dir: Optional[str] = None,
+                      per_host_limit: int = 4,
+                      timeout: float = 10.0) -> List[Document]:
+        """
+        Load and split documents from URLs, fetched concurrently.
+        With a cache directory, pages are revalidated with ETag/Last-Modified conditional requests.
+        """
         if isinstance(urls, str):
             urls = [urls]
 
-        all_docs = []
-        for url in urls:
-            try:
-                docs = WebBaseLoader(url).load()
-                all_docs.extend(docs)
-                logger.info(f"Loaded content from URL: {url}")
-            except Exception as e:
-                logger.error(f"Error loading URL {url}: {e}")
+        documents = fetch_urls(urls, cache_dir=cache_dir, per_host_limit=per_host_limit, timeout=timeout)
+        # chunks keep the metadata (and source URL) of their document
+        return _tiktoken_splitter(chunk_size, chunk_overlap).split_documents(documents)
 
-        # Split into chunks
-        text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
-        )
-        doc_splits = text_splitter.split_documents(all_docs)
+    @staticmethod
+    async def aload_from_urls(urls: Union[str, List[str]],
+                             chunk_size: int = 1000,
+                             chunk_overlap: int = 200,
+                             cache_dir: Optional[str] = None,
+                             per_host_limit: int = 4,
+                             timeout: float = 10.0) -> List[Document]:
+        """Asynchronously load and split documents from URLs, see load_from_urls"""
+        if isinstance(urls, str):
+            urls = [urls]
+
+        documents = await afetch_urls(urls, cache_dir=cache_dir, per_host_limit=per_host_limit, timeout=timeout)
+        return _tiktoken_splitter(chunk_size, chunk_overlap).split_documents(documents)
 
-        # Add source URL to metadata if not present
-        for i, doc in enumerate(doc_splits):
-            if 'source' not in doc.metadata and i < len(urls):
-                doc.metadata['source'] = urls[i]
 
-        return doc_splits
+@lru_cache(maxsize=8)
+def _tiktoken_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """Splitters are reused, loading the tiktoken encoding is not free"""
+    return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
 
 
 class LlamaIndexDocumentLoader:
@@ -160,7 +207,7 @@ class LlamaIndexDocumentLoader:
     def create_document_tools(embeddings: Embeddings,
                             file_to_nodes: Dict[Path, List[BaseNode]]) -> List[Any]:
         """Create search and summary tools for each document"""
-        from ai_agents.utils import get_doc_tools
+        from app.ai_agents.utils import get_doc_tools
 
         all_tools = []
         for file_path, nodes in file_to_nodes.items():
@@ -0,0 +1,253 @@
+# app/semantic_search/embedding_cache.py
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Iterable, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from app.core.logger import logger
+from app.semantic_search.utils import content_hash, embeddings_model_name
+
+# SQLite limits the number of host parameters per statement
+_SQLITE_MAX_PARAMS = 500
+
+
+class SQLiteEmbeddingStore:
+    """
+    On-disk store of embedding vectors keyed on (model name, content hash).
+    Vectors are stored as float32 blobs, which is the precision Chroma keeps anyway.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """Return the stored vectors for the given hashes, missing ones are omitted"""
+        hashes = list(hashes)
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), _SQLITE_MAX_PARAMS):
+                batch = hashes[i:i + _SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for _hash, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[_hash] = vector.tolist()
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        """Store vectors by content hash"""
+        if not items:
+            return
+        rows = [(model, _hash, array("f", vector).tobytes()) for _hash, vector in items.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that persists document vectors in a SQLiteEmbeddingStore.
+
+    Only texts whose (model, content hash) is unknown are sent to the underlying
+    provider, so re-indexing an unchanged corpus does not call the embeddings API.
+    Queries are passed through untouched.
+    """
+
+    def __init__(self,
+                 underlying: Embeddings,
+                 cache_path: str,
+                 namespace: Optional[str] = None):
+        """
+        Args:
+            underlying: Embedding model to delegate to on cache misses
+            cache_path: Path of the SQLite file holding the vectors
+            namespace: Key prefix of the vectors, defaults to the embedding model name
+        """
+        self.underlying = underlying
+        self.namespace = namespace or embeddings_model_name(underlying)
+        self.store = SQLiteEmbeddingStore(cache_path)
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, texts: List[str]):
+        hashes = [content_hash(text) for text in texts]
+        cached = self.store.get_many(self.namespace, set(hashes))
+        # Unique texts that still need to be embedded, in first-seen order
+        missing = {}
+        for text, _hash in zip(texts, hashes):
+            if _hash not in cached and _hash not in missing:
+                missing[_hash] = text
+        self.hits += len(texts) - sum(1 for _hash in hashes if _hash in missing)
+        self.misses += len(missing)
+        return hashes, cached, missing
+
+    def _store(self, cached: Dict[str, List[float]], missing: Dict[str, str], vectors: List[List[float]]):
+        new_items = dict(zip(missing.keys(), vectors))
+        self.store.put_many(self.namespace, new_items)
+        cached.update(new_items)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, cached, missing = self._lookup(texts)
+        if missing:
+            logger.info(f"Embedding {len(missing)}/{len(texts)} texts not found in cache")
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            self._store(cached, missing, vectors)
+        return [cached[_hash] for _hash in hashes]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, cached, missing = self._lookup(texts)
+        if missing:
+            logger.info(f"Embedding {len(missing)}/{len(texts)} texts not found in cache")
+            vectors = await self.underlying.aembed_documents(list(missing.values()))
+            self._store(cached, missing, vectors)
+        return [cached[_hash] for _hash in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.underlying.aembed_query(text)
+
+
+class QueryEmbeddingCache:
+    """In-memory LRU of query embeddings, entries expire `ttl_seconds` after they were computed"""
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, text: str) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._entries.get(text)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[text]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, text: str, vector: List[float]) -> None:
+        with self._lock:
+            self._entries[text] = (time.monotonic(), vector)
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper caching query vectors in a QueryEmbeddingCache, so repeated questions
+    are not sent to the provider. Documents are passed through untouched.
+
+    embed_queries embeds the queries not in cache concurrently, each through the provider's query
+    path (embed_query), so they get the query instructions of the model and are never written to
+    the on-disk document cache.
+    """
+
+    # concurrent provider calls of embed_queries
+    max_concurrency = 8
+
+    def __init__(self, underlying: Embeddings, max_size: int = 256, ttl_seconds: float = 3600):
+        self.underlying = underlying
+        self.cache = QueryEmbeddingCache(max_size=max_size, ttl_seconds=ttl_seconds)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.underlying.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get(text)
+        if vector is None:
+            vector = self.underlying.embed_query(text)
+            self.cache.put(text, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = self.cache.get(text)
+        if vector is None:
+            vector = await self.underlying.aembed_query(text)
+            self.cache.put(text, vector)
+        return vector
+
+    def _missing(self, texts: List[str]) -> Tuple[Dict[str, List[float]], List[str]]:
+        found = {}
+        for text in texts:
+            if text not in found:
+                vector = self.cache.get(text)
+                if vector is not None:
+                    found[text] = vector
+        missing = list(dict.fromkeys(text for text in texts if text not in found))
+        return found, missing
+
+    def _store(self, found: Dict[str, List[float]], missing: List[str], vectors: List[List[float]]) -> None:
+        for text, vector in zip(missing, vectors):
+            self.cache.put(text, vector)
+            found[text] = vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries, the ones not in cache concurrently"""
+        found, missing = self._missing(texts)
+        if len(missing) == 1:
+            self._store(found, missing, [self.underlying.embed_query(missing[0])])
+        elif missing:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(missing))) as executor:
+                self._store(found, missing, list(executor.map(self.underlying.embed_query, missing)))
+        return [found[text] for text in texts]
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Asynchronously embed several queries, the ones not in cache concurrently"""
+        found, missing = self._missing(texts)
+        if missing:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def _embed(text: str) -> List[float]:
+                async with semaphore:
+                    return await self.underlying.aembed_query(text)
+
+            self._store(found, missing, await asyncio.gather(*(_embed(text) for text in missing)))
+        return [found[text] for text in texts]
@@ -0,0 +1,207 @@
+# app/semantic_search/embedding_pipeline.py
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from app.core.logger import logger
+from app.semantic_search.utils import count_tokens
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    """Rate limit errors of the OpenAI and Mistral clients (openai.RateLimitError, httpx.HTTPStatusError)"""
+    status_code = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    if status_code is None and response is not None:
+        status_code = getattr(response, "status_code", None)
+    if status_code == 429:
+        return True
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class EmbeddingMetrics:
+    """Counters of an embedding pipeline"""
+    texts: int = 0
+    tokens: int = 0
+    batches: int = 0
+    rate_limited: int = 0
+    seconds: float = 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.tokens / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "tokens_per_second": self.tokens_per_second}
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper sending documents to the provider in batches sized by token count.
+
+    Batches are embedded with bounded concurrency, and retried with exponential backoff
+    when the provider answers 429. The token budget of a batch is halved on each rate limit
+    and slowly grows back on success, so large indexing jobs settle at the provider quota.
+    """
+
+    def __init__(self,
+                 underlying: Embeddings,
+                 max_batch_tokens: int = 8000,
+                 max_batch_size: int = 128,
+                 max_concurrency: int = 4,
+                 max_retries: int = 6,
+                 initial_backoff: float = 1.0,
+                 max_backoff: float = 60.0):
+        """
+        Args:
+            underlying: Embedding model to delegate to
+            max_batch_tokens: Maximum number of tokens sent in one request
+            max_batch_size: Maximum number of texts sent in one request
+            max_concurrency: Maximum number of requests in flight
+            max_retries: Number of retries of a rate limited batch before giving up
+            initial_backoff: First backoff delay in seconds, doubled on each retry
+            max_backoff: Maximum backoff delay in seconds
+        """
+        self.underlying = underlying
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.metrics = EmbeddingMetrics()
+        self._batch_tokens = max_batch_tokens
+        self._lock = threading.Lock()
+
+    def _batches(self, texts: List[str]) -> List[Tuple[List[int], int]]:
+        """Indexes of the texts of each batch, in order, with the number of tokens of the batch"""
+        budget = self._batch_tokens
+        batches, batch, batch_tokens = [], [], 0
+        for i, tokens in enumerate(count_tokens(texts)):
+            if batch and (batch_tokens + tokens > budget or len(batch) >= self.max_batch_size):
+                batches.append((batch, batch_tokens))
+                batch, batch_tokens = [], 0
+            batch.append(i)
+            batch_tokens += tokens
+        if batch:
+            batches.append((batch, batch_tokens))
+        return batches
+
+    def _on_success(self, texts: int, tokens: int, seconds: float) -> None:
+        with self._lock:
+            self.metrics.texts += texts
+            self.metrics.tokens += tokens
+            self.metrics.batches += 1
+            self.metrics.seconds += seconds
+            self._batch_tokens = min(self.max_batch_tokens, int(self._batch_tokens * 1.1) + 1)
+
+    def _on_rate_limit(self, error: Exception, attempt: int) -> float:
+        with self._lock:
+            self.metrics.rate_limited += 1
+            self._batch_tokens = max(1, self._batch_tokens // 2)
+        delay = _retry_after(error) or min(self.max_backoff, self.initial_backoff * 2 ** attempt)
+        # jitter, so concurrent batches do not retry all at once
+        delay *= 1 + random.random() * 0.25
+        logger.warning(f"Embeddings rate limited, retrying in {delay:.1f}s (attempt {attempt + 1})")
+        return delay
+
+    @staticmethod
+    def _halves(texts: List[str]) -> List[Tuple[List[str], int]]:
+        middle = len(texts) // 2
+        return [(half, sum(count_tokens(half))) for half in (texts[:middle], texts[middle:])]
+
+    def _log_progress(self, done: int, total: int) -> None:
+        logger.info(f"Embedded {done}/{total} texts ({self.metrics.tokens_per_second:.0f} tokens/s)")
+
+    def _embed_batch(self, texts: List[str], tokens: int) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                vectors = self.underlying.embed_documents(texts)
+            except Exception as e:
+                if attempt == self.max_retries or not _is_rate_limit_error(e):
+                    raise
+                time.sleep(self._on_rate_limit(e, attempt))
+                if len(texts) > 1 and tokens > self._batch_tokens:
+                    # the batch is over the reduced budget, resend it in two halves
+                    return [vector for half in self._halves(texts) for vector in self._embed_batch(*half)]
+                continue
+            self._on_success(len(texts), tokens, time.perf_counter() - start)
+            return vectors
+
+    async def _aembed_batch(self, texts: List[str], tokens: int) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                vectors = await self.underlying.aembed_documents(texts)
+            except Exception as e:
+                if attempt == self.max_retries or not _is_rate_limit_error(e):
+                    raise
+                await asyncio.sleep(self._on_rate_limit(e, attempt))
+                if len(texts) > 1 and tokens > self._batch_tokens:
+                    # the batch is over the reduced budget, resend it in two halves
+                    return [vector for half in self._halves(texts) for vector in await self._aembed_batch(*half)]
+                continue
+            self._on_success(len(texts), tokens, time.perf_counter() - start)
+            return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        batches = self._batches(texts)
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        done = 0
+
+        def _embed(batch: Tuple[List[int], int]) -> List[int]:
+            batch, tokens = batch
+            for i, vector in zip(batch, self._embed_batch([texts[i] for i in batch], tokens)):
+                vectors[i] = vector
+            return batch
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+            for batch in executor.map(_embed, batches):
+                done += len(batch)
+                self._log_progress(done, len(texts))
+        return vectors
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        batches = self._batches(texts)
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        done = 0
+
+        async def _embed(batch: List[int], tokens: int) -> None:
+            nonlocal done
+            async with semaphore:
+                batch_vectors = await self._aembed_batch([texts[i] for i in batch], tokens)
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+            done += len(batch)
+            self._log_progress(done, len(texts))
+
+        await asyncio.gather(*(_embed(batch, tokens) for batch, tokens in batches))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.underlying.aembed_query(text)
@@ -12,10 +12,13 @@ from app.semantic_search.core import (
     VectorStoreManager
 )
 from app.semantic_search.document_loaders import DocumentLoader, LlamaIndexDocumentLoader
+from app.semantic_search.hybrid import HybridSearch
+from app.semantic_search.ingestion import IngestionManifest
 
 class SearchStrategyType(Enum):
     """Types of search strategies available"""
     SIMPLE_VECTOR = "simple_vector"
+    HYBRID = "hybrid"
     MULTI_DOCUMENT = "multi_document"
 
 class SemanticSearchFactory:
@@ -51,13 +54,30 @@ class SemanticSearchFactory:
                 collection_name=collection_name,
                 persist_directory=persist_directory,
                 search_type=kwargs.get("search_type", "similarity_score_threshold"),
-                score_threshold=kwargs.get("score_threshold", 0.7)
+                score_threshold=kwargs.get("score_threshold", 0.7),
+                query_cache_size=kwargs.get("query_cache_size", 256),
+                query_cache_ttl=kwargs.get("query_cache_ttl", 3600),
+                k=kwargs.get("k", 4)
             )
 
             # Initialize the VectorStoreManager with the strategy
 
             return strategy
 
+        elif strategy_type == SearchStrategyType.HYBRID:
+            if not embeddings:
+                raise ValueError("Embeddings are required for HYBRID strategy")
+
+            return HybridSearch(
+                embeddings=embeddings,
+                collection_name=kwargs.get("collection_name", "default_collection"),
+                persist_directory=persist_directory,
+                k=kwargs.get("k", 4),
+                fetch_k=kwargs.get("fetch_k", 20),
+                rrf_k=kwargs.get("rrf_k", 60),
+                exact_max_terms=kwargs.get("exact_max_terms", 3)
+            )
+
         else:
             raise ValueError(f"Unknown strategy type: {strategy_type}")
 
@@ -75,19 +95,52 @@ class SemanticSearchFactory:
             strategy: The search strategy to add documents to
             file_paths: Paths to the files to load
             embeddings: Embedding model (required for multi-document)
-            **kwargs: Additional arguments for document loading
+            **kwargs: Additional arguments for document loading:
+                chunk_size, chunk_overlap,
+                max_workers: number of processes parsing files (by default in process for a few
+                    small files, one per CPU otherwise, see iter_file_chunks),
+                manifest_path: JSON manifest of ingested files, unchanged files are skipped,
+                batch_size: number of chunks added to the index at once (default 1000)
 
         Returns:
             The updated search strategy
         """
-        if isinstance(strategy, SimpleVectorSearch):
-            # For simple vector search, load as documents
-            documents = DocumentLoader.load_from_files(
-                file_paths,
-                chunk_size=kwargs.get("chunk_size", 1000),
-                chunk_overlap=kwargs.get("chunk_overlap", 200)
-            )
-            strategy.add_documents(documents)
+        if isinstance(strategy, (SimpleVectorSearch, HybridSearch)):
+            # For vector and hybrid search, chunks are indexed while the remaining files are parsed
+            chunk_size = kwargs.get("chunk_size", 1000)
+            chunk_overlap = kwargs.get("chunk_overlap", 200)
+            batch_size = kwargs.get("batch_size", 1000)
+            manifest = None
+            if kwargs.get("manifest_path"):
+                manifest = IngestionManifest(kwargs["manifest_path"],
+                                             settings={"chunk_size": chunk_size, "chunk_overlap": chunk_overlap})
+
+            batch, batch_files = [], []
+
+            def _flush():
+                if batch:
+                    strategy.add_documents(batch)
+                # files are recorded only once their chunks are indexed
+                if manifest is not None:
+                    for file_path in batch_files:
+                        manifest.record(file_path)
+                    manifest.save()
+                batch.clear()
+                batch_files.clear()
+
+            for file_path, documents in DocumentLoader.iter_from_files(
+                    file_paths,
+                    chunk_size=chunk_size,
+                    chunk_overlap=chunk_overlap,
+                    max_workers=kwargs.get("max_workers"),
+                    manifest=manifest
+            ):
+                batch.extend(documents)
+                batch_files.append(file_path)
+                if len(batch) >= batch_size:
+                    _flush()
+            if batch_files:
+                _flush()
 
         else:
             raise ValueError(f"Unsupported strategy type: {type(strategy)}")
@@ -117,7 +170,10 @@ class SemanticSearchFactory:
         documents = DocumentLoader.load_from_urls(
             urls,
             chunk_size=kwargs.get("chunk_size", 1000),
-            chunk_overlap=kwargs.get("chunk_overlap", 200)
+            chunk_overlap=kwargs.get("chunk_overlap", 200),
+            cache_dir=kwargs.get("cache_dir"),
+            per_host_limit=kwargs.get("per_host_limit", 4),
+            timeout=kwargs.get("timeout", 10.0)
         )
         strategy.add_documents(documents)
 
@@ -0,0 +1,260 @@
+# app/semantic_search/hybrid.py
+import math
+import re
+import threading
+import unicodedata
+import uuid
+from collections import Counter, defaultdict
+from typing import List, Optional, Dict, Any, Set, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.core.logger import logger
+from app.semantic_search.core import SearchStrategy, SimpleVectorSearch
+
+_TOKEN_PATTERN = re.compile(r"\w+", flags=re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words without accents, so "Éligibilité" matches "eligibilite" """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _TOKEN_PATTERN.findall(text)
+
+
+def document_id(document: Document) -> str:
+    """Id of a document, the content based id used by SimpleVectorSearch when it has none"""
+    return document.id or str(uuid.uuid5(uuid.NAMESPACE_DNS, document.page_content))
+
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """Equality filter on metadata, a list of values matches any of them"""
+    if not filter:
+        return True
+    for key, expected in filter.items():
+        value = metadata.get(key)
+        if isinstance(expected, (list, tuple, set)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+def to_chroma_filter(filter: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Convert an equality filter to the Chroma where syntax"""
+    if not filter:
+        return None
+    clauses = [{key: {"$in": list(value)}} if isinstance(value, (list, tuple, set)) else {key: value}
+               for key, value in filter.items()]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class BM25Index:
+    """In-process inverted index ranking documents with Okapi BM25"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents: List[Document] = []
+        self._ids: Dict[str, int] = {}
+        self._lengths: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @property
+    def terms(self) -> int:
+        return len(self._postings)
+
+    @property
+    def postings(self) -> int:
+        return sum(len(postings) for postings in self._postings.values())
+
+    def add(self, documents: List[Document]) -> None:
+        with self._lock:
+            for document in documents:
+                _id = document_id(document)
+                if _id in self._ids:
+                    continue
+                position = len(self.documents)
+                self._ids[_id] = position
+                self.documents.append(document)
+                terms = Counter(tokenize(document.page_content))
+                for term, frequency in terms.items():
+                    self._postings[term][position] = frequency
+                length = sum(terms.values())
+                self._lengths.append(length)
+                self._total_length += length
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self.documents) - df + 0.5) / (df + 0.5))
+
+    def _scores(self, terms: Set[str]) -> Dict[int, float]:
+        """BM25 score of the documents containing at least one of the terms, by position"""
+        average_length = self._total_length / len(self.documents)
+        scores: Dict[int, float] = defaultdict(float)
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for position, frequency in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[position] / average_length)
+                scores[position] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return scores
+
+    def search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """Best k documents for the query with their BM25 score"""
+        if not self.documents:
+            return []
+        ranked = sorted(self._scores(set(tokenize(query))).items(), key=lambda item: item[1], reverse=True)
+        results = []
+        for position, score in ranked:
+            document = self.documents[position]
+            if matches_filter(document.metadata, filter):
+                results.append((document, score))
+                if len(results) == k:
+                    break
+        return results
+
+    def lookup(self, query: str, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Documents containing every term of the query, best BM25 score first"""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        postings = [self._postings.get(term) for term in terms]
+        if not all(postings):
+            return []
+        positions = set.intersection(*(set(posting) for posting in postings))
+        scores = self._scores(terms)
+        return [self.documents[position] for position in sorted(positions, key=lambda p: (-scores[p], p))
+                if matches_filter(self.documents[position].metadata, filter)]
+
+
+class HybridSearch(SearchStrategy):
+    """
+    Hybrid search combining a BM25 lexical index and a Chroma vector store.
+
+    Both result lists are fused with reciprocal rank fusion. Short queries whose terms are all
+    found in a few documents (error codes, product names) are answered from the lexical index
+    alone, without embedding the query.
+    """
+
+    def __init__(
+            self,
+            embeddings: Embeddings,
+            collection_name: str = "default_collection",
+            persist_directory: Optional[str] = None,
+            k: int = 4,
+            fetch_k: int = 20,
+            rrf_k: int = 60,
+            exact_max_terms: int = 3,
+            **kwargs
+    ):
+        """
+        Initialize the hybrid search
+
+        Args:
+            embeddings: Embedding model to use
+            collection_name: Name of the Chroma collection
+            persist_directory: Directory to persist the vector store (if None, uses in-memory store)
+            k: Number of documents returned
+            fetch_k: Number of documents retrieved from each index before fusion
+            rrf_k: Rank constant of the reciprocal rank fusion
+            exact_max_terms: Maximum number of terms of a query answered by exact lookup (0 disables it)
+            **kwargs: Additional arguments of SimpleVectorSearch
+        """
+        self.k = k
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+        self.exact_max_terms = exact_max_terms
+        self.vector_search = SimpleVectorSearch(
+            embeddings=embeddings,
+            collection_name=collection_name,
+            persist_directory=persist_directory,
+            **kwargs
+        )
+        self.lexical_index = BM25Index()
+        self._load_lexical_index()
+
+    def stats(self) -> Dict[str, Any]:
+        """Vector store stats, with the size of the lexical index"""
+        return {
+            **self.vector_search.stats(),
+            "lexical_documents": len(self.lexical_index),
+            "lexical_terms": self.lexical_index.terms,
+            "lexical_postings": self.lexical_index.postings,
+        }
+
+    def _load_lexical_index(self):
+        """Index the documents of an existing collection"""
+        if self.vector_search.vectorstore is None:
+            return
+        stored = self.vector_search.vectorstore.get(include=["documents", "metadatas"])
+        self.lexical_index.add([
+            Document(id=_id, page_content=content, metadata=metadata or {})
+            for _id, content, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        ])
+        logger.info(f"Loaded {len(self.lexical_index)} documents in the lexical index")
+
+    def add_documents(self, documents: List[Document]) -> None:
+        """Add documents to the vector store and the lexical index"""
+        # sets the content based ids of the documents
+        self.vector_search.add_documents(documents)
+        self.lexical_index.add(documents)
+
+    def _exact_lookup(self, query: str, k: int, filter: Optional[Dict[str, Any]]) -> Optional[List[Document]]:
+        terms = tokenize(query)
+        if not terms or len(terms) > self.exact_max_terms:
+            return None
+        documents = self.lexical_index.lookup(query, filter)
+        if not documents or len(documents) > k:
+            return None
+        return documents
+
+    def _fuse(self, *rankings: List[Document], k: int) -> List[Document]:
+        scores: Dict[str, float] = defaultdict(float)
+        documents: Dict[str, Document] = {}
+        for ranking in rankings:
+            for rank, document in enumerate(ranking):
+                _id = document_id(document)
+                scores[_id] += 1 / (self.rrf_k + rank + 1)
+                documents.setdefault(_id, document)
+        best = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [documents[_id] for _id in best]
+
+    def retrieve(self, query: str, k: Optional[int] = None, filter: Optional[Dict[str, Any]] = None,
+                 **kwargs) -> List[Document]:
+        """Retrieve documents by lexical and vector similarity, with optional metadata equality filter"""
+        k = k or self.k
+        exact = self._exact_lookup(query, k, filter)
+        if exact is not None:
+            return exact
+
+        lexical = [document for document, _ in self.lexical_index.search(query, self.fetch_k, filter)]
+        vector = []
+        if self.vector_search.vectorstore is not None:
+            vector = self.vector_search.vectorstore.similarity_search(
+                query, k=self.fetch_k, filter=to_chroma_filter(filter))
+        return self._fuse(lexical, vector, k=k)
+
+    async def aretrieve(self, query: str, k: Optional[int] = None, filter: Optional[Dict[str, Any]] = None,
+                        **kwargs) -> List[Document]:
+        """Asynchronously retrieve documents by lexical and vector similarity"""
+        k = k or self.k
+        exact = self._exact_lookup(query, k, filter)
+        if exact is not None:
+            return exact
+
+        lexical = [document for document, _ in self.lexical_index.search(query, self.fetch_k, filter)]
+        vector = []
+        if self.vector_search.vectorstore is not None:
+            vector = await self.vector_search.vectorstore.asimilarity_search(
+                query, k=self.fetch_k, filter=to_chroma_filter(filter))
+        return self._fuse(lexical, vector, k=k)
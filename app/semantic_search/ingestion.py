@@ -0,0 +1,167 @@
+# app/semantic_search/ingestion.py
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.core.logger import logger
+from app.semantic_search.utils import file_hash
+
+# Below these, spawning worker processes (each importing the loaders) costs more than it saves
+PARALLEL_MIN_FILES = 8
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+
+class IngestionManifest:
+    """
+    Record of the files already ingested, stored as JSON.
+
+    Each file is identified by its path and stored with its mtime, size and content hash.
+    A file is considered changed when its mtime or size differ and its content hash is different,
+    so touching a file does not re-process it. Changing the split settings invalidates every entry.
+    """
+
+    def __init__(self, path: str, settings: Optional[Dict] = None):
+        self.path = path
+        self.settings = settings or {}
+        self._lock = threading.Lock()
+        self._files: Dict[str, Dict] = {}
+        # content hashes computed while checking files, reused when they are recorded
+        self._hashes: Dict[str, str] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    content = json.load(file)
+                if content.get("settings") == self.settings:
+                    self._files = content.get("files", {})
+                else:
+                    logger.info(f"Split settings changed, ignoring ingestion manifest {path}")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read ingestion manifest {path}: {e}")
+
+    @staticmethod
+    def _key(file_path: Path) -> str:
+        return str(Path(file_path).resolve())
+
+    def is_changed(self, file_path: Path) -> bool:
+        """
+        Return whether a file must be (re-)processed.
+        The content hash is only computed when the mtime or size of the file changed.
+        """
+        key = self._key(file_path)
+        stat = os.stat(file_path)
+        entry = self._files.get(key)
+        if entry is None:
+            return True
+        if entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            return False
+        content_hash = file_hash(file_path)
+        if content_hash == entry["hash"]:
+            # same content, only remember the new mtime
+            self.record(file_path, content_hash)
+            return False
+        with self._lock:
+            self._hashes[key] = content_hash
+        return True
+
+    def record(self, file_path: Path, content_hash: Optional[str] = None) -> None:
+        """Mark a file as ingested"""
+        key = self._key(file_path)
+        stat = os.stat(file_path)
+        with self._lock:
+            content_hash = content_hash or self._hashes.pop(key, None)
+        content_hash = content_hash or file_hash(file_path)
+        with self._lock:
+            self._files[key] = {"mtime": stat.st_mtime, "size": stat.st_size, "hash": content_hash}
+
+    def save(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            content = {"settings": self.settings, "files": self._files}
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(content, file, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+def _parse_file(file_path: str, chunk_size: int, chunk_overlap: int) -> Tuple[str, List[Document], Optional[str]]:
+    """Load and split a file, in a worker process. Errors are returned, not raised."""
+    # imported here, the module is imported by document_loaders
+    from app.semantic_search.document_loaders import DocumentLoader
+
+    try:
+        return file_path, DocumentLoader.load_from_file(Path(file_path), chunk_size, chunk_overlap), None
+    except Exception as e:
+        return file_path, [], repr(e)
+
+
+def iter_file_chunks(file_paths: List[Path],
+                     chunk_size: int = 1000,
+                     chunk_overlap: int = 200,
+                     max_workers: Optional[int] = None,
+                     manifest: Optional[IngestionManifest] = None) -> Iterator[Tuple[Path, List[Document]]]:
+    """
+    Parse and split files, yielding each file with its chunks as soon as it is done.
+
+    Files are parsed in process unless max_workers asks for a pool, or there are at least
+    PARALLEL_MIN_FILES files or PARALLEL_MIN_BYTES to parse.
+
+    Files unchanged according to the manifest are skipped. Files are not recorded in the manifest,
+    it is up to the caller to record them once their chunks are indexed.
+
+    Args:
+        file_paths: Files to ingest
+        chunk_size: Size of the chunks
+        chunk_overlap: Overlap between chunks
+        max_workers: Number of worker processes, 1 parses in process. By default, one per CPU
+            above the parallel thresholds, in process below
+        manifest: Manifest of the files already ingested
+    """
+    pending = []
+    for path in file_paths:
+        path = Path(path)
+        if not path.exists():
+            logger.error(f"Error loading {path}: file not found")
+            continue
+        if manifest is not None and not manifest.is_changed(path):
+            continue
+        pending.append(str(path))
+
+    logger.info(f"Ingesting {len(pending)}/{len(file_paths)} files")
+    if not pending:
+        return
+    if max_workers is None:
+        total_bytes = sum(os.path.getsize(file_path) for file_path in pending)
+        parallel = len(pending) >= PARALLEL_MIN_FILES or total_bytes >= PARALLEL_MIN_BYTES
+        max_workers = (os.cpu_count() or 1) if parallel else 1
+    max_workers = min(max_workers, len(pending))
+
+    def _result(file_path: str, docs: List[Document], error: Optional[str]):
+        if error:
+            logger.error(f"Error loading {file_path}: {error}")
+            return
+        logger.info(f"Loaded {len(docs)} chunks from {file_path}")
+        yield Path(file_path), docs
+
+    if max_workers <= 1:
+        for file_path in pending:
+            yield from _result(*_parse_file(file_path, chunk_size, chunk_overlap))
+        return
+
+    # spawn: do not fork the vector store clients and threads of the parent process
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(_parse_file, file_path, chunk_size, chunk_overlap) for file_path in pending]
+        try:
+            for future in as_completed(futures):
+                yield from _result(*future.result())
+        finally:
+            # the consumer may stop early, do not parse the remaining files
+            for future in futures:
+                future.cancel()
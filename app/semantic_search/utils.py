@@ -0,0 +1,51 @@
+# app/semantic_search/utils.py
+import hashlib
+from pathlib import Path
+from typing import List, Union
+
+from langchain_core.embeddings import Embeddings
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken or its encoding file unavailable
+    _encoding = None
+
+
+def count_tokens(texts: List[str]) -> List[int]:
+    """Token count of each text, approximated with cl100k_base (4 characters per token without tiktoken)"""
+    if _encoding is None:
+        return [len(text) // 4 + 1 for text in texts]
+    return [len(tokens) for tokens in _encoding.encode_ordinary_batch(texts)]
+
+
+def content_hash(text: str) -> str:
+    """Return a stable SHA-256 hex digest for a piece of text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_hash(file_path: Union[str, Path], block_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file content, read by blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def embeddings_model_name(embeddings: Embeddings) -> str:
+    """
+    Return an identifier of the embedding model behind an Embeddings object.
+
+    Wrappers exposing an `underlying` attribute are unwrapped first, so a cached
+    or batched embeddings resolves to the provider model it delegates to.
+    """
+    while hasattr(embeddings, "underlying"):
+        embeddings = embeddings.underlying
+
+    for attr in ("model", "model_name"):
+        value = getattr(embeddings, attr, None)
+        if isinstance(value, str) and value:
+            return f"{type(embeddings).__name__}:{value}"
+    return type(embeddings).__name__
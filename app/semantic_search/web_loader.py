@@ -0,0 +1,142 @@
+# app/semantic_search/web_loader.py
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+
+from app.core.logger import logger
+from app.semantic_search.utils import content_hash
+
+_DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; AI-Agent-Casebook document loader)",
+    "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.8",
+}
+
+
+class HttpCache:
+    """
+    On-disk cache of fetched pages with their ETag and Last-Modified validators,
+    used to send conditional requests and reuse the body on 304 Not Modified.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, f"{content_hash(url)}.json")
+
+    def get(self, url: str) -> Optional[Dict]:
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, response: httpx.Response) -> None:
+        entry = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_type": response.headers.get("Content-Type", ""),
+            "text": response.text,
+        }
+        tmp_path = f"{self._path(url)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, self._path(url))
+
+
+def _to_document(url: str, text: str, content_type: str) -> Document:
+    """Build a document with the same metadata as WebBaseLoader"""
+    metadata = {"source": url}
+    if "html" not in content_type and text.lstrip()[:1] != "<":
+        return Document(page_content=text, metadata=metadata)
+
+    soup = BeautifulSoup(text, "html.parser")
+    if title := soup.find("title"):
+        metadata["title"] = title.get_text()
+    if description := soup.find("meta", attrs={"name": "description"}):
+        metadata["description"] = description.get("content", "No description found.")
+    if html := soup.find("html"):
+        metadata["language"] = html.get("lang", "No language found.")
+    return Document(page_content=soup.get_text(), metadata=metadata)
+
+
+async def _fetch(client: httpx.AsyncClient,
+                 url: str,
+                 semaphore: asyncio.Semaphore,
+                 cache: Optional[HttpCache]) -> Optional[Document]:
+    cached = cache.get(url) if cache else None
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    async with semaphore:
+        try:
+            response = await client.get(url, headers=headers)
+            if response.status_code == 304 and cached:
+                logger.info(f"Not modified since last load, using cached content of URL: {url}")
+                return _to_document(url, cached["text"], cached["content_type"])
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            if cached:
+                logger.warning(f"Error loading URL {url}: {e}, using cached content")
+                return _to_document(url, cached["text"], cached["content_type"])
+            logger.error(f"Error loading URL {url}: {e}")
+            return None
+
+    if cache:
+        cache.put(url, response)
+    logger.info(f"Loaded content from URL: {url}")
+    return _to_document(url, response.text, response.headers.get("Content-Type", ""))
+
+
+async def afetch_urls(urls: List[str],
+                      cache_dir: Optional[str] = None,
+                      per_host_limit: int = 4,
+                      timeout: float = 10.0,
+                      transport: Optional[httpx.AsyncBaseTransport] = None) -> List[Document]:
+    """
+    Fetch URLs concurrently over a shared keep-alive client, one document per URL loaded, in order.
+
+    Args:
+        urls: URLs to fetch
+        cache_dir: Directory of the conditional request cache, no cache if None
+        per_host_limit: Maximum number of concurrent requests to the same host
+        timeout: Timeout in seconds of each request
+        transport: Transport of the client, httpx default transport if None
+    """
+    cache = HttpCache(cache_dir) if cache_dir else None
+    semaphores: Dict[str, asyncio.Semaphore] = {}
+    for url in urls:
+        semaphores.setdefault(urlparse(url).netloc, asyncio.Semaphore(per_host_limit))
+
+    async with httpx.AsyncClient(headers=_DEFAULT_HEADERS,
+                                 timeout=httpx.Timeout(timeout),
+                                 follow_redirects=True,
+                                 transport=transport) as client:
+        documents = await asyncio.gather(
+            *(_fetch(client, url, semaphores[urlparse(url).netloc], cache) for url in urls)
+        )
+    return [document for document in documents if document is not None]
+
+
+def fetch_urls(urls: List[str], **kwargs) -> List[Document]:
+    """Synchronous afetch_urls, also usable from code already running in an event loop"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(afetch_urls(urls, **kwargs))
+    # called from a running loop (e.g. module imported by the server), fetch in a thread with its own loop
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, afetch_urls(urls, **kwargs)).result()
@@ -1,9 +1,12 @@
+import asyncio
+import copy
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Optional, TypedDict, List, Literal, Callable, Any
+from typing import Optional, TypedDict, List, Literal, Callable, Any, Dict, Tuple
 
 from app.ai_agents.base import Agent, Input, Output
-from langchain import hub
-from langsmith import AsyncClient
+from app.core.prompts import get_prompt
 from langchain_core.language_models import BaseChatModel
 from langchain_core.runnables import RunnableSerializable
 from langchain_core.runnables import RunnableConfig
@@ -15,9 +18,6 @@ from app.core.logger import logger
 import json
 
 
-# Créer un client asynchrone LangSmith
-async_client = AsyncClient()
-
 ##############
 # PRODUCER   #
 ##############
@@ -42,7 +42,7 @@ class Planner(AbstractAgent):
 
     def _initiate_runnable(self) -> RunnableSerializable:
         logger.debug("Initiating Planner Agent")
-        producer_prompt = hub.pull("video-script-producer-prompt")
+        producer_prompt = get_prompt("video-script-producer-prompt")
 
         return producer_prompt | self.model.with_structured_output(Planning)
     
@@ -110,10 +110,27 @@ OUTPUT FORMAT (STRICT JSON only):
 """
 
 
+# evaluator scores, from worst to best
+_SCORE_RANKS = {"fail": 0, "needs_improvement": 1, "pass": 2}
+
+
 class Planner2(Agent):
-    def __init__(self, name: str, model_name: str):
+    """
+    Outline generator improved by an evaluator, for at most max_iterations rounds.
+    The loop stops early when the score does not improve, and outlines are cached by normalized
+    user prompt (LRU of cache_size entries, 0 disables it) so a repeated prompt is not planned again.
+    Concurrent calls with the same prompt share a single planning.
+    """
+
+    def __init__(self, name: str, model_name: str, max_iterations: int = 3, cache_size: int = 64):
         super().__init__(name = name)
-        self.model_name = model_name    
+        self.model_name = model_name
+        self.max_iterations = max(1, max_iterations)
+        self.cache_size = cache_size
+        self._outlines: "OrderedDict[str, Planning]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # plannings in progress, by (event loop, cache key)
+        self._plannings: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
 
         self.story_outline_generator = AgentSDKAgent(
             name="story_outline_generator",
@@ -177,15 +194,56 @@ class Planner2(Agent):
             "Évaluez le PLAN par rapport au USER PROMPT en appliquant STRICTEMENT les règles d’évaluation. "
         )
 
+    @staticmethod
+    def _cache_key(user_prompt: str) -> str:
+        """User prompt without case and whitespace differences"""
+        return " ".join(user_prompt.lower().split())
+
+    def _cached_outline(self, key: str) -> Optional[Planning]:
+        with self._cache_lock:
+            outline = self._outlines.get(key)
+            if outline is not None:
+                self._outlines.move_to_end(key)
+        return copy.deepcopy(outline) if outline is not None else None
+
+    def _cache_outline(self, key: str, outline: Planning) -> None:
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            self._outlines[key] = copy.deepcopy(outline)
+            self._outlines.move_to_end(key)
+            while len(self._outlines) > self.cache_size:
+                self._outlines.popitem(last=False)
+
     async def ainvoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
         # input == user prompt (exigences utilisateur)
         user_prompt_str = str(input)
+        key = self._cache_key(user_prompt_str)
+        cached = self._cached_outline(key)
+        if cached is not None:
+            logger.info("Planner: returning the cached outline of the same prompt")
+            return Output(cached)
+
+        planning_key = (asyncio.get_running_loop(), key)
+        planning = self._plannings.get(planning_key)
+        if planning is None:
+            planning = asyncio.ensure_future(self._plan(user_prompt_str, key))
+            self._plannings[planning_key] = planning
+            planning.add_done_callback(lambda _: self._plannings.pop(planning_key, None))
+        else:
+            logger.info("Planner: waiting for the planning of the same prompt")
+        # a cancelled caller does not cancel the planning the others wait for
+        return Output(copy.deepcopy(await asyncio.shield(planning)))
+
+    async def _plan(self, user_prompt_str: str, key: str) -> dict:
+        """Outline/evaluation rounds of a prompt, the outline is cached unless the planning failed"""
         input_items: list[TResponseInputItem] = [{"content": user_prompt_str, "role": "user"}]
 
-        latest_outline: Planning | None = None
+        best_outline: Planning | None = None
+        best_rank = -1
         trace_id = gen_trace_id()
         with trace("Agent SDK Planner", trace_id=trace_id):
-            while True:
+            for iteration in range(1, self.max_iterations + 1):
                 story_outline_result = await AgentSDKRunner.run(
                     self.story_outline_generator,
                     input_items,
@@ -195,7 +253,7 @@ class Planner2(Agent):
                 result: Planning = latest_outline
 
                 formatted_plan = self._format_plan_for_evaluation(result['plan'], video_title=result.get('video_title'))
-                planning_obj = latest_outline 
+                planning_obj = latest_outline
                 eval_request = self._build_evaluation_request(user_prompt_str, planning_obj)
 
                 # On envoie AU JUGE à la fois le user prompt et le plan
@@ -206,71 +264,48 @@ class Planner2(Agent):
 
                 eval_feedback: EvaluationFeedback = evaluator_result.final_output
                 score = eval_feedback['score']
+                rank = _SCORE_RANKS.get(score, 0)
+                logger.info(f"Planner iteration {iteration}/{self.max_iterations}: score='{score}'")
 
-                if score == "pass":
-                    break
-
-                if score == "fail":
+                if score == "fail" and best_outline is None:
                     # Stoppe net pour économiser des tokens
                     # Tu peux aussi logger eval_feedback['feedback'] pour diagnostic
-                    return Output({
+                    return {
                         "status": "stopped",
                         "reason": "fail",
                         "evaluation": eval_feedback,
-                    })
-
-                # needs_improvement -> on boucle en fournissant le feedback
-                input_items = [
-                    {"content": user_prompt_str, "role": "user"},
-                    {"content": formatted_plan, "role": "user"},
-                    {"content": f"Feedback: {eval_feedback['feedback']}", "role": "user"},
-                ]
-
-        return Output(latest_outline)
-
-    def invoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
-        user_prompt_str = str(input)
-        input_items: list[TResponseInputItem] = [{"content": user_prompt_str, "role": "user"}]
-        latest_outline: Planning | None = None
+                    }
 
-        with trace("Agent SDK Planner"):
-            while True:
-                story_outline_result = AgentSDKRunner.run(
-                    self.story_outline_generator,
-                    input_items,
-                )
-                latest_outline = story_outline_result.final_output
-                result: Planning = latest_outline
-
-                formatted_plan = self._format_plan_for_evaluation(result['plan'])
-                planning_obj = latest_outline 
-                eval_request = self._build_evaluation_request(user_prompt_str, planning_obj)
-
-                evaluator_result = AgentSDKRunner.run(
-                    self.evaluator,
-                    [{"content": eval_request, "role": "user"}],
-                )
-                eval_feedback: EvaluationFeedback = evaluator_result.final_output
-                score = eval_feedback['score']
+                improved = rank > best_rank
+                if rank >= best_rank:
+                    # on equal score keep the latest outline, it takes the last feedback into account
+                    best_outline, best_rank = latest_outline, rank
 
                 if score == "pass":
                     break
+                if iteration > 1 and not improved:
+                    logger.info(f"Planner: score did not improve ('{score}'), keeping the best outline")
+                    break
 
-                if score == "fail":
-                    return Output({
-                        "status": "stopped",
-                        "reason": "fail",
-                        "evaluation": eval_feedback,
-                    })
-
+                # needs_improvement -> on boucle en fournissant le feedback
                 input_items = [
                     {"content": user_prompt_str, "role": "user"},
                     {"content": formatted_plan, "role": "user"},
                     {"content": f"Feedback: {eval_feedback['feedback']}", "role": "user"},
                 ]
+            else:
+                logger.info(f"Planner: maximum iterations reached ({self.max_iterations}), keeping the best outline")
 
-        return Output(latest_outline)
+        self._cache_outline(key, best_outline)
+        return best_outline
 
+    def invoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
+        """Blocking planning, for synchronous callers only: use ainvoke from a running event loop"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.ainvoke(input, config, **kwargs))
+        raise RuntimeError("Planner2.invoke would block the running event loop, await Planner2.ainvoke instead")
 
 
 class Approval(TypedDict):
@@ -283,7 +318,7 @@ class Supervisor(AbstractAgent):
 
     def _initiate_runnable(self) -> RunnableSerializable:
         logger.debug("Initiating Planner Agent")
-        producer_prompt = hub.pull("video-script-producer-prompt")
+        producer_prompt = get_prompt("video-script-producer-prompt")
         return producer_prompt | self.model.with_structured_output(Approval)
 
 
@@ -304,7 +339,7 @@ class Researcher(AbstractAgent):
 
     def _initiate_runnable(self) -> RunnableSerializable:
         logger.debug("Initiating Researcher Agent")
-        researcher_prompt = hub.pull("video-script-researcher-prompt2")
+        researcher_prompt = get_prompt("video-script-researcher-prompt2")
         return researcher_prompt | self.model
 
 
@@ -323,7 +358,7 @@ class Writer(AbstractAgent):
 
     def _initiate_runnable(self) -> RunnableSerializable:
         logger.debug("Initiating Writer Agent")
-        writer_prompt = hub.pull("video-script-writer-prompt")
+        writer_prompt = get_prompt("video-script-writer-prompt")
         return writer_prompt | self.model.with_structured_output(DraftChapter)
 
 ##############
@@ -345,5 +380,5 @@ class Reviewer(AbstractAgent):
 
     def _initiate_runnable(self) -> RunnableSerializable:
         logger.debug("Initiating Reviewer Agent")
-        review_prompt = hub.pull("video-script-reviewer-prompt")
+        review_prompt = get_prompt("video-script-reviewer-prompt")
         return review_prompt | self.model.with_structured_output(ReviewFeedback)
@@ -1,7 +1,9 @@
 
-from typing import Literal, Optional, cast
+import asyncio
+import functools
+import uuid
+from typing import Any, Dict, Literal, Optional
 
-from langchain import hub
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.runnables import RunnableConfig
 #from langgraph.checkpoint.memory import MemorySaver
@@ -11,25 +13,24 @@ from langgraph.graph import (
     END
 )
 from langgraph.graph.state import CompiledStateGraph
-from langgraph.types import Command, RetryPolicy
+from langgraph.types import Command, RetryPolicy, Send
 
 from dotenv import load_dotenv, find_dotenv
 
 from app.core.base import SupportedModel
 from app.core.commons import initiate_model
 from app.core.logger import get_logger
-from app.crag import corrective_rag_graph
+from app.crag import corrective_rag
 from app.video_script.agents import Planner, Planner2, Supervisor, Researcher, Writer, Reviewer
 from app.video_script.configuration import Configuration
+from app.video_script.messages import select_messages, tag_chapter
+from app.video_script.prefetch import ResearchPrefetcher
 from app.video_script.state import VideoScriptState
 from app.ai_agents.state import InputState
 from httpx import ReadTimeout
 
-from langsmith import AsyncClient
 from app.core.config_loader import load_config
-
-# Créer un client asynchrone LangSmith
-async_client = AsyncClient()
+from app.core.prompts import aget_prompt, prompt_registry
 
 _ = load_dotenv(find_dotenv())
 
@@ -52,6 +53,10 @@ producer_llm = initiate_model(producer_model, tags=["producer"])
 # planner model does not use langchain so we do not use initiate_model
 planner_model_name = _planner_model_name
 
+# pulled at startup, planning_node gets it from the prompt registry
+PLANNER_PROMPT = "video-script-planner-prompt"
+prompt_registry.preload([PLANNER_PROMPT])
+
 # TODO SHOULD BE OUTSIDE CODEBASE AND MANAGE IN CONFIG
 SCRIPT_GUIDELINES_FILENAME = "app/video_script/script_guidelines.md"
 STORYTELLING_GUIDEBOOK_FILENAME = "app/video_script/storytelling_guidebook.md"
@@ -96,7 +101,9 @@ team = "small video editing team for Youtube channels"
 
 # planner = Planner(name="planner", model=producer_llm)
 # Planner 2 use Agents SDK so only model_name is needed
-planner = Planner2(name="planner", model_name=planner_model_name)
+planner = Planner2(name="planner", model_name=planner_model_name,
+                   max_iterations=_config.getint('VideoScript', 'planner_max_iterations', fallback=3),
+                   cache_size=_config.getint('VideoScript', 'planner_cache_size', fallback=64))
 
 supervisor = Supervisor(name="supervisor", model=producer_llm)
 
@@ -148,6 +155,13 @@ def _format_chapters(chapters):
     return formatted_chapters
 
 
+def _agent_messages(state: VideoScriptState, role: str, config: RunnableConfig) -> list:
+    """History sent to the agent of a role for the current chapter, see select_messages"""
+    configuration = Configuration.from_runnable_config(config)
+    return select_messages(state.messages, role, state.current_chapter_index, state.chapters,
+                           max_tokens=configuration.message_window_tokens)
+
+
 #####################
 # NODE DEFINITION
 #####################
@@ -165,7 +179,7 @@ async def planning_node(state: VideoScriptState, config: RunnableConfig) -> Vide
     # Example simulation: The user wants a 3-chapter video, so we store that:
     if not hasattr(state, "chapters") or state.chapters is None:
 
-        planner_prompt = await async_client.pull_prompt("video-script-planner-prompt")
+        planner_prompt = await aget_prompt(PLANNER_PROMPT)
         message_content = planner_prompt.format(storytelling_guidebook= storytelling_guidebook)
         human_message = HumanMessage(content=message_content, name="user")
         messages = list(state.messages) + [ human_message]
@@ -185,6 +199,7 @@ async def planning_node(state: VideoScriptState, config: RunnableConfig) -> Vide
         state.current_chapter_index = 0
         state.current_chapter_content = ""
         state.current_chapter_revision = 0
+        state.run_key = uuid.uuid4().hex
         formatted_chapters = _format_chapters(chapters)
         producer_message = (f"Here's a suggested agenda for your {len(chapters)}-chapter video on {planner_res['video_title']}."
                             f"\n\n{formatted_chapters}")
@@ -193,29 +208,83 @@ async def planning_node(state: VideoScriptState, config: RunnableConfig) -> Vide
     return state
 
 
-async def researcher_node(state: VideoScriptState, config: RunnableConfig):
-    """
-    The Researcher provides factual data/ideas for the current chapter.
-    For demonstration, we just append a dummy 'AIMessage' with bullet points.
-    """
-    chapter = state.chapters[state.current_chapter_index]
-    chapter_title = chapter['title']
+async def _research_chapter(state: VideoScriptState, chapter_index: int, config: RunnableConfig) -> str:
+    """Questions of the researcher on a chapter, answered by the corrective RAG assistant"""
+    chapter_title = state.chapters[chapter_index]['title']
     message_content = (f"A research assistant will help us to collect informations for the chapter '{chapter_title}'."
                        f"Formulate 4 questions that cover all key topics of the chapter.")
     human_message = HumanMessage(content=message_content, name="user")
-    messages = list(state.messages) + [human_message]
+    configuration = Configuration.from_runnable_config(config)
+    messages = select_messages(state.messages, "researcher", chapter_index, state.chapters,
+                               max_tokens=configuration.message_window_tokens) + [human_message]
     researcher_response = await researcher.ainvoke(input={"messages": messages, "team": team}, config=config)
     print("########################")
     print(researcher_response)
-    print("########################")   
-    res = await corrective_rag_graph.ainvoke(input={"question": researcher_response.content})
+    print("########################")
+    res = await corrective_rag.ainvoke(input={"question": researcher_response.content})
+    # the CRAG generation is a string
+    generation = res["generation"]
+    return getattr(generation, "content", generation)
+
+
+# Research of the next chapter running in the background, see Configuration.prefetch_research
+research_prefetcher = ResearchPrefetcher(
+    ttl_seconds=_config.getfloat('VideoScript', 'prefetch_research_ttl', fallback=600))
+
+
+def _start_research_prefetch(state: VideoScriptState, config: RunnableConfig) -> None:
+    """Start the research of the next chapter while the current one is written and reviewed"""
+    configuration = Configuration.from_runnable_config(config)
+    next_chapter = state.current_chapter_index + 1
+    if (not configuration.prefetch_research or configuration.parallel_chapters or not state.run_key
+            or next_chapter >= len(state.chapters) or next_chapter in state.prefetched_research):
+        return
+    # the node run ends before the research, only keep the run settings
+    background_config = {k: config[k] for k in ("configurable", "tags", "metadata") if k in config}
+    if research_prefetcher.start(state.run_key, next_chapter,
+                                 lambda: _research_chapter(state, next_chapter, background_config)):
+        logger.info(f"Prefetching research of chapter {next_chapter + 1}/{len(state.chapters)}")
 
-    response = cast(
-         AIMessage,
-         res["generation"]
-     )
 
-    return {"messages": [response]}
+async def _take_research_prefetch(state: VideoScriptState) -> Optional[str]:
+    """Prefetched research of the current chapter, waiting for it if it is still running"""
+    if state.current_chapter_index in state.prefetched_research:
+        return state.prefetched_research[state.current_chapter_index]
+    return await research_prefetcher.take(state.run_key, state.current_chapter_index)
+
+
+def _cancel_prefetches_on_failure(node):
+    """
+    Cancel the prefetched research of a run when one of its nodes fails, so a failed run does not
+    leave research running. A retried writer starts the prefetch again.
+    """
+    @functools.wraps(node)
+    async def wrapper(state: VideoScriptState, config: RunnableConfig):
+        try:
+            return await node(state, config)
+        except BaseException:
+            research_prefetcher.cancel(state.run_key)
+            raise
+    return wrapper
+
+
+async def researcher_node(state: VideoScriptState, config: RunnableConfig):
+    """
+    The Researcher provides factual data/ideas for the current chapter.
+    The first research of a chapter may have been prefetched while the previous chapter was reviewed.
+    """
+    research = await _take_research_prefetch(state)
+    if research is None:
+        research = await _research_chapter(state, state.current_chapter_index, config)
+    else:
+        logger.info(f"Using prefetched research of chapter {state.current_chapter_index + 1}")
+
+    response = AIMessage(content=research, name="researcher")
+    return {
+        "messages": [tag_chapter(response, state.current_chapter_index)],
+        "prefetched_research": {index: content for index, content in state.prefetched_research.items()
+                                if index != state.current_chapter_index},
+    }
 
     # research_response_comment = res.get('comment', 'No comment provided.')
     # research_chapter_content = res['research']
@@ -236,11 +305,13 @@ async def writer_node(state: VideoScriptState, config: RunnableConfig) -> Comman
     """
     The Writer composes or updates the script for the current chapter using the research input.
     """
+    # research of the next chapter does not depend on this one
+    _start_research_prefetch(state, config)
     chapter = state.chapters[state.current_chapter_index]
     chapter_title = chapter['title']
     message_content = f"Write the script for chapter '{chapter_title}' using key topics, word counts and research."
     human_message = HumanMessage(content=message_content, name="user")
-    messages = list(state.messages) + [human_message]
+    messages = _agent_messages(state, "writer", config) + [human_message]
 
     res = await writer.ainvoke(input={"messages": messages,
                                      "team": team,
@@ -259,7 +330,8 @@ async def writer_node(state: VideoScriptState, config: RunnableConfig) -> Comman
 
     return Command(
         update={
-            "messages": [AIMessage(content=writer_message_content, name="writer")],
+            "messages": [tag_chapter(AIMessage(content=writer_message_content, name="writer"),
+                                     state.current_chapter_index)],
             "current_chapter_content": writer_chapter_content
         },
         goto="reviewer",
@@ -276,7 +348,7 @@ async def reviewer_node(state: VideoScriptState, config: RunnableConfig) -> Comm
     chapter_title = chapter['title']
     revision = state.current_chapter_index
     human_message = HumanMessage(content=f"Review the draft for chapter '{chapter_title}'", name="user")
-    messages = list(state.messages) + [human_message]
+    messages = _agent_messages(state, "reviewer", config) + [human_message]
 
     res = await reviewer.ainvoke(input={"messages": messages,
                                       "team": team,
@@ -295,7 +367,8 @@ async def reviewer_node(state: VideoScriptState, config: RunnableConfig) -> Comm
 
     return Command(
         update={
-            "messages": [AIMessage(content=reviewer_message_content, name="reviewer")],
+            "messages": [tag_chapter(AIMessage(content=reviewer_message_content, name="reviewer"),
+                                     state.current_chapter_index)],
             "next_node": res["NextNode"],
         },
         goto="supervisor",
@@ -318,6 +391,8 @@ def finalize_script(state: VideoScriptState, current_chapter: int, chapter_title
     if chapter_content:
         final_script += f"## CHAPTER {current_chapter + 1} - {chapter_title}\n\n{chapter_content}\n\n"
 
+    research_prefetcher.cancel(state.run_key)
+
     reason_text = f" ({reason})" if reason else ""
     message = (f"Here is your final script{reason_text}.\n\n########\n\n"
                f"# {state.video_title}\n\n"
@@ -394,7 +469,7 @@ async def supervisor_node(state: VideoScriptState, config: RunnableConfig) -> Co
             message = "Let's make it, Team!"
             revision_count += 1  # Increment the revision count
         else:
-            messages = (list(state.messages) +
+            messages = (_agent_messages(state, "supervisor", config) +
                         [HumanMessage(content="Based on the last 'reviewer' feedback,"
                                               " do you approve the latest draft for the current chapter?"
                                               " Your goal is to optimize the editing process."
@@ -433,9 +508,15 @@ async def supervisor_node(state: VideoScriptState, config: RunnableConfig) -> Co
     
     # Utiliser next_chapter si défini, sinon current_chapter
     final_chapter_index = next_chapter if 'next_chapter' in locals() else current_chapter
-    
+    prefetched_research = dict(state.prefetched_research)
+    if final_chapter_index != current_chapter:
+        prefetched_research.update(research_prefetcher.collect(state.run_key, final_chapter_index))
+    if goto == END:
+        research_prefetcher.cancel(state.run_key)
+
     return Command(
         update={
+            "prefetched_research": prefetched_research,
             "messages": AIMessage(content=message, name="supervisor"),
             "next_node": "researcher" if goto == END else goto,
             "current_chapter_index": final_chapter_index,
@@ -447,6 +528,161 @@ async def supervisor_node(state: VideoScriptState, config: RunnableConfig) -> Co
     )
 
 
+#####################
+# PARALLEL CHAPTERS
+#####################
+
+# In parallel mode, planning hands over to "chapters", which fans out one "chapter" task per
+# chapter with Send, at most max_parallel_chapters at the same time (LangGraph max_concurrency).
+# Each task runs the researcher -> writer -> reviewer -> supervisor loop of its chapter in a chapter
+# graph, then "assemble" merges the chapter scripts in chapter order.
+
+
+async def chapter_supervisor_node(state: VideoScriptState, config: RunnableConfig
+                                  ) -> Command[Literal[*members, END]]:
+    """
+    Approval loop of a single chapter in parallel mode: same decisions as supervisor_node,
+    but the chapter graph ends when the chapter is approved instead of moving to the next chapter.
+    """
+    configuration = Configuration.from_runnable_config(config)
+    current_chapter = state.current_chapter_index
+    revision_count = state.current_chapter_revision or 0
+    chapter_title = state.chapters[current_chapter]['title']
+
+    if state.remaining_steps <= configuration.min_remaining_step:
+        logger.info(f"Ending chapter {chapter_title} due to insufficient remaining steps ({state.remaining_steps})")
+        return Command(goto=END)
+
+    if revision_count >= configuration.max_revision:
+        logger.info(f"Maximum revisions reached for chapter {chapter_title}. chapter='{current_chapter}'")
+        return Command(goto=END)
+
+    if revision_count == 0:
+        goto = "researcher"
+    else:
+        messages = (_agent_messages(state, "supervisor", config) +
+                    [HumanMessage(content="Based on the last 'reviewer' feedback,"
+                                          " do you approve the latest draft for the current chapter?"
+                                          " Your goal is to optimize the editing process."
+                                          " Request a revision only if the content does not align with the writing guidebook."
+                                          "\nFormat: status: ['approved', 'revised']", name="supervisor")])
+        try:
+            res = await supervisor.ainvoke(input={"messages": messages, "team": team}, config=config)
+        except Exception as e:
+            logger.error(f"Error invoking approve_video for chapter {chapter_title}: {e}")
+            return Command(goto=END)
+        if res['status'] == 'approved':
+            logger.debug(f"Chapter approved chapter='{current_chapter}', revision='{revision_count}'")
+            return Command(goto=END)
+        goto = "researcher" if state.next_node not in members else state.next_node
+
+    logger.debug(f"Chapter revision chapter='{current_chapter}', revision='{revision_count}', goto='{goto}'")
+    return Command(
+        update={
+            "next_node": goto,
+            "current_chapter_revision": revision_count + 1,
+        },
+        goto=goto,
+    )
+
+
+def _create_chapter_graph() -> CompiledStateGraph:
+    """Research, writing and review loop of one chapter, the reviewer hands over to the chapter supervisor"""
+    workflow = StateGraph(VideoScriptState, context_schema=Configuration)
+    workflow.add_node("supervisor", chapter_supervisor_node)
+    workflow.add_node("researcher", researcher_node,
+                      retry=RetryPolicy(retry_on=[KeyError, AttributeError, ReadTimeout], max_attempts=3))
+    workflow.add_node("writer", writer_node,
+                      retry=RetryPolicy(retry_on=[KeyError, AttributeError], max_attempts=3))
+    workflow.add_node("reviewer", reviewer_node,
+                      retry=RetryPolicy(retry_on=[KeyError, AttributeError], max_attempts=3))
+    workflow.add_edge(START, "supervisor")
+    workflow.add_edge("researcher", "writer")
+    return workflow.compile()
+
+
+chapter_graph = _create_chapter_graph()
+
+
+def route_after_planning(state: VideoScriptState, config: RunnableConfig) -> Literal["supervisor", "chapters"]:
+    """Sequential supervisor loop, or the chapters produced concurrently in parallel mode"""
+    configuration = Configuration.from_runnable_config(config)
+    if not configuration.parallel_chapters or not state.chapters:
+        return "supervisor"
+    return "chapters"
+
+
+def _fan_out_chapters(state: VideoScriptState):
+    """One chapter task per chapter"""
+    return [
+        Send("chapter", {
+            "messages": list(state.messages),
+            "video_title": state.video_title,
+            "chapters": state.chapters,
+            "current_chapter_index": index,
+            "current_chapter_content": "",
+            "current_chapter_revision": 0,
+        })
+        for index in range(len(state.chapters))
+    ]
+
+
+async def chapter_node(task: Dict[str, Any], config: RunnableConfig):
+    """
+    Produce one chapter with the chapter graph.
+    Returns its script, and the research, drafts and reviews of the chapter (tagged with its index).
+    """
+    index = task["current_chapter_index"]
+    logger.info(f"Start chapter {index + 1}/{len(task['chapters'])}")
+    res = await chapter_graph.ainvoke(task, config)
+    return {
+        "chapter_scripts": {index: res.get("current_chapter_content") or ""},
+        "messages": res["messages"][len(task["messages"]):],
+    }
+
+
+def _create_chapters_graph() -> CompiledStateGraph:
+    """Fan-out of the chapter tasks, see chapters_node"""
+    workflow = StateGraph(VideoScriptState, context_schema=Configuration)
+    workflow.add_node("chapter", chapter_node)
+    workflow.add_conditional_edges(START, _fan_out_chapters, ["chapter"])
+    workflow.add_edge("chapter", END)
+    return workflow.compile()
+
+
+chapters_graph = _create_chapters_graph()
+
+
+async def chapters_node(state: VideoScriptState, config: RunnableConfig):
+    """
+    Produce all the chapters, at most max_parallel_chapters at the same time.
+    The messages of the chapters are appended in completion order, each tagged with its chapter.
+    """
+    configuration = Configuration.from_runnable_config(config)
+    res = await chapters_graph.ainvoke(
+        {"messages": list(state.messages), "video_title": state.video_title, "chapters": state.chapters},
+        {**config, "max_concurrency": max(1, configuration.max_parallel_chapters)},
+    )
+    return {
+        "chapter_scripts": res["chapter_scripts"],
+        "messages": res["messages"][len(state.messages):],
+    }
+
+
+def assemble_node(state: VideoScriptState) -> Command:
+    """Merge the chapters produced in parallel in chapter order"""
+    final_script = ""
+    for index, chapter in enumerate(state.chapters):
+        chapter_content = state.chapter_scripts.get(index, "")
+        if chapter_content:
+            final_script += f"## CHAPTER {index + 1} - {chapter['title']}\n\n{chapter_content}\n\n"
+        else:
+            logger.warning(f"No script produced for chapter {index + 1} - {chapter['title']}")
+    last_chapter = len(state.chapters) - 1
+    command = finalize_script(state, last_chapter, state.chapters[last_chapter]['title'], final_script, "")
+    return Command(goto=END, update={**command.update, "final_script": final_script})
+
+
 def create_video_script_agent() -> CompiledStateGraph:
     """
     Build and Compile the Video Script Graph
@@ -455,13 +691,16 @@ def create_video_script_agent() -> CompiledStateGraph:
 
     # NODES
     workflow.add_node("planning", planning_node)
-    workflow.add_node("supervisor", supervisor_node)  # script_writing_supervisor_node
-    workflow.add_node("researcher", researcher_node,
+    workflow.add_node("supervisor", _cancel_prefetches_on_failure(supervisor_node))  # script_writing_supervisor_node
+    workflow.add_node("researcher", _cancel_prefetches_on_failure(researcher_node),
                       retry=RetryPolicy(retry_on=[KeyError, AttributeError, ReadTimeout], max_attempts=3))
-    workflow.add_node("writer", writer_node,
+    workflow.add_node("writer", _cancel_prefetches_on_failure(writer_node),
                       retry=RetryPolicy(retry_on=[KeyError, AttributeError], max_attempts=3))
-    workflow.add_node("reviewer", reviewer_node,
+    workflow.add_node("reviewer", _cancel_prefetches_on_failure(reviewer_node),
                       retry=RetryPolicy(retry_on=[KeyError, AttributeError], max_attempts=3))
+    # parallel mode, see Configuration.parallel_chapters
+    workflow.add_node("chapters", chapters_node)
+    workflow.add_node("assemble", assemble_node)
 
     # Researcher with tools
     # tool_node = ToolNode(tools=TOOLS)
@@ -478,7 +717,8 @@ def create_video_script_agent() -> CompiledStateGraph:
     # workflow.add_edge("retrieve", "writer")
     # EDGES
     workflow.add_edge(START, "planning")
-    workflow.add_edge("planning", "supervisor")
+    workflow.add_conditional_edges("planning", route_after_planning, ["supervisor", "chapters"])
+    workflow.add_edge("chapters", "assemble")
     workflow.add_edge("researcher", "writer")
     # Compile the graph
     #memory = MemorySaver()
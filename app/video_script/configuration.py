@@ -49,6 +49,38 @@ class Configuration:
         },
     )
 
+    message_window_tokens: int = field(
+        default=6000,
+        metadata={
+            "description": "The maximum number of tokens of the conversation history sent to an agent: the request,"
+            " the plan, a summary of the previous chapters and the latest messages of the current chapter."
+            " 0 sends the whole history."
+        },
+    )
+
+    prefetch_research: bool = field(
+        default=False,
+        metadata={
+            "description": "Research the next chapter in the background while the current chapter is written"
+            " and reviewed. Not used in parallel mode."
+        },
+    )
+
+    parallel_chapters: bool = field(
+        default=False,
+        metadata={
+            "description": "Produce the chapters concurrently (research, writing and review of each chapter),"
+            " then merge them in chapter order. Chapters are produced one after another otherwise."
+        },
+    )
+
+    max_parallel_chapters: int = field(
+        default=3,
+        metadata={
+            "description": "The maximum number of chapters produced at the same time in parallel mode."
+        },
+    )
+
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
@@ -0,0 +1,118 @@
+"""Selection of the conversation messages sent to each video script agent.
+
+The graph state keeps every research, draft and review of every chapter. Agents only get the
+user request, the plan, a short summary of the previous chapters and the latest messages of the
+current chapter their role needs, within a token budget.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+
+from app.core.logger import logger
+from app.semantic_search.utils import count_tokens
+
+# latest message of each of these authors in the current chapter, by agent role
+ROLE_INPUTS: Dict[str, Tuple[str, ...]] = {
+    "researcher": ("researcher", "reviewer"),
+    "writer": ("researcher", "writer", "reviewer"),
+    "reviewer": ("researcher", "writer"),
+    "supervisor": ("writer", "reviewer"),
+}
+
+# order in which the messages of the current chapter are truncated over the token budget, by agent role:
+# what the role can do without first, the research grounding the script last
+TRUNCATION_ORDER: Dict[str, Tuple[str, ...]] = {
+    "researcher": ("reviewer", "researcher"),
+    "writer": ("reviewer", "writer", "researcher"),
+    "reviewer": ("researcher", "writer"),
+    "supervisor": ("writer", "reviewer"),
+}
+
+_SUMMARY_CHARS = 300
+
+
+def tag_chapter(message: AnyMessage, chapter_index: int) -> AnyMessage:
+    """Record the chapter a message was produced for"""
+    message.response_metadata = {**(message.response_metadata or {}), "chapter": chapter_index}
+    return message
+
+
+def chapter_of(message: AnyMessage) -> Optional[int]:
+    return (message.response_metadata or {}).get("chapter")
+
+
+def _latest(messages: Sequence[AnyMessage], name: str, chapter_index: int) -> Optional[AnyMessage]:
+    for message in reversed(messages):
+        if message.name == name and chapter_of(message) == chapter_index:
+            return message
+    return None
+
+
+def summarize_chapters(messages: Sequence[AnyMessage], chapters: List[dict], chapter_index: int
+                       ) -> Optional[AIMessage]:
+    """Opening of the latest draft of each previous chapter, instead of their whole history"""
+    lines = []
+    for index in range(min(chapter_index, len(chapters))):
+        draft = _latest(messages, "writer", index)
+        if draft is None:
+            continue
+        opening = " ".join(str(draft.content).split())[:_SUMMARY_CHARS]
+        lines.append(f"- Chapter {index + 1} '{chapters[index]['title']}': {opening}...")
+    if not lines:
+        return None
+    return AIMessage(content="# Previous chapters (summary)\n\n" + "\n".join(lines), name="summary")
+
+
+def _truncate(message: AnyMessage, tokens: int, max_tokens: int) -> AnyMessage:
+    content = str(message.content)
+    keep = len(content) * max_tokens // max(tokens, 1)
+    return message.model_copy(update={"content": content[:keep] + "\n\n[...]"})
+
+
+def select_messages(messages: Sequence[AnyMessage],
+                    role: str,
+                    chapter_index: int,
+                    chapters: List[dict],
+                    max_tokens: int = 6000) -> List[AnyMessage]:
+    """
+    Messages sent to an agent of the given role working on a chapter.
+
+    Keeps the user request, the plan, a summary of the previous chapters and the latest messages
+    of the current chapter listed in ROLE_INPUTS. Over max_tokens, the summary is dropped first,
+    then the messages of the chapter are truncated in the TRUNCATION_ORDER of the role.
+    max_tokens 0 keeps every message.
+    """
+    if not max_tokens:
+        return list(messages)
+
+    request = next((m for m in messages if isinstance(m, HumanMessage) and chapter_of(m) is None), None)
+    plan = next((m for m in reversed(messages) if m.name == "planner"), None)
+    head = [m for m in (request, plan) if m is not None]
+    summary = summarize_chapters(messages, chapters, chapter_index)
+    inputs = ROLE_INPUTS.get(role, ())
+    latest: Dict[str, int] = {}
+    for position, message in enumerate(messages):
+        if message.name in inputs and chapter_of(message) == chapter_index:
+            latest[message.name] = position
+    current = [messages[position] for position in sorted(latest.values())]
+
+    def _tokens(selection: List[AnyMessage]) -> List[int]:
+        return count_tokens([str(m.content) for m in selection])
+
+    selected = head + ([summary] if summary else []) + current
+    if sum(_tokens(selected)) > max_tokens and summary:
+        selected = head + current
+    tokens = _tokens(selected)
+    order = TRUNCATION_ORDER.get(role, ())
+    for i in sorted(range(len(head), len(selected)),
+                    key=lambda i: order.index(selected[i].name) if selected[i].name in order else len(order)):
+        excess = sum(tokens) - max_tokens
+        if excess <= 0:
+            break
+        kept = max(0, tokens[i] - excess)
+        selected[i] = _truncate(selected[i], tokens[i], kept)
+        tokens[i] = kept
+
+    logger.debug(f"Selected {len(selected)}/{len(messages)} messages for {role}, "
+                 f"chapter {chapter_index}: ~{sum(tokens)} tokens")
+    return selected
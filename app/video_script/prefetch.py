@@ -0,0 +1,80 @@
+"""Research of the next video script chapter, running in the background while the current one is
+written and reviewed (see Configuration.prefetch_research)."""
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.logger import logger
+
+# (run key, chapter index)
+PrefetchKey = Tuple[str, int]
+
+
+class ResearchPrefetcher:
+    """
+    Background research tasks, by (run key, chapter index).
+
+    A finished task is dropped as soon as it fails, and ttl_seconds after it succeeded if its run
+    never took it, so abandoned runs do not keep their tasks and results.
+    Runs cancel their pending tasks when they end, or when a node fails (see cancel).
+    """
+
+    def __init__(self, ttl_seconds: float = 600):
+        self.ttl_seconds = ttl_seconds
+        self._tasks: Dict[PrefetchKey, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, key: PrefetchKey) -> bool:
+        return key in self._tasks
+
+    def _discard(self, key: PrefetchKey, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def _on_done(self, key: PrefetchKey, task: asyncio.Task) -> None:
+        if task.cancelled():
+            self._discard(key, task)
+        elif task.exception() is not None:
+            logger.warning(f"Research prefetch of chapter {key[1] + 1} failed: {task.exception()}")
+            self._discard(key, task)
+        else:
+            asyncio.get_running_loop().call_later(self.ttl_seconds, self._discard, key, task)
+
+    def start(self, run_key: str, chapter_index: int, research: Callable[[], Awaitable[str]]) -> bool:
+        """Start the research of a chapter unless it is already running, return whether it was started"""
+        key = (run_key, chapter_index)
+        if key in self._tasks:
+            return False
+        task = asyncio.create_task(research())
+        task.add_done_callback(lambda done: self._on_done(key, done))
+        self._tasks[key] = task
+        return True
+
+    def collect(self, run_key: Optional[str], chapter_index: int) -> Dict[int, str]:
+        """Research of a chapter already done, to store in the state, {} if it is running or failed"""
+        task = self._tasks.get((run_key, chapter_index))
+        if task is None or not task.done() or task.cancelled() or task.exception() is not None:
+            return {}
+        del self._tasks[(run_key, chapter_index)]
+        return {chapter_index: task.result()}
+
+    async def take(self, run_key: Optional[str], chapter_index: int) -> Optional[str]:
+        """Research of a chapter, waiting for it if it is still running, None if there is none or it failed"""
+        task = self._tasks.pop((run_key, chapter_index), None)
+        if task is None:
+            return None
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if task.cancelled():
+                return None
+            raise
+        except Exception:
+            # already logged by _on_done
+            return None
+
+    def cancel(self, run_key: Optional[str]) -> None:
+        """Cancel the pending research of a run"""
+        for key in [key for key in self._tasks if key[0] == run_key]:
+            self._tasks.pop(key).cancel()
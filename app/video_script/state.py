@@ -1,5 +1,5 @@
 from dataclasses import field, dataclass
-from typing import List, Literal, Optional
+from typing import Annotated, Dict, List, Literal, Optional
 
 from langgraph.managed import RemainingSteps
 
@@ -7,6 +7,11 @@ from app.ai_agents.state import InputState
 from app.video_script.agents import Chapter
 
 
+def merge_chapter_scripts(left: Optional[Dict[int, str]], right: Optional[Dict[int, str]]) -> Dict[int, str]:
+    """Merge the scripts of chapters produced concurrently, by chapter index"""
+    return {**(left or {}), **(right or {})}
+
+
 @dataclass
 class VideoScriptState(InputState):
     """Represents the complete state of the agent, extending InputState with additional attributes.
@@ -20,4 +25,10 @@ class VideoScriptState(InputState):
     current_chapter_revision: Optional[int] = field(default=None)
     final_script: Optional[str] = field(default=None)
     next_node: Optional[Literal['researcher', 'writer', 'approved']] = field(default=None)
-    remaining_steps: RemainingSteps = field(default=0)
\ No newline at end of file
+    remaining_steps: RemainingSteps = field(default=0)
+    # scripts of the chapters produced in parallel mode, by chapter index
+    chapter_scripts: Annotated[Dict[int, str], merge_chapter_scripts] = field(default_factory=dict)
+    # key of the run, for the research of the next chapter prefetched in the background
+    run_key: Optional[str] = field(default=None)
+    # research of chapters prefetched before the supervisor moved to them, by chapter index
+    prefetched_research: Dict[int, str] = field(default_factory=dict)
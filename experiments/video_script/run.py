@@ -60,7 +60,7 @@ async def main():  # Define an async function
     )
     doc_splits = text_splitter.split_documents(docs_list)
 
-    search = VectorStoreManager.get_strategy()
+    search = VectorStoreManager.get("crag")  # created by the CRAG agents
 
     search.add_documents(doc_splits)
 
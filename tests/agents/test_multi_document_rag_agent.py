@@ -0,0 +1,35 @@
+from app.ai_agents.rag import MultiDocumentRAGAgent
+
+
+class _AgentRunner:
+    """Stubbed llama-index agent runner, recording whether it was queried sync or async"""
+
+    def __init__(self):
+        self.calls = []
+
+    def query(self, input):
+        self.calls.append(("sync", input))
+        return "answer"
+
+    async def aquery(self, input):
+        self.calls.append(("async", input))
+        return "answer"
+
+
+def _agent() -> MultiDocumentRAGAgent:
+    # skip the constructor, it loads and embeds the documents
+    agent = MultiDocumentRAGAgent.__new__(MultiDocumentRAGAgent)
+    agent._agent_runner = _AgentRunner()
+    return agent
+
+
+async def test_ainvoke_awaits_aquery():
+    agent = _agent()
+    assert await agent.ainvoke("What is the paper about?") == "answer"
+    assert agent._agent_runner.calls == [("async", "What is the paper about?")]
+
+
+def test_invoke_calls_query():
+    agent = _agent()
+    assert agent.invoke("What is the paper about?") == "answer"
+    assert agent._agent_runner.calls == [("sync", "What is the paper about?")]
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+import app.assistants.core as assistants_core
+from app.assistants.core import Assistant, aget_assistant, get_assistant, readiness, warm_up
+
+# any importable attribute stands for a compiled graph
+GRAPH_LOADER = "json:loads"
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = {
+        "loaded": Assistant(description="An assistant", loader=GRAPH_LOADER),
+        "broken": Assistant(description="A broken assistant", loader="app.assistants.missing:graph"),
+    }
+    monkeypatch.setattr(assistants_core, "assistants", registry)
+    return registry
+
+
+def test_assistants_are_loaded_on_first_use(registry):
+    assistant = registry["loaded"]
+    assert assistant.graph is None
+
+    graph = get_assistant("loaded")
+    assert graph is assistant.graph
+    assert assistant.init_seconds is not None
+    # loaded once
+    assert get_assistant("loaded") is graph
+
+
+async def test_assistants_are_loaded_off_the_event_loop(registry):
+    first, second = await asyncio.gather(aget_assistant("loaded"), aget_assistant("loaded"))
+    assert first is second is registry["loaded"].graph
+
+
+def test_load_errors_are_raised_and_reported(registry):
+    with pytest.raises(ImportError):
+        get_assistant("broken")
+    assert registry["broken"].error is not None
+    assert readiness()["broken"]["loaded"] is False
+
+
+def test_readiness_reports_the_warmed_up_assistants(registry):
+    assert {status["loaded"] for status in readiness().values()} == {False}
+
+    # errors are only reported in the status
+    warm_up(["loaded", "broken"])
+    status = readiness()
+    assert status["loaded"]["loaded"] is True
+    assert status["loaded"]["error"] is None
+    assert status["broken"]["loaded"] is False
@@ -0,0 +1,70 @@
+from typing import List
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.core.answer_cache import (CachedCorrectiveRAG, InMemoryAnswerCacheBackend, SemanticAnswerCache,
+                                   SQLiteAnswerCacheBackend)
+
+VECTORS = {
+    "What is an agent?": [1.0, 0.0, 0.0],
+    "What is an AI agent?": [0.99, 0.1, 0.0],
+    "How to cook pasta?": [0.0, 0.0, 1.0],
+}
+
+
+class LookupEmbeddings(Embeddings):
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [VECTORS[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return VECTORS[text]
+
+
+class CountingGraph:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        return {"question": input["question"], "generation": f"answer {self.calls}",
+                "documents": [Document(page_content="doc", metadata={"source": "test"})]}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryAnswerCacheBackend()
+    return SQLiteAnswerCacheBackend(str(tmp_path / "answers.sqlite"))
+
+
+async def test_similar_question_hits_cache(backend):
+    graph = CountingGraph()
+    cache = SemanticAnswerCache(LookupEmbeddings(), backend, similarity_threshold=0.95)
+    crag = CachedCorrectiveRAG(graph, cache)
+
+    first = await crag.ainvoke({"question": "What is an agent?"})
+    second = await crag.ainvoke({"question": "What is an AI agent?"})
+    third = await crag.ainvoke({"question": "How to cook pasta?"})
+
+    assert graph.calls == 2
+    assert second["generation"] == first["generation"]
+    assert second["documents"][0].metadata == {"source": "test"}
+    assert third["generation"] == "answer 2"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+async def test_expired_and_evicted_entries_are_not_served(backend):
+    graph = CountingGraph()
+    cache = SemanticAnswerCache(LookupEmbeddings(), backend, ttl_seconds=-1)
+    crag = CachedCorrectiveRAG(graph, cache)
+    await crag.ainvoke({"question": "What is an agent?"})
+    await crag.ainvoke({"question": "What is an agent?"})
+    assert graph.calls == 2
+
+    cache = SemanticAnswerCache(LookupEmbeddings(), backend, max_entries=1)
+    crag = CachedCorrectiveRAG(graph, cache)
+    await crag.ainvoke({"question": "What is an agent?"})
+    await crag.ainvoke({"question": "How to cook pasta?"})
+    assert len(backend.entries()) == 1
@@ -0,0 +1,66 @@
+import json
+import time
+
+from langchain_core.load import dumpd
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import PromptTemplate
+
+from app.core.prompts import PromptRegistry
+
+
+class _Hub:
+    def __init__(self):
+        self.pulls = 0
+
+    def __call__(self, name: str) -> PromptTemplate:
+        self.pulls += 1
+        return PromptTemplate.from_template(f"{name} v{self.pulls}: {{question}}")
+
+
+def _wait_for_refresh(registry: PromptRegistry):
+    while registry._refreshing:
+        time.sleep(0.01)
+
+
+def test_prompt_is_pulled_once(tmp_path):
+    hub = _Hub()
+    registry = PromptRegistry(snapshot_directory=str(tmp_path), pull=hub)
+    assert registry.get("qa").template == "qa v1: {question}"
+    assert registry.get("qa").template == "qa v1: {question}"
+    assert hub.pulls == 1
+
+
+def test_start_uses_the_snapshot_then_refreshes(tmp_path):
+    PromptRegistry(snapshot_directory=str(tmp_path), pull=_Hub()).get("owner/qa")
+
+    hub = _Hub()
+    registry = PromptRegistry(snapshot_directory=str(tmp_path), pull=hub)
+    assert registry.get("owner/qa").template == "owner/qa v1: {question}"
+    _wait_for_refresh(registry)
+    assert hub.pulls == 1
+
+
+def test_failed_refresh_keeps_the_cached_prompt(tmp_path):
+    hub = _Hub()
+    registry = PromptRegistry(snapshot_directory=str(tmp_path), ttl_seconds=0, pull=hub)
+    prompt = registry.get("qa")
+
+    def _unavailable(name):
+        raise TimeoutError(name)
+
+    registry._pull = _unavailable
+    assert registry.get("qa") is prompt
+    _wait_for_refresh(registry)
+    assert registry.get("qa") is prompt
+
+
+def test_snapshots_only_load_prompt_templates(tmp_path):
+    directory = tmp_path / "qa"
+    directory.mkdir()
+    (directory / "LATEST").write_text("tampered")
+    (directory / "tampered.json").write_text(json.dumps(dumpd(AIMessage(content="not a prompt"))))
+
+    hub = _Hub()
+    registry = PromptRegistry(snapshot_directory=str(tmp_path), pull=hub)
+    assert registry.get("qa").template == "qa v1: {question}"
+    assert hub.pulls == 1
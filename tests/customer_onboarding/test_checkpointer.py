@@ -0,0 +1,52 @@
+from langgraph.graph import StateGraph, MessagesState, START, END
+
+from app.customer_onboarding.checkpointer import BoundedMemorySaver, SQLiteCheckpointer
+
+
+def _echo_graph(checkpointer):
+    def _echo(state: MessagesState):
+        return {"messages": [("ai", f"{len(state['messages'])} messages")]}
+
+    graph_builder = StateGraph(MessagesState)
+    graph_builder.add_node("echo", _echo)
+    graph_builder.add_edge(START, "echo")
+    graph_builder.add_edge("echo", END)
+    return graph_builder.compile(checkpointer=checkpointer)
+
+
+def _config(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def test_bounded_memory_saver_keeps_conversation():
+    graph = _echo_graph(BoundedMemorySaver(max_threads=10))
+    graph.invoke({"messages": [("user", "hello")]}, _config("a"))
+    result = graph.invoke({"messages": [("user", "again")]}, _config("a"))
+    assert len(result["messages"]) == 4
+
+
+def test_bounded_memory_saver_evicts_least_recently_used_threads():
+    checkpointer = BoundedMemorySaver(max_threads=2)
+    graph = _echo_graph(checkpointer)
+    for thread_id in ("a", "b", "c"):
+        graph.invoke({"messages": [("user", "hello")]}, _config(thread_id))
+
+    assert set(checkpointer.storage) == {"b", "c"}
+    assert checkpointer.get_tuple(_config("a")) is None
+    assert checkpointer.get_tuple(_config("c")) is not None
+
+
+def test_bounded_memory_saver_expires_threads():
+    checkpointer = BoundedMemorySaver(ttl_seconds=-1)
+    graph = _echo_graph(checkpointer)
+    graph.invoke({"messages": [("user", "hello")]}, _config("a"))
+    result = graph.invoke({"messages": [("user", "hello")]}, _config("a"))
+    assert len(result["messages"]) == 2
+
+
+def test_sqlite_checkpointer_survives_restart(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    _echo_graph(SQLiteCheckpointer(path)).invoke({"messages": [("user", "hello")]}, _config("a"))
+
+    result = _echo_graph(SQLiteCheckpointer(path)).invoke({"messages": [("user", "again")]}, _config("a"))
+    assert len(result["messages"]) == 4
@@ -0,0 +1,89 @@
+import uuid
+from typing import List, Tuple
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+import app.customer_onboarding.assistant as assistant
+
+
+class _ToolCallingModel(FakeMessagesListChatModel):
+    """Fake chat model replaying its responses, recording whether it was called sync or async"""
+    calls: List[str] = []
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls.append("sync")
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls.append("async")
+        return super()._generate(messages, stop=stop, **kwargs)
+
+
+def _responses() -> List[AIMessage]:
+    return [
+        AIMessage(content="", tool_calls=[{"name": "faq_answerer",
+                                           "args": {"input": "What should I do if my card is blocked?"},
+                                           "id": "call_1"}]),
+        AIMessage(content="Call the support to unblock your card."),
+    ]
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Stubbed model and agents of the graph, recording (side, input) of each agent call"""
+    calls: List[Tuple[str, dict]] = []
+
+    def answer(input):
+        calls.append(("sync", input))
+        return "Call the support."
+
+    async def aanswer(input):
+        calls.append(("async", input))
+        return "Call the support."
+
+    agent = RunnableLambda(answer, afunc=aanswer)
+    for name in ("faq_agent", "eligibility_agent", "problem_solver_agent"):
+        monkeypatch.setattr(assistant, name, agent)
+    monkeypatch.setattr(assistant, "initiate_model", lambda model_name: _ToolCallingModel(responses=_responses()))
+    return calls
+
+
+def _config() -> dict:
+    return {"configurable": {"thread_id": uuid.uuid4().hex}}
+
+
+async def test_ainvoke_awaits_the_coroutine_side_of_the_tools(calls):
+    graph = assistant.create_customer_onboarding_assistant_as_graph(assistant.default_model)
+
+    state = await graph.ainvoke({"messages": [HumanMessage(content="My card is blocked")]}, _config())
+
+    assert calls == [("async", {"question": "What should I do if my card is blocked?"})]
+    assert state["messages"][-2].content == "Call the support."
+    assert state["messages"][-1].content == "Call the support to unblock your card."
+
+
+async def test_ainvoke_runs_the_async_node(calls, monkeypatch):
+    model = _ToolCallingModel(responses=_responses())
+    monkeypatch.setattr(assistant, "initiate_model", lambda model_name: model)
+    graph = assistant.create_customer_onboarding_assistant_as_graph(assistant.default_model)
+
+    await graph.ainvoke({"messages": [HumanMessage(content="My card is blocked")]}, _config())
+
+    assert model.calls == ["async", "async"]
+
+
+def test_invoke_runs_the_sync_side(calls, monkeypatch):
+    model = _ToolCallingModel(responses=_responses())
+    monkeypatch.setattr(assistant, "initiate_model", lambda model_name: model)
+    graph = assistant.create_customer_onboarding_assistant_as_graph(assistant.default_model)
+
+    graph.invoke({"messages": [HumanMessage(content="My card is blocked")]}, _config())
+
+    assert calls == [("sync", {"question": "What should I do if my card is blocked?"})]
+    assert model.calls == ["sync", "sync"]
@@ -0,0 +1,45 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.runnables import RunnableLambda
+
+import app.customer_onboarding.agents as agents
+from app.customer_onboarding.agents import ErrorSearchIndex, search_errors_in_vectordb
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = ErrorSearchIndex()
+    monkeypatch.setattr(agents, "error_search_index", index)
+    return index
+
+
+def test_tool_calls_share_the_registered_index(index):
+    questions = []
+
+    def retrieve(question):
+        questions.append(question)
+        return [Document(page_content="Code: CONN-SMS-002\nDescription: Le code SMS reçu ne fonctionne pas.")]
+
+    index.register(RunnableLambda(retrieve), FakeListChatModel(responses=["Renvoyez le code SMS."]))
+    chain = index.get_chain()
+
+    assert search_errors_in_vectordb.invoke({"question": "Mon code SMS est refusé"}) == "Renvoyez le code SMS."
+    assert search_errors_in_vectordb.invoke({"question": "Le SMS ne marche pas"}) == "Renvoyez le code SMS."
+    assert index.get_chain() is chain
+    assert questions == ["Mon code SMS est refusé", "Le SMS ne marche pas"]
+
+
+def test_registering_a_retriever_rebuilds_the_chain(index):
+    model = FakeListChatModel(responses=["ok"])
+    index.register(RunnableLambda(lambda question: []), model)
+    chain = index.get_chain()
+    index.register(RunnableLambda(lambda question: []), model)
+    assert index.get_chain() is not chain
+
+
+def test_unregistered_index_raises(index):
+    with pytest.raises(RuntimeError, match="ProblemSolverAgent"):
+        index.get_chain()
+    with pytest.raises(RuntimeError, match="ProblemSolverAgent"):
+        search_errors_in_vectordb.invoke({"question": "Mon code SMS est refusé"})
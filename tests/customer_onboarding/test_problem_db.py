@@ -0,0 +1,101 @@
+import sqlite3
+import threading
+
+import pytest
+
+from app.customer_onboarding.problem_db import ProblemDatabase
+
+ERRORS = [
+    ("CONN-EMAIL-001", "Connexion initiale", "Erreurs d'identification",
+     "L'utilisateur ne reçoit pas l'e-mail de vérification.", "email, web, mobile, validation"),
+    ("CONN-SMS-002", "Connexion initiale", "Erreurs d'identification",
+     "Le code SMS reçu ne fonctionne pas.", "sms, code, mobile"),
+    ("DOC-UPLOAD-003", "Documents", "Téléchargement",
+     "Le justificatif de domicile est refusé.", "document, upload, justificatif"),
+]
+
+
+@pytest.fixture
+def problem_db(tmp_path):
+    db_path = str(tmp_path / "error_db.sqlite")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+    CREATE TABLE errors (
+        code TEXT PRIMARY KEY,
+        category TEXT,
+        subcategory TEXT,
+        description TEXT,
+        details TEXT,
+        diagnostic_questions TEXT,
+        resolution TEXT,
+        search_keys TEXT
+    )""")
+    conn.executemany(
+        "INSERT INTO errors (code, category, subcategory, description, details, diagnostic_questions,"
+        " resolution, search_keys) VALUES (?, ?, ?, ?, '', '', '', ?)", ERRORS)
+    conn.commit()
+    conn.close()
+    return ProblemDatabase(db_path, str(tmp_path / "cache" / "error_db_search.sqlite"))
+
+
+def test_search_by_code(problem_db):
+    results = problem_db.search(code="CONN-SMS-002")
+    assert [r["code"] for r in results] == ["CONN-SMS-002"]
+
+
+def test_search_keys_uses_ranked_full_text(problem_db):
+    # all the words are required
+    results = problem_db.search(search_keys="mobile sms")
+    assert [r["code"] for r in results] == ["CONN-SMS-002"]
+
+    # any of them when no error has them all, ranked by bm25
+    results = problem_db.search(search_keys="sms justificatif")
+    assert sorted(r["code"] for r in results) == ["CONN-SMS-002", "DOC-UPLOAD-003"]
+    # the rarer word weighs more
+    results = problem_db.search(search_keys="mobile justificatif")
+    assert [r["code"] for r in results][0] == "DOC-UPLOAD-003"
+
+    # Accents and description words are matched too
+    results = problem_db.search(search_keys="verification")
+    assert [r["code"] for r in results] == ["CONN-EMAIL-001"]
+
+
+def test_search_combines_filters(problem_db):
+    results = problem_db.search(category="Connexion initiale", search_keys="mobile", limit=1)
+    assert len(results) == 1
+    assert problem_db.search(category="Documents", search_keys="sms") == []
+
+
+def test_connections_are_read_only_and_per_thread(problem_db):
+    problem_db.search(code="CONN-SMS-002")
+    with pytest.raises(sqlite3.OperationalError):
+        problem_db._connection().execute("DELETE FROM errors")
+
+    connections = []
+    thread = threading.Thread(target=lambda: connections.append(problem_db._connection()))
+    thread.start()
+    thread.join()
+    assert connections[0] is not problem_db._connection()
+
+
+def test_stopwords_and_short_words_are_ignored(problem_db):
+    results = problem_db.search(search_keys="le code de la sms")
+    assert [r["code"] for r in results] == ["CONN-SMS-002"]
+    # nothing left to search: only the other filters apply
+    assert len(problem_db.search(search_keys="le de", category="Documents")) == 1
+
+
+def test_problem_database_is_never_written(problem_db):
+    before = open(problem_db.db_path, "rb").read()
+    problem_db.search(search_keys="mobile")
+    assert open(problem_db.db_path, "rb").read() == before
+    assert problem_db._connection().execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'errors_fts'").fetchone()
+
+    # the search database is rebuilt when the problem database changes
+    conn = sqlite3.connect(problem_db.db_path)
+    conn.execute("UPDATE errors SET search_keys = 'facture' WHERE code = 'DOC-UPLOAD-003'")
+    conn.commit()
+    conn.close()
+    fresh = ProblemDatabase(problem_db.db_path, problem_db.index_path)
+    assert [r["code"] for r in fresh.search(search_keys="facture")] == ["DOC-UPLOAD-003"]
@@ -0,0 +1,36 @@
+from langchain_core.documents import Document
+
+from app.semantic_search.context import assemble_context, deduplicate, merge_adjacent
+from app.semantic_search.utils import count_tokens
+
+TEXT = "Opening an account requires an identity document and a proof of address."
+
+
+def _chunk(start: int, end: int, source: str = "faq.pdf#0") -> Document:
+    return Document(page_content=TEXT[start:end], metadata={"source": source, "start_index": start})
+
+
+def test_deduplicate_ignores_case_and_whitespace():
+    documents = [Document(page_content="Proof  of address"), Document(page_content="proof of address\n")]
+    assert len(deduplicate(documents)) == 1
+
+
+def test_overlapping_chunks_are_merged_with_best_rank():
+    other = Document(page_content="Cards are sent within a week")
+    ranked = merge_adjacent([other, _chunk(30, len(TEXT)), _chunk(0, 40)])
+    assert [rank for rank, _ in ranked] == [0, 1]
+    assert ranked[1][1].page_content == TEXT
+
+
+def test_distant_chunks_are_not_merged():
+    ranked = merge_adjacent([_chunk(0, 10), _chunk(40, 50)])
+    assert [document.page_content for _, document in ranked] == [TEXT[0:10], TEXT[40:50]]
+
+
+def test_context_fits_the_token_budget():
+    large = Document(page_content="word " * 200)
+    small = Document(page_content="The card is free")
+    context = assemble_context([large, small, small], max_tokens=20)
+    assert context.documents == [small]
+    assert context.tokens == count_tokens([small.page_content])[0] <= 20
+    assert (context.retrieved, context.dropped) == (3, 1)
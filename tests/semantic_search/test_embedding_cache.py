@@ -0,0 +1,87 @@
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from app.semantic_search.embedding_cache import CachedEmbeddings, CachedQueryEmbeddings, QueryEmbeddingCache
+from app.semantic_search.utils import content_hash
+
+
+class CountingEmbeddings(Embeddings):
+    model = "counting-embed"
+
+    def __init__(self):
+        self.embedded: List[str] = []
+        self.queries: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.queries.append(text)
+        return [float(len(text)), 1.0]
+
+
+def test_only_new_texts_are_embedded(tmp_path):
+    cache_path = str(tmp_path / "embedding_cache.sqlite")
+    underlying = CountingEmbeddings()
+
+    embeddings = CachedEmbeddings(underlying, cache_path)
+    first = embeddings.embed_documents(["alpha", "beta", "alpha"])
+    assert underlying.embedded == ["alpha", "beta"]
+
+    # A new instance over the same file simulates a restart
+    embeddings = CachedEmbeddings(underlying, cache_path)
+    second = embeddings.embed_documents(["beta", "gamma", "alpha"])
+    assert underlying.embedded == ["alpha", "beta", "gamma"]
+    assert second[0] == first[1] and second[2] == first[0]
+    assert embeddings.hits == 2 and embeddings.misses == 1
+
+
+def test_cache_is_keyed_on_model(tmp_path):
+    cache_path = str(tmp_path / "embedding_cache.sqlite")
+    underlying = CountingEmbeddings()
+
+    CachedEmbeddings(underlying, cache_path, namespace="model-a").embed_documents(["alpha"])
+    CachedEmbeddings(underlying, cache_path, namespace="model-b").embed_documents(["alpha"])
+    assert underlying.embedded == ["alpha", "alpha"]
+
+
+def test_repeated_queries_are_embedded_once():
+    underlying = CountingEmbeddings()
+    embeddings = CachedQueryEmbeddings(underlying, max_size=2)
+    embeddings.embed_query("alpha")
+    embeddings.embed_query("alpha")
+    assert underlying.queries == ["alpha"]
+    assert embeddings.cache.hits == 1
+
+
+def test_query_cache_evicts_least_recently_used_and_expired():
+    cache = QueryEmbeddingCache(max_size=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache.get("a")
+    cache.put("c", [3.0])
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+
+    expired = QueryEmbeddingCache(ttl_seconds=-1)
+    expired.put("a", [1.0])
+    assert expired.get("a") is None
+
+
+def test_queries_are_embedded_through_the_query_path(tmp_path):
+    underlying = CountingEmbeddings()
+    document_cache = CachedEmbeddings(underlying, str(tmp_path / "embedding_cache.sqlite"))
+    embeddings = CachedQueryEmbeddings(document_cache)
+    embeddings.embed_query("alpha")
+
+    vectors = embeddings.embed_queries(["alpha", "beta", "gamma", "beta"])
+
+    assert sorted(underlying.queries) == ["alpha", "beta", "gamma"]
+    # queries are neither embedded as documents nor persisted in the document cache
+    assert underlying.embedded == []
+    hashes = [content_hash(text) for text in ("alpha", "beta", "gamma")]
+    assert document_cache.store.get_many(document_cache.namespace, hashes) == {}
+    assert document_cache.misses == 0
+    assert vectors == [[5.0, 1.0], [4.0, 1.0], [5.0, 1.0], [4.0, 1.0]]
@@ -0,0 +1,65 @@
+import asyncio
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from app.semantic_search.embedding_pipeline import BatchedEmbeddings
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FakeEmbeddings(Embeddings):
+    """Length embeddings, failing with a rate limit on the first `failures` calls"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls: List[List[str]] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(texts)
+        if self.failures:
+            self.failures -= 1
+            raise RateLimitError("Too many requests")
+        return [[float(len(text))] for text in texts]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return [float(len(text))]
+
+
+TEXTS = [f"text number {i} " * (i % 5 + 1) for i in range(40)]
+
+
+def test_batches_are_bounded_and_order_is_kept():
+    underlying = FakeEmbeddings()
+    embeddings = BatchedEmbeddings(underlying, max_batch_tokens=50, max_batch_size=8)
+
+    vectors = embeddings.embed_documents(TEXTS)
+
+    assert vectors == [[float(len(text))] for text in TEXTS]
+    assert len(underlying.calls) > 1
+    assert all(len(call) <= 8 for call in underlying.calls)
+    assert embeddings.metrics.texts == len(TEXTS)
+
+
+def test_rate_limited_batches_are_retried():
+    underlying = FakeEmbeddings(failures=2)
+    embeddings = BatchedEmbeddings(underlying, max_concurrency=1, initial_backoff=0.001)
+
+    vectors = embeddings.embed_documents(TEXTS)
+
+    assert vectors == [[float(len(text))] for text in TEXTS]
+    assert embeddings.metrics.rate_limited == 2
+
+
+def test_async_embeddings_keep_order():
+    underlying = FakeEmbeddings(failures=1)
+    embeddings = BatchedEmbeddings(underlying, max_batch_tokens=30, initial_backoff=0.001)
+
+    vectors = asyncio.run(embeddings.aembed_documents(TEXTS))
+
+    assert vectors == [[float(len(text))] for text in TEXTS]
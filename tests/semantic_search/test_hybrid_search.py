@@ -0,0 +1,112 @@
+import uuid
+import zlib
+from typing import List
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.semantic_search.hybrid import BM25Index, HybridSearch, tokenize, to_chroma_filter
+
+DOCUMENTS = [
+    Document(id="1", page_content="Error ERR-401: identity document rejected", metadata={"category": "kyc"}),
+    Document(id="2", page_content="Error ERR-503: service unavailable, retry later", metadata={"category": "app"}),
+    Document(id="3", page_content="The Compte Pro account is reserved to professionals", metadata={"category": "faq"}),
+    Document(id="4", page_content="Opening an account requires an identity document", metadata={"category": "faq"}),
+]
+
+
+def _index():
+    index = BM25Index()
+    index.add(DOCUMENTS)
+    return index
+
+
+def test_tokenize_removes_case_and_accents():
+    assert tokenize("Éligibilité du Compte") == ["eligibilite", "du", "compte"]
+
+
+def test_bm25_ranks_matching_documents_first():
+    results = _index().search("identity document", k=2)
+    assert {document.id for document, _ in results} == {"1", "4"}
+
+
+def test_bm25_applies_metadata_filter():
+    results = _index().search("identity document", k=4, filter={"category": "faq"})
+    assert [document.id for document, _ in results] == ["4"]
+
+
+def test_lookup_requires_every_term():
+    assert [document.id for document in _index().lookup("ERR-503")] == ["2"]
+    assert _index().lookup("ERR-999") == []
+
+
+def test_lookup_ranks_matches_by_bm25():
+    index = BM25Index()
+    index.add([Document(id="long", page_content="alpha beta gamma delta epsilon zeta"),
+               Document(id="short", page_content="alpha beta")])
+    assert [document.id for document in index.lookup("alpha beta")] == ["short", "long"]
+
+
+def test_documents_are_indexed_once():
+    index = _index()
+    index.add(DOCUMENTS)
+    assert len(index) == len(DOCUMENTS)
+
+
+def test_chroma_filter():
+    assert to_chroma_filter({"category": "faq"}) == {"category": "faq"}
+    assert to_chroma_filter({"category": ["faq", "kyc"], "lang": "fr"}) == {
+        "$and": [{"category": {"$in": ["faq", "kyc"]}}, {"lang": "fr"}]
+    }
+
+
+class HashingEmbeddings(Embeddings):
+    """Bag of words hashed in a small vector, enough for documents sharing words to be close"""
+    dimensions = 64
+
+    def __init__(self):
+        self.queries: List[str] = []
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for token in tokenize(text):
+            vector[zlib.crc32(token.encode()) % self.dimensions] += 1.0
+        norm = sum(value * value for value in vector) ** 0.5 or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.queries.append(text)
+        return self._embed(text)
+
+
+def _hybrid(**kwargs):
+    embeddings = HashingEmbeddings()
+    search = HybridSearch(embeddings, collection_name=f"hybrid_{uuid.uuid4().hex[:8]}", **kwargs)
+    search.add_documents([Document(id=d.id, page_content=d.page_content, metadata=d.metadata) for d in DOCUMENTS])
+    return search, embeddings
+
+
+def test_exact_lookup_bypasses_the_vector_store():
+    search, embeddings = _hybrid()
+    results = search.retrieve("ERR-503")
+    assert [document.page_content for document in results] == [DOCUMENTS[1].page_content]
+    assert embeddings.queries == []
+
+
+def test_retrieve_fuses_lexical_and_vector_rankings():
+    search, embeddings = _hybrid(k=2, exact_max_terms=0)
+    results = search.retrieve("identity document")
+    assert {document.page_content for document in results} == {DOCUMENTS[0].page_content,
+                                                               DOCUMENTS[3].page_content}
+    assert embeddings.queries == ["identity document"]
+
+
+def test_rrf_favours_documents_ranked_by_both_indexes():
+    search, _ = _hybrid(rrf_k=60)
+    a, b, c = (Document(id=_id, page_content=_id) for _id in "abc")
+    # a: 1/61 + 1/62, c: 1/63 + 1/61, b: 1/62
+    assert [document.id for document in search._fuse([a, b, c], [c, a], k=3)] == ["a", "c", "b"]
+    assert [document.id for document in search._fuse([a, b, c], [c, a], k=1)] == ["a"]
@@ -0,0 +1,69 @@
+import os
+
+from app.semantic_search import ingestion
+from app.semantic_search.ingestion import IngestionManifest, iter_file_chunks
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_manifest_skips_unchanged_files(tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    doc = _write(tmp_path / "doc.txt", "hello")
+
+    manifest = IngestionManifest(manifest_path)
+    assert manifest.is_changed(doc)
+    manifest.record(doc)
+    manifest.save()
+
+    assert not IngestionManifest(manifest_path).is_changed(doc)
+
+
+def test_manifest_detects_content_changes_not_touches(tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    doc = _write(tmp_path / "doc.txt", "hello")
+    manifest = IngestionManifest(manifest_path)
+    manifest.record(doc)
+
+    stat = os.stat(doc)
+    os.utime(doc, (stat.st_atime, stat.st_mtime + 10))
+    assert not manifest.is_changed(doc)
+
+    _write(doc, "hello world")
+    assert manifest.is_changed(doc)
+
+
+def test_manifest_is_invalidated_by_settings(tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    doc = _write(tmp_path / "doc.txt", "hello")
+    manifest = IngestionManifest(manifest_path, settings={"chunk_size": 100})
+    manifest.record(doc)
+    manifest.save()
+
+    assert IngestionManifest(manifest_path, settings={"chunk_size": 200}).is_changed(doc)
+
+
+def test_iter_file_chunks_yields_changed_files_only(tmp_path):
+    first = _write(tmp_path / "first.txt", "first document")
+    second = _write(tmp_path / "second.txt", "second document")
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    manifest.record(first)
+
+    results = list(iter_file_chunks([first, second], chunk_size=100, chunk_overlap=0,
+                                    max_workers=1, manifest=manifest))
+
+    assert [path.name for path, _ in results] == ["second.txt"]
+    assert results[0][1][0].page_content == "second document"
+
+
+def test_few_small_files_are_parsed_in_process(tmp_path, monkeypatch):
+    files = [_write(tmp_path / f"doc{i}.txt", f"document {i}") for i in range(3)]
+
+    def _no_pool(*args, **kwargs):
+        raise AssertionError("a process pool was started for a few small files")
+
+    monkeypatch.setattr(ingestion, "ProcessPoolExecutor", _no_pool)
+    results = list(iter_file_chunks(files, chunk_size=100, chunk_overlap=0))
+    assert sorted(path.name for path, _ in results) == ["doc0.txt", "doc1.txt", "doc2.txt"]
@@ -0,0 +1,67 @@
+import asyncio
+from collections import Counter
+from typing import List
+
+import httpx
+
+from app.semantic_search.web_loader import HttpCache, afetch_urls
+
+URL = "https://example.com/post"
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 21 Oct 2026 07:28:00 GMT"
+PAGE = "<html lang='en'><head><title>Post</title></head><body>Agents</body></html>"
+
+
+class _Site:
+    """Mock site serving PAGE with validators, answering 304 to matching conditional requests"""
+
+    def __init__(self):
+        self.requests: List[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == ETAG:
+            return httpx.Response(304)
+        return httpx.Response(200, text=PAGE, headers={"ETag": ETAG, "Last-Modified": LAST_MODIFIED,
+                                                       "Content-Type": "text/html; charset=utf-8"})
+
+
+async def test_fetched_pages_are_cached_with_their_validators(tmp_path):
+    site = _Site()
+    documents = await afetch_urls([URL], cache_dir=str(tmp_path), transport=httpx.MockTransport(site))
+
+    assert documents[0].metadata == {"source": URL, "title": "Post", "language": "en"}
+    entry = HttpCache(str(tmp_path)).get(URL)
+    assert entry["etag"] == ETAG
+    assert entry["last_modified"] == LAST_MODIFIED
+    assert entry["text"] == PAGE
+    assert "If-None-Match" not in site.requests[0].headers
+
+
+async def test_not_modified_pages_are_served_from_the_cache(tmp_path):
+    site = _Site()
+    first = await afetch_urls([URL], cache_dir=str(tmp_path), transport=httpx.MockTransport(site))
+    second = await afetch_urls([URL], cache_dir=str(tmp_path), transport=httpx.MockTransport(site))
+
+    request = site.requests[1]
+    assert request.headers["If-None-Match"] == ETAG
+    assert request.headers["If-Modified-Since"] == LAST_MODIFIED
+    assert second[0].page_content == first[0].page_content == "PostAgents"
+
+
+async def test_requests_to_a_host_are_capped(tmp_path):
+    running, max_running = Counter(), Counter()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        running[host] += 1
+        max_running[host] = max(max_running[host], running[host])
+        await asyncio.sleep(0.02)
+        running[host] -= 1
+        return httpx.Response(200, text="page", headers={"Content-Type": "text/plain"})
+
+    urls = [f"https://{host}/page/{index}" for host in ("a.example.com", "b.example.com") for index in range(6)]
+    documents = await afetch_urls(urls, per_host_limit=2, transport=httpx.MockTransport(handler))
+
+    assert [document.metadata["source"] for document in documents] == urls
+    assert max_running == {"a.example.com": 2, "b.example.com": 2}
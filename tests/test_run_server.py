@@ -0,0 +1,84 @@
+import json
+from typing import List
+
+from langchain_core.messages import AIMessageChunk, ToolMessage
+
+import app.run_server as run_server
+
+LLM = {"langgraph_node": "customer-onboarding"}
+TOOLS = {"langgraph_node": "tools"}
+
+
+def _usage(input_tokens: int, output_tokens: int) -> dict:
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+
+class _Graph:
+    """Graph streaming the given (message, metadata) pairs"""
+    checkpointer = None
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    async def astream(self, input, config, stream_mode):
+        for item in self.stream:
+            yield item
+
+
+async def _frames(monkeypatch, stream) -> List[str]:
+    async def aget_assistant(assistant_id):
+        return _Graph(stream)
+
+    monkeypatch.setattr(run_server, "aget_assistant", aget_assistant)
+    messages = [{"role": "user", "content": "Bonjour"}]
+    return [frame async for frame in run_server.stream_text_graph(messages)]
+
+
+def _payload(frame: str) -> dict:
+    return json.loads(frame[2:])
+
+
+async def test_finish_step_reports_the_usage_streamed_after_the_finish_reason(monkeypatch):
+    frames = await _frames(monkeypatch, [
+        (AIMessageChunk(content="Bonjour", id="run-1"), LLM),
+        (AIMessageChunk(content="", id="run-1", response_metadata={"finish_reason": "stop"}), LLM),
+        # OpenAI and Mistral send the usage on a last chunk
+        (AIMessageChunk(content="", id="run-1", usage_metadata=_usage(10, 3)), LLM),
+    ])
+
+    assert frames[0] == '0:"Bonjour"\n'
+    assert frames[1].startswith("e:")
+    assert _payload(frames[1])["finishReason"] == "stop"
+    assert _payload(frames[1])["usage"] == {"promptTokens": 10, "completionTokens": 3}
+    assert _payload(frames[2])["usage"] == {"promptTokens": 10, "completionTokens": 3}
+    assert len(frames) == 3
+
+
+async def test_graph_tool_results_keep_the_tool_call_arguments(monkeypatch):
+    frames = await _frames(monkeypatch, [
+        (AIMessageChunk(content="", id="run-1", tool_call_chunks=[
+            {"name": "search_errors", "args": '{"query": "E001"}', "id": "call_1", "index": 0}]), LLM),
+        (AIMessageChunk(content="", id="run-1", response_metadata={"finish_reason": "tool_calls"}), LLM),
+        (AIMessageChunk(content="", id="run-1", usage_metadata=_usage(10, 5)), LLM),
+        (ToolMessage(content="Error E001", tool_call_id="call_1", name="search_errors"), TOOLS),
+        (AIMessageChunk(content="Done", id="run-2"), LLM),
+        (AIMessageChunk(content="", id="run-2", response_metadata={"finish_reason": "stop"},
+                        usage_metadata=_usage(20, 2)), LLM),
+    ])
+
+    assert [frame[0] for frame in frames] == ["9", "e", "a", "0", "e", "d"]
+    assert _payload(frames[1])["usage"] == {"promptTokens": 10, "completionTokens": 5}
+    assert _payload(frames[2]) == {"toolCallId": "call_1", "toolName": "search_errors",
+                                   "args": {"query": "E001"}, "result": "Error E001"}
+    assert _payload(frames[4])["usage"] == {"promptTokens": 20, "completionTokens": 2}
+    assert _payload(frames[5])["usage"] == {"promptTokens": 30, "completionTokens": 7}
+
+
+async def test_finish_step_without_usage_is_sent_before_the_next_turn(monkeypatch):
+    frames = await _frames(monkeypatch, [
+        (AIMessageChunk(content="A", id="run-1", response_metadata={"finish_reason": "stop"}), LLM),
+        (AIMessageChunk(content="B", id="run-2", response_metadata={"finish_reason": "stop"}), LLM),
+    ])
+
+    assert [frame[0] for frame in frames] == ["0", "e", "0", "e", "d"]
+    assert _payload(frames[1])["usage"] == {"promptTokens": 0, "completionTokens": 0}
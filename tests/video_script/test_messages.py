@@ -0,0 +1,52 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.video_script.messages import select_messages, tag_chapter
+
+CHAPTERS = [{"title": "Origins", "covered_topics": []}, {"title": "Today", "covered_topics": []}]
+
+
+def _history(revisions: int):
+    messages = [HumanMessage(content="A video on the history of banking", name="user"),
+                AIMessage(content="Plan: Origins, Today", name="planner")]
+    for chapter in range(len(CHAPTERS)):
+        for revision in range(revisions):
+            for name in ("researcher", "writer", "reviewer"):
+                content = f"{name} chapter {chapter} revision {revision} " + "lorem ipsum " * 50
+                messages.append(tag_chapter(AIMessage(content=content, name=name), chapter))
+    return messages
+
+
+def test_writer_gets_the_latest_messages_of_the_current_chapter():
+    selected = select_messages(_history(revisions=3), "writer", 1, CHAPTERS)
+    assert [m.name for m in selected] == ["user", "planner", "summary", "researcher", "writer", "reviewer"]
+    assert all("chapter 1 revision 2" in m.content for m in selected[3:])
+    assert "Origins" in selected[2].content
+
+
+def test_selection_does_not_grow_with_revisions():
+    short = select_messages(_history(revisions=1), "reviewer", 1, CHAPTERS)
+    long = select_messages(_history(revisions=5), "reviewer", 1, CHAPTERS)
+    assert len(short) == len(long)
+
+
+def test_selection_fits_the_token_budget():
+    selected = select_messages(_history(revisions=2), "writer", 1, CHAPTERS, max_tokens=200)
+    assert "summary" not in [m.name for m in selected]
+    assert [m.name for m in selected] == ["user", "planner", "researcher", "writer", "reviewer"]
+    # the reviewer feedback is truncated before the research
+    assert selected[-1].content.endswith("[...]")
+    assert selected[2].content.startswith("researcher chapter 1 revision 1")
+    assert not selected[2].content.endswith("[...]")
+
+
+def test_truncation_order_depends_on_the_role():
+    selected = select_messages(_history(revisions=2), "reviewer", 1, CHAPTERS, max_tokens=200)
+    assert [m.name for m in selected] == ["user", "planner", "researcher", "writer"]
+    # the draft under review is kept
+    assert selected[2].content.endswith("[...]")
+    assert not selected[3].content.endswith("[...]")
+
+
+def test_zero_budget_keeps_the_whole_history():
+    history = _history(revisions=2)
+    assert select_messages(history, "writer", 1, CHAPTERS, max_tokens=0) == history
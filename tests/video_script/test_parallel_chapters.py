@@ -0,0 +1,153 @@
+import asyncio
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END
+
+import app.video_script.assistant as assistant
+from app.video_script.state import VideoScriptState
+
+CHAPTERS = [{"title": f"Chapter {index}", "covered_topics": [], "chapter_brief": ""} for index in range(4)]
+
+
+class _Agent:
+    def __init__(self, respond):
+        self.respond = respond
+
+    async def ainvoke(self, input, config=None):
+        return await self.respond(input)
+
+
+class _Prompt:
+    def format(self, **kwargs) -> str:
+        return "Plan the video"
+
+
+@dataclass
+class _Team:
+    """Stubbed agents of the video script graph, recording what they did"""
+    # seconds the writer takes, by chapter title
+    delays: Dict[str, float] = field(default_factory=dict)
+    approvals: List[str] = field(default_factory=lambda: ["approved"])
+    written: List[str] = field(default_factory=list)
+    writing: int = 0
+    max_writing: int = 0
+    supervised: int = 0
+
+
+def _title(message) -> str:
+    return re.search(r"chapter '(.+?)'", message.content).group(1)
+
+
+@pytest.fixture
+def team(monkeypatch):
+    team = _Team()
+
+    async def plan(input):
+        return {"video_title": "Banking", "plan": CHAPTERS}
+
+    async def research(input):
+        return AIMessage(content="Questions")
+
+    async def crag(input):
+        return {"generation": "Facts"}
+
+    async def write(input):
+        title = _title(input["messages"][-1])
+        team.writing += 1
+        team.max_writing = max(team.max_writing, team.writing)
+        await asyncio.sleep(team.delays.get(title, 0.05))
+        team.writing -= 1
+        team.written.append(title)
+        return {"chapter": f"Script of {title}", "comment": "Done"}
+
+    async def review(input):
+        return {"GoodPoints": "", "MissingOrNeedsResearch": "", "SuperfluousContent": "",
+                "StyleRefinement": "", "NextNode": "writer"}
+
+    async def supervise(input):
+        team.supervised += 1
+        return {"status": team.approvals[min(team.supervised, len(team.approvals)) - 1]}
+
+    async def get_prompt(name):
+        return _Prompt()
+
+    monkeypatch.setattr(assistant, "planner", _Agent(plan))
+    monkeypatch.setattr(assistant, "researcher", _Agent(research))
+    monkeypatch.setattr(assistant, "corrective_rag", _Agent(crag))
+    monkeypatch.setattr(assistant, "writer", _Agent(write))
+    monkeypatch.setattr(assistant, "reviewer", _Agent(review))
+    monkeypatch.setattr(assistant, "supervisor", _Agent(supervise))
+    monkeypatch.setattr(assistant, "aget_prompt", get_prompt)
+    return team
+
+
+async def _run(**configurable):
+    return await assistant.video_script.ainvoke(
+        {"messages": [HumanMessage(content="A video on the history of banking", name="user")]},
+        {"configurable": configurable, "recursion_limit": 60},
+    )
+
+
+def _chapter_positions(script: str) -> List[int]:
+    return [script.index(f"Script of {chapter['title']}") for chapter in CHAPTERS]
+
+
+async def test_chapters_are_produced_concurrently_and_assembled_in_order(team):
+    # the first chapter finishes last
+    team.delays = {"Chapter 0": 0.3}
+    res = await _run(parallel_chapters=True, max_parallel_chapters=4)
+
+    assert sorted(team.written) == [chapter["title"] for chapter in CHAPTERS]
+    assert team.written[-1] == "Chapter 0"
+    assert team.max_writing == 4
+    assert sorted(res["chapter_scripts"]) == [0, 1, 2, 3]
+    script = res["messages"][-1].content
+    assert _chapter_positions(script) == sorted(_chapter_positions(script))
+    # the research, drafts and reviews of every chapter are kept, tagged with their chapter
+    drafts = [m for m in res["messages"] if m.name == "writer"]
+    assert sorted(m.response_metadata["chapter"] for m in drafts) == [0, 1, 2, 3]
+
+
+async def test_parallel_chapters_are_bounded(team):
+    await _run(parallel_chapters=True, max_parallel_chapters=2)
+    assert len(team.written) == len(CHAPTERS)
+    assert team.max_writing == 2
+
+
+async def test_sequential_mode_is_unchanged_without_the_flag(team):
+    res = await _run()
+
+    assert team.written == [chapter["title"] for chapter in CHAPTERS]
+    assert team.max_writing == 1
+    assert res["chapter_scripts"] == {}
+    script = res["messages"][-1].content
+    assert _chapter_positions(script) == sorted(_chapter_positions(script))
+
+
+def _chapter_state(revision: int) -> VideoScriptState:
+    return VideoScriptState(messages=[HumanMessage(content="A video on banking", name="user")],
+                            chapters=CHAPTERS, current_chapter_index=1, current_chapter_revision=revision,
+                            next_node="writer", remaining_steps=20)
+
+
+async def test_chapter_supervisor_ends_on_approval(team):
+    command = await assistant.chapter_supervisor_node(_chapter_state(revision=1), {"configurable": {}})
+    assert command.goto == END
+
+    team.approvals = ["revised"]
+    team.supervised = 0
+    command = await assistant.chapter_supervisor_node(_chapter_state(revision=1), {"configurable": {}})
+    assert command.goto == "writer"
+    assert command.update["current_chapter_revision"] == 2
+
+
+async def test_chapter_supervisor_ends_on_max_revision(team):
+    team.approvals = ["revised"]
+    command = await assistant.chapter_supervisor_node(_chapter_state(revision=2),
+                                                      {"configurable": {"max_revision": 2}})
+    assert command.goto == END
+    assert team.supervised == 0
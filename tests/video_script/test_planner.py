@@ -0,0 +1,113 @@
+import asyncio
+import contextlib
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+import app.video_script.agents as video_script_agents
+from app.video_script.agents import Planner2
+
+
+class _Runner:
+    """Agents SDK runner returning numbered outlines and the scripted evaluator scores"""
+
+    def __init__(self, scores: List[str], delay: float = 0):
+        self.scores = scores
+        self.delay = delay
+        self.outlines = 0
+        self.evaluations = 0
+
+    async def run(self, agent, input_items):
+        await asyncio.sleep(self.delay)
+        if agent.name == "story_outline_generator":
+            self.outlines += 1
+            return SimpleNamespace(final_output={
+                "video_title": f"Outline {self.outlines}",
+                "plan": [{"title": "Introduction", "covered_topics": ["Hook"], "chapter_brief": ""}],
+            })
+        score = self.scores[min(self.evaluations, len(self.scores) - 1)]
+        self.evaluations += 1
+        return SimpleNamespace(final_output={"score": score, "feedback": "Be more precise"})
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    def _runner(scores: List[str], delay: float = 0) -> _Runner:
+        runner = _Runner(scores, delay)
+        monkeypatch.setattr(video_script_agents, "AgentSDKRunner", runner)
+        return runner
+
+    monkeypatch.setattr(video_script_agents, "trace", lambda *args, **kwargs: contextlib.nullcontext())
+    monkeypatch.setattr(video_script_agents, "gen_trace_id", lambda: "trace_test")
+    return _runner
+
+
+def _planner(max_iterations: int = 3, cache_size: int = 64) -> Planner2:
+    return Planner2(name="planner", model_name="gpt-5-mini", max_iterations=max_iterations, cache_size=cache_size)
+
+
+async def test_outline_passing_the_first_round_is_returned(runner):
+    scripted = runner(["pass"])
+    res = await _planner().ainvoke("A video on banking")
+    assert res["video_title"] == "Outline 1"
+    assert scripted.outlines == 1
+
+
+async def test_planning_stops_when_the_score_does_not_improve(runner):
+    scripted = runner(["needs_improvement", "needs_improvement", "pass"])
+    res = await _planner().ainvoke("A video on banking")
+    assert scripted.outlines == 2
+    # on equal score the latest outline is kept
+    assert res["video_title"] == "Outline 2"
+
+
+async def test_fail_after_needs_improvement_keeps_the_best_outline(runner):
+    runner(["needs_improvement", "fail"])
+    res = await _planner().ainvoke("A video on banking")
+    assert res["video_title"] == "Outline 1"
+
+
+async def test_planning_is_capped_by_max_iterations(runner):
+    scripted = runner(["needs_improvement", "pass"])
+    res = await _planner(max_iterations=1).ainvoke("A video on banking")
+    assert scripted.outlines == 1
+    assert res["video_title"] == "Outline 1"
+
+
+async def test_outlines_are_cached_by_normalized_prompt(runner):
+    scripted = runner(["pass"])
+    planner = _planner(cache_size=1)
+    await planner.ainvoke("A video on banking")
+    res = await planner.ainvoke("  a video ON   banking ")
+    assert scripted.outlines == 1
+    assert res["video_title"] == "Outline 1"
+
+    # least recently used outline is evicted
+    await planner.ainvoke("A video on insurance")
+    await planner.ainvoke("A video on banking")
+    assert scripted.outlines == 3
+
+
+async def test_failed_plannings_are_not_cached(runner):
+    scripted = runner(["fail"])
+    planner = _planner()
+    assert (await planner.ainvoke("A video on banking"))["status"] == "stopped"
+    assert (await planner.ainvoke("A video on banking"))["status"] == "stopped"
+    assert scripted.outlines == 2
+
+
+async def test_concurrent_identical_prompts_are_planned_once(runner):
+    scripted = runner(["pass"], delay=0.05)
+    planner = _planner()
+    first, second = await asyncio.gather(planner.ainvoke("A video on banking"),
+                                         planner.ainvoke("a video on banking"))
+    assert scripted.outlines == 1
+    assert first["video_title"] == second["video_title"] == "Outline 1"
+    assert first.data is not second.data
+
+
+async def test_invoke_refuses_to_block_a_running_loop(runner):
+    runner(["pass"])
+    with pytest.raises(RuntimeError, match="ainvoke"):
+        _planner().invoke("A video on banking")
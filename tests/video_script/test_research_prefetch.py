@@ -0,0 +1,64 @@
+import asyncio
+
+from app.video_script.prefetch import ResearchPrefetcher
+
+
+def _research(result: str = "research", delay: float = 0, calls: list = None):
+    async def research():
+        if calls is not None:
+            calls.append(result)
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return research
+
+
+async def test_prefetched_research_is_started_once_and_consumed():
+    prefetcher = ResearchPrefetcher()
+    calls = []
+    assert prefetcher.start("run", 1, _research("chapter 2", calls=calls))
+    assert not prefetcher.start("run", 1, _research("chapter 2", calls=calls))
+
+    assert prefetcher.collect("run", 1) == {}  # still running
+    assert await prefetcher.take("run", 1) == "chapter 2"
+    assert calls == ["chapter 2"]
+    assert len(prefetcher) == 0
+    # nothing left, the researcher falls back to its own research
+    assert await prefetcher.take("run", 1) is None
+
+
+async def test_finished_research_is_collected_for_the_state():
+    prefetcher = ResearchPrefetcher()
+    prefetcher.start("run", 1, _research("chapter 2"))
+    await asyncio.sleep(0.01)
+    assert prefetcher.collect("run", 1) == {1: "chapter 2"}
+    assert ("run", 1) not in prefetcher
+
+
+async def test_failed_research_falls_back_and_is_dropped():
+    prefetcher = ResearchPrefetcher()
+    prefetcher.start("run", 1, _research(RuntimeError("CRAG unavailable")))
+    assert await prefetcher.take("run", 1) is None
+
+    prefetcher.start("run", 2, _research(RuntimeError("CRAG unavailable")))
+    await asyncio.sleep(0.01)
+    assert prefetcher.collect("run", 2) == {}
+    assert len(prefetcher) == 0
+
+
+async def test_unclaimed_research_expires():
+    prefetcher = ResearchPrefetcher(ttl_seconds=0.01)
+    prefetcher.start("run", 1, _research())
+    await asyncio.sleep(0.05)
+    assert len(prefetcher) == 0
+
+
+async def test_cancel_only_stops_the_research_of_the_run():
+    prefetcher = ResearchPrefetcher()
+    prefetcher.start("run", 1, _research(delay=10))
+    prefetcher.start("other", 1, _research("other"))
+    prefetcher.cancel("run")
+
+    assert ("run", 1) not in prefetcher
+    assert await prefetcher.take("other", 1) == "other"
@@ -0,0 +1,316 @@
+"""
+Retrieval benchmark of the semantic_search strategies.
+
+Indexes are built from data/ (FAQ, error database, evaluation PDFs) with a deterministic local
+hashing embedding model, so runs are reproducible and do not call any provider.
+For each strategy it measures index build time, cold and warm query latency percentiles,
+throughput of concurrent aretrieve calls, memory and recall@k / MRR against a labeled query set.
+
+Results are written as JSON to compare them across commits. Run from the repository root:
+
+    PYTHONPATH=. python tools/semantic_search/benchmark_retrieval.py --output benchmark.json
+    PYTHONPATH=. python tools/semantic_search/benchmark_retrieval.py --strategies hybrid --embedding-latency-ms 50
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import platform
+import re
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.semantic_search.document_loaders import DocumentLoader
+from app.semantic_search.factory import SemanticSearchFactory, SearchStrategyType
+
+_ROOT = Path(__file__).resolve().parents[2]
+_DEFAULT_QUERIES = Path(__file__).with_name("retrieval_queries.json")
+_TOKEN_PATTERN = re.compile(r"\w+", flags=re.UNICODE)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings (hashing trick), texts sharing words are similar.
+    An optional latency simulates the round-trip of a remote provider.
+    """
+
+    def __init__(self, dimensions: int = 256, latency_seconds: float = 0.0):
+        self.dimensions = dimensions
+        self.latency_seconds = latency_seconds
+        self.model = f"hashing-{dimensions}"
+        self.calls = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for token in _TOKEN_PATTERN.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+def load_faq(path: Path) -> List[Document]:
+    """FAQ entries, formatted like FAQAgent does"""
+    with open(path, "r", encoding="utf-8") as file:
+        faq = json.load(file)
+    return [
+        Document(page_content=f"Question: {item['question']}\nAnswer: {item['answer']}",
+                 metadata={"corpus": "faq", "cat": item["cat"], "benchmark_key": item["question"]})
+        for item in faq.values()
+    ]
+
+
+def load_errors(path: Path) -> List[Document]:
+    """Error database entries, formatted like load_error_documents does"""
+    with open(path, "r", encoding="utf-8") as file:
+        errors = json.load(file)["errors"]
+    return [
+        Document(
+            page_content=(
+                f"Code: {entry['code']}\n"
+                f"Category: {entry['category']}\n"
+                f"Subcategory: {entry['subcategory']}\n"
+                f"Description: {entry['description']}\n"
+                f"Details: {entry['details']}\n"
+                f"Diagnostic Questions: {', '.join(entry['diagnostic_questions'])}\n"
+                f"Resolution: {entry['resolution']}\n"
+                f"Search Keys: {', '.join(entry['search_keys'])}"
+            ),
+            metadata={"corpus": "errors", "category": entry["category"], "benchmark_key": entry["code"]},
+        )
+        for entry in errors
+    ]
+
+
+def load_pdfs(directory: Path, max_workers: Optional[int]) -> List[Document]:
+    documents = []
+    for path, chunks in DocumentLoader.iter_from_directory(directory, ["*.pdf"], max_workers=max_workers):
+        for chunk in chunks:
+            chunk.metadata.update({"corpus": "pdf", "benchmark_key": path.name})
+            documents.append(chunk)
+    return documents
+
+
+def load_corpus(corpora: List[str], max_workers: Optional[int]) -> List[Document]:
+    documents = []
+    if "faq" in corpora:
+        documents.extend(load_faq(_ROOT / "data" / "parsed" / "faq.json"))
+    if "errors" in corpora:
+        documents.extend(load_errors(_ROOT / "data" / "parsed" / "error_db.json"))
+    if "pdf" in corpora:
+        documents.extend(load_pdfs(_ROOT / "data" / "documents" / "evaluation", max_workers))
+    return documents
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean/max of latencies in milliseconds"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def _percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {
+        "p50_ms": _percentile(50) * 1000,
+        "p95_ms": _percentile(95) * 1000,
+        "p99_ms": _percentile(99) * 1000,
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def quality(strategy, queries: List[Dict[str, Any]], k: int) -> Dict[str, float]:
+    """Mean recall@k and MRR of the labeled queries"""
+    recalls, reciprocal_ranks = [], []
+    for item in queries:
+        relevant = set(item["relevant"])
+        keys = [document.metadata.get("benchmark_key") for document in strategy.retrieve(item["query"], k=k)]
+        recalls.append(len(relevant.intersection(keys)) / len(relevant))
+        rank = next((i + 1 for i, key in enumerate(keys) if key in relevant), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+    return {f"recall@{k}": sum(recalls) / len(recalls), "mrr": sum(reciprocal_ranks) / len(reciprocal_ranks)}
+
+
+def latencies(strategy, queries: List[str], k: int, repeat: int) -> Dict[str, Any]:
+    """Latency of the first query pass (cold caches) and of the following passes"""
+    cold, warm = [], []
+    for iteration in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            strategy.retrieve(query, k=k)
+            (cold if iteration == 0 else warm).append(time.perf_counter() - start)
+    return {"cold": percentiles(cold), "warm": percentiles(warm)}
+
+
+async def throughput(strategy, queries: List[str], k: int, repeat: int, concurrency: int) -> Dict[str, float]:
+    """Queries per second of concurrent aretrieve calls"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _retrieve(query: str):
+        async with semaphore:
+            await strategy.aretrieve(query, k=k)
+
+    workload = queries * repeat
+    start = time.perf_counter()
+    await asyncio.gather(*(_retrieve(query) for query in workload))
+    seconds = time.perf_counter() - start
+    return {"queries": len(workload), "concurrency": concurrency, "seconds": seconds,
+            "queries_per_second": len(workload) / seconds if seconds else 0.0}
+
+
+def build_strategy(strategy_type: SearchStrategyType,
+                   documents: List[Document],
+                   embeddings: Embeddings,
+                   args: argparse.Namespace,
+                   persist_directory: Optional[str]):
+    """Index the documents in a new collection"""
+    strategy = SemanticSearchFactory.create_strategy(
+        strategy_type,
+        embeddings,
+        persist_directory=persist_directory,
+        collection_name=f"benchmark-{strategy_type.value}-{uuid.uuid4().hex[:8]}",
+        search_type="similarity",
+        k=args.k,
+    )
+    strategy.add_documents([Document(page_content=d.page_content, metadata=dict(d.metadata)) for d in documents])
+    return strategy
+
+
+def build_peak_memory(strategy_type: SearchStrategyType,
+                      documents: List[Document],
+                      args: argparse.Namespace,
+                      persist_directory: Optional[str]) -> int:
+    """Peak Python memory of a build, in its own collection: tracemalloc slows the build it traces"""
+    embeddings = HashingEmbeddings(dimensions=args.dimensions)
+    tracemalloc.start()
+    try:
+        build_strategy(strategy_type, documents, embeddings, args, persist_directory)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def benchmark_strategy(strategy_type: SearchStrategyType,
+                       documents: List[Document],
+                       queries: List[Dict[str, Any]],
+                       args: argparse.Namespace,
+                       persist_directory: Optional[str]) -> Dict[str, Any]:
+    embeddings = HashingEmbeddings(dimensions=args.dimensions, latency_seconds=args.embedding_latency_ms / 1000)
+
+    start = time.perf_counter()
+    strategy = build_strategy(strategy_type, documents, embeddings, args, persist_directory)
+    build_seconds = time.perf_counter() - start
+    build_peak = build_peak_memory(strategy_type, documents, args, persist_directory)
+
+    query_texts = [item["query"] for item in queries]
+    calls_before_queries = embeddings.calls
+    result = {
+        "build_seconds": build_seconds,
+        "build_peak_python_bytes": build_peak,
+        "index": strategy.stats(),
+        # latency first, its first pass runs with cold query caches
+        "latency": latencies(strategy, query_texts, args.k, args.repeat),
+        "quality": quality(strategy, queries, args.k),
+        "throughput": asyncio.run(throughput(strategy, query_texts, args.k, args.repeat, args.concurrency)),
+    }
+    result["embedding_calls_for_queries"] = embeddings.calls - calls_before_queries
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategies", default="simple_vector,hybrid",
+                        help="comma separated SearchStrategyType values")
+    parser.add_argument("--corpora", default="faq,errors,pdf", help="comma separated: faq, errors, pdf")
+    parser.add_argument("--queries", default=str(_DEFAULT_QUERIES), help="labeled queries JSON file")
+    parser.add_argument("--k", type=int, default=4, help="number of documents retrieved")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the query set")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent aretrieve calls")
+    parser.add_argument("--dimensions", type=int, default=256, help="dimensions of the fake embeddings")
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0,
+                        help="simulated latency of each embedding call")
+    parser.add_argument("--workers", type=int, default=None, help="processes parsing PDFs")
+    parser.add_argument("--persist", action="store_true", help="build persisted indexes in a temporary directory")
+    parser.add_argument("--output", help="JSON result file, printed to stdout if not set")
+    args = parser.parse_args(argv)
+
+    with open(args.queries, "r", encoding="utf-8") as file:
+        queries = json.load(file)["queries"]
+
+    corpora = [corpus.strip() for corpus in args.corpora.split(",") if corpus.strip()]
+    start = time.perf_counter()
+    documents = load_corpus(corpora, args.workers)
+    load_seconds = time.perf_counter() - start
+    # queries whose relevant documents are not in the selected corpora are not evaluated
+    keys = {document.metadata["benchmark_key"] for document in documents}
+    queries = [item for item in queries if keys.intersection(item["relevant"])]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for strategy_name in args.strategies.split(","):
+            strategy_type = SearchStrategyType(strategy_name.strip())
+            persist_directory = os.path.join(directory, strategy_type.value) if args.persist else None
+            results[strategy_type.value] = benchmark_strategy(strategy_type, documents, queries, args,
+                                                              persist_directory)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "settings": vars(args),
+        "corpus": {"corpora": corpora, "documents": len(documents), "queries": len(queries),
+                   "load_seconds": load_seconds},
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+    return report
+
+
+if __name__ == "__main__":
+    main()